@@ -1,15 +1,18 @@
-import sqlite3
-
 import streamlit as st
 
 from core.db import (
+    database_errors,
     init_db,
     seed_defaults,
+    uses_sqlite,
 )
+from core.maintenance import background_enabled as db_maintenance_enabled
+from core.maintenance import start_background as start_db_maintenance
 from core.security import hash_password
 from core.utils import ensure_dirs
+from services import users as user_service
 
-from modules.auth import render_auth
+from modules.auth import current_user, render_auth, sign_out
 from modules.admin import (
     render_admin_dashboard,
     render_user_management,
@@ -48,20 +51,20 @@ try:
     ensure_dirs()
     conn = init_db()
     seed_defaults(conn, hash_password("admin123"))
-except sqlite3.Error as e:
+    if uses_sqlite() and db_maintenance_enabled():
+        start_db_maintenance()
+except database_errors() as e:
     st.error(f"Database error: {e}")
     st.stop()
 
-if "user" not in st.session_state:
-    st.session_state.user = None
-if "role" not in st.session_state:
-    st.session_state.role = None
 if "current_page" not in st.session_state:
     st.session_state.current_page = "Dashboard"
 
 try:
-    roles = {row["id"]: row["name"] for row in conn.execute("SELECT * FROM roles")}
-except sqlite3.Error as e:
+    roles = user_service.role_map(conn)
+    # The login lives in the shared session store (core.state), not in this process.
+    user = current_user(conn)
+except database_errors() as e:
     st.error(f"Database error: {e}")
     st.stop()
 
@@ -96,7 +99,7 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if not st.session_state.user:
+if not user:
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         st.markdown(
@@ -115,16 +118,11 @@ if not st.session_state.user:
         render_auth(conn)
 
 else:
-    user = st.session_state.user
     role_name = roles.get(user["role_id"], "student")
-    if user.get("role_name") != role_name:
-        st.session_state.user = {**user, "role_name": role_name}
-        user = st.session_state.user
+    user["role_name"] = role_name
 
     if st.session_state.get("active_user_id") != user.get("id"):
         keys_to_clear = [
-            "attendance_lock",
-            "geo_location",
             "gps_request",
             "gps_message",
             "show_full_qr",
@@ -147,8 +145,7 @@ else:
         """, unsafe_allow_html=True)
         
         if st.button("🚪 Logout", use_container_width=True, type="secondary"):
-            st.session_state.user = None
-            st.session_state.role = None
+            sign_out(conn)
             st.session_state.current_page = "Dashboard"
             st.rerun()
         
@@ -245,11 +242,11 @@ else:
     elif role_name == "teacher":
         if page == "Dashboard":
             st.title("Teacher Dashboard")
-            render_attendance_analytics(conn)
+            render_attendance_analytics(conn, user)
         elif page == "Attendance":
             render_teacher_attendance(conn, user)
             st.markdown("---")
-            render_attendance_analytics(conn)
+            render_attendance_analytics(conn, user)
         elif page == "Notices":
             render_notice_board(conn, user)
         elif page == "Resources":
@@ -0,0 +1,86 @@
+"""Throughput of bulk timetable lecture creation and QR sheet generation.
+
+Usage (from the project root)::
+
+    python -m benchmarks.bench_qr_sheet --lectures 500 --workers 4
+
+Builds a term of lectures from a synthetic weekly timetable in a scratch database, then
+times the single-transaction insert and the QR sheet, serially and with a process pool.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.common import BENCH_DIR, write_results
+from core.db import init_db
+from core.models import Schedule
+from core.qr import build_qr_sheet, render_png_batch
+from core.utils import WEEKDAYS, schedule_slot
+from services import lectures as lecture_service
+from services import schedules as schedule_service
+
+SUBJECTS = ["Data Structures", "Operating Systems", "Database Systems", "Computer Networks", "Machine Learning"]
+SLOTS = ["08:00-09:00", "09:00-10:00", "10:15-11:15", "11:15-12:15", "13:00-14:00", "14:00-15:00"]
+
+
+def _term_occurrences(count: int, term_start: date):
+    timetable = []
+    for i in range(len(SLOTS) * 5):
+        day, slot = WEEKDAYS[i % 5], SLOTS[(i // 5) % len(SLOTS)]
+        timetable.append(Schedule(
+            i + 1, day, slot, SUBJECTS[i % len(SUBJECTS)], f"R{100 + i % 12}", 1, 1 + i % 4, 1 + i % 3,
+            *schedule_slot(day, slot),
+        ))
+    occurrences = []
+    week = 0
+    while len(occurrences) < count:
+        week_occ, _ = schedule_service.week_occurrences(timetable, term_start + timedelta(weeks=week))
+        occurrences.extend(week_occ)
+        week += 1
+    return occurrences[:count]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk lecture creation and QR sheet generation.")
+    parser.add_argument("--lectures", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "results" / "qr_sheet.json")
+    args = parser.parse_args(argv)
+
+    occurrences = _term_occurrences(args.lectures, date(2026, 1, 5))
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = init_db(Path(tmp) / "bench_qr.db")
+        session_ids, insert_ms = _timed(
+            lambda: lecture_service.bulk_create_lectures(conn, 1, occurrences, 23.0225, 72.5714, 40.0, 10)
+        )
+        conn.close()
+
+    payloads = [lecture_service.attendance_url(session_id) for session_id in session_ids]
+    items = [(payload, f"{row.subject}\n{start:%Y-%m-%d %H:%M}") for payload, (row, start, _) in zip(payloads, occurrences)]
+    _, serial_ms = _timed(lambda: render_png_batch(payloads, workers=1))
+    _, pool_ms = _timed(lambda: render_png_batch(payloads, workers=args.workers))
+    sheet, sheet_ms = _timed(lambda: build_qr_sheet(items, fmt="PDF", workers=args.workers))
+
+    results = {
+        "bulk_insert": {"ms": round(insert_ms, 3), "per_sec": round(len(session_ids) / (insert_ms / 1000.0))},
+        "qr_render.serial": {"ms": round(serial_ms, 3), "per_sec": round(len(payloads) / (serial_ms / 1000.0))},
+        f"qr_render.pool{args.workers}": {"ms": round(pool_ms, 3), "per_sec": round(len(payloads) / (pool_ms / 1000.0))},
+        "qr_sheet.pdf": {"ms": round(sheet_ms, 3), "bytes": len(sheet), "per_sec": round(len(items) / (sheet_ms / 1000.0))},
+    }
+    for name, stats in results.items():
+        print(f"{name:<20} {stats['ms']:>10.1f}ms {stats['per_sec']:>8} lectures/s")
+    write_results(args.output, results, {"lectures": args.lectures, "workers": args.workers})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Memory and construction time of row representations.
+
+Usage (from the project root)::
+
+    python -m benchmarks.bench_row_models --count 1000000
+
+Compares plain tuples, ``sqlite3.Row``, ``dict(sqlite3.Row)`` (what the modules used to
+build) and ``core.models.record_factory`` records over the same in-memory lecture table.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import BENCH_DIR, write_results
+from core.models import Lecture, columns, record_factory
+
+
+def _build_source(count: int):
+    conn = sqlite3.connect(":memory:")
+    # Untyped columns named after the model, so the table tracks Lecture as it grows.
+    conn.execute(f"CREATE TABLE lectures ({columns(Lecture)})")
+    padding = (None,) * (len(Lecture._fields) - 14)
+    conn.executemany(
+        f"INSERT INTO lectures ({columns(Lecture)}) VALUES ({', '.join('?' for _ in Lecture._fields)})",
+        (
+            (i, f"SESS-{i:08x}", i % 400, "Data Structures", f"R{i % 60:03d}", "2026-02-04T09:00:00",
+             "2026-02-04T10:00:00", 23.0225, 72.5714, 40.0, 10, i % 5 + 1, i % 4 + 1, "2026-02-04T08:55:00")
+            + padding
+            for i in range(count)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def _fetch_tuples(conn):
+    conn.row_factory = None
+    return conn.execute(f"SELECT {columns(Lecture)} FROM lectures").fetchall()
+
+
+def _fetch_rows(conn):
+    conn.row_factory = sqlite3.Row
+    return conn.execute(f"SELECT {columns(Lecture)} FROM lectures").fetchall()
+
+
+def _fetch_dicts(conn):
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute(f"SELECT {columns(Lecture)} FROM lectures")]
+
+
+def _fetch_records(conn):
+    conn.row_factory = record_factory
+    return conn.execute(f"SELECT {columns(Lecture)} FROM lectures").fetchall()
+
+
+VARIANTS = {
+    "tuple": _fetch_tuples,
+    "sqlite3.Row": _fetch_rows,
+    "dict(sqlite3.Row)": _fetch_dicts,
+    "record_factory": _fetch_records,
+}
+
+
+def _measure(conn, fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = fn(conn)
+        times.append((time.perf_counter() - start) * 1000.0)
+        del rows
+    gc.collect()
+    tracemalloc.start()
+    rows = fn(conn)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return {
+        "median_ms": round(sorted(times)[len(times) // 2], 3),
+        "min_ms": round(min(times), 3),
+        "repeat": repeat,
+        "retained_mb": round(current / 2**20, 2),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare row representations for N lecture rows.")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "results" / "row_models.json")
+    args = parser.parse_args(argv)
+
+    conn = _build_source(args.count)
+    results = {}
+    print(f"{args.count:,} rows")
+    print(f"{'variant':<20} {'median':>12} {'retained':>12} {'peak':>12}")
+    for name, fn in VARIANTS.items():
+        stats = _measure(conn, fn, args.repeat)
+        results[name] = stats
+        print(f"{name:<20} {stats['median_ms']:>10.1f}ms {stats['retained_mb']:>10.1f}MB {stats['peak_mb']:>10.1f}MB")
+    write_results(args.output, results, {"count": args.count})
+
+
+if __name__ == "__main__":
+    main()
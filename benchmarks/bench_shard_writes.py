@@ -0,0 +1,121 @@
+"""Concurrent attendance write throughput with and without shard files.
+
+Usage (from the project root)::
+
+    python -m benchmarks.bench_shard_writes --writers 8 --marks 400 --shards 1 2 4 8
+
+Each writer thread plays one running lecture and submits ``--marks`` marks through
+:func:`services.attendance.mark`, committing each one as the app does.  The lectures'
+teachers belong to ``--shards`` departments, so in ``department`` sharding mode the writers
+spread over that many files; ``0`` runs with sharding off (everything in one file).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from benchmarks.common import BENCH_DIR, write_results
+from core.db import get_db, init_db
+from core.shards import SHARDING_ENV
+from services import attendance as attendance_service
+
+
+def _seed(db_path: Path, writers: int, departments: int):
+    conn = init_db(db_path)
+    conn.execute("INSERT OR IGNORE INTO roles (name) VALUES ('teacher')")
+    role_id = conn.execute("SELECT id FROM roles WHERE name = 'teacher'").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO users (role_id, name, department, username, password_hash, created_at) VALUES (?, ?, ?, ?, '', '2026-01-01')",
+        [(role_id, f"Teacher {i}", f"Dept {i % max(departments, 1)}", f"bench_teacher_{i}") for i in range(writers)],
+    )
+    teachers = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'bench_teacher_%' ORDER BY id")]
+    conn.executemany(
+        """
+        INSERT INTO lectures (session_id, teacher_id, subject, room, start_time, end_time, latitude, longitude,
+                              radius_m, late_after_min, created_at)
+        VALUES (?, ?, 'Bench', 'R1', '2026-03-02T09:00:00', '2026-03-02T10:00:00', 23.0225, 72.5714, 40, 10, '2026-03-01')
+        """,
+        [(f"BENCH-{i:04d}", teacher) for i, teacher in enumerate(teachers)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _run(db_path: Path, writers: int, marks: int) -> Tuple[float, List[float]]:
+    """Marks per second with ``writers`` threads submitting concurrently, and each mark's ms."""
+    barrier = threading.Barrier(writers + 1)
+    errors = []
+    latencies: List[float] = []
+
+    def _writer(index: int):
+        conn = get_db(db_path)
+        session_id = f"BENCH-{index:04d}"
+        try:
+            barrier.wait()
+            own = []
+            for n in range(marks):
+                start = time.perf_counter()
+                attendance_service.mark(conn, session_id, f"ENR-{n:06d}", "Present", 23.0225, 72.5714, 5.0, 1.0)
+                own.append((time.perf_counter() - start) * 1000.0)
+            latencies.extend(own)
+        except Exception as exc:  # reported after the run; a failed writer invalidates it
+            errors.append(exc)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=_writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(f"{len(errors)} writer(s) failed: {errors[0]!r}")
+    return writers * marks / elapsed, sorted(latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent attendance writes across shard files.")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent lectures (writer threads)")
+    parser.add_argument("--marks", type=int, default=400, help="Marks per writer")
+    parser.add_argument("--shards", type=int, nargs="*", default=[0, 1, 2, 4, 8], help="Shard counts (0 = off)")
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "results" / "shard_writes.json")
+    args = parser.parse_args(argv)
+
+    previous = os.environ.get(SHARDING_ENV)
+    results = {}
+    try:
+        for shards in args.shards:
+            if shards:
+                os.environ[SHARDING_ENV] = "department"
+            else:
+                os.environ.pop(SHARDING_ENV, None)
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = Path(tmp) / "bench_shards.db"
+                _seed(db_path, args.writers, shards)
+                per_sec, latencies = _run(db_path, args.writers, args.marks)
+            name = f"shards.{shards}" if shards else "unsharded"
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            results[name] = {
+                "per_sec": round(per_sec), "p50_ms": round(p50, 3), "p95_ms": round(p95, 3),
+                "writers": args.writers, "marks": args.writers * args.marks,
+            }
+            print(f"{name:<12} {per_sec:>10,.0f} marks/s   p50 {p50:6.2f}ms   p95 {p95:6.2f}ms")
+    finally:
+        if previous is None:
+            os.environ.pop(SHARDING_ENV, None)
+        else:
+            os.environ[SHARDING_ENV] = previous
+    write_results(args.output, results, {"writers": args.writers, "marks": args.marks})
+
+
+if __name__ == "__main__":
+    main()
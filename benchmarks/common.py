@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BENCH_DB = BENCH_DIR.parent / "data" / "bench_campus.db"
+DEFAULT_RESULTS = BENCH_DIR / "results" / "latest.json"
+
+
+def time_call(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict:
+    """Run ``fn`` ``warmup + repeat`` times and summarise the timed runs in milliseconds."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p95_ms": round(samples[p95_index], 3),
+        "repeat": repeat,
+        "rows": _count_rows(result),
+    }
+
+
+def _count_rows(result) -> int | None:
+    if result is None:
+        return None
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def write_results(path: Path, results: Dict[str, Dict], meta: Dict | None = None):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **(meta or {}),
+        },
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, Dict]:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    return payload.get("results", {})
+
+
+def compare_results(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 1.2) -> List[str]:
+    """Print a median-time comparison and return the names that regressed past ``threshold``."""
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name in sorted(current):
+        now_ms = current[name]["median_ms"]
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<36} {'-':>12} {now_ms:>10.3f}ms {'new':>8}")
+            continue
+        before_ms = before["median_ms"]
+        ratio = now_ms / before_ms if before_ms else float("inf")
+        marker = " !" if ratio > threshold else ""
+        print(f"{name:<36} {before_ms:>10.3f}ms {now_ms:>10.3f}ms {ratio:>7.2f}x{marker}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
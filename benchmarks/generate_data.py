@@ -0,0 +1,376 @@
+"""Deterministic synthetic campus data for benchmarking.
+
+Usage (from the project root)::
+
+    python -m benchmarks.generate_data --preset medium
+    python -m benchmarks.generate_data --students 20000 --days 1825 --db data/bench_campus.db
+
+The same seed and options always produce the same database.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from math import cos, radians
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import DEFAULT_BENCH_DB
+from core.db import init_db, seed_defaults
+from core.security import hash_password
+from services.rooms import grid_cell
+
+PRESETS = {
+    "small": {"students": 1000, "teachers": 40, "days": 30},
+    "medium": {"students": 5000, "teachers": 120, "days": 180},
+    "large": {"students": 20000, "teachers": 400, "days": 1825},
+}
+
+CAMPUS_CENTER = (23.0225, 72.5714)
+DEPARTMENTS = ["CSE", "IT", "ECE", "ME", "CE"]
+SUBJECTS = [
+    "Python Basics", "Data Structures", "Algorithms", "Operating Systems", "Computer Networks",
+    "Database Systems", "Machine Learning", "Web Development", "Discrete Maths", "Compiler Design",
+    "Software Engineering", "Cloud Computing", "Digital Electronics", "Signals", "Thermodynamics",
+]
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+SLOTS = [(8, 0), (9, 0), (10, 0), (11, 15), (12, 15), (14, 0), (15, 0), (16, 0)]
+ISSUE_CATEGORIES = ["Wi-Fi", "Electricity", "Cleanliness", "Security", "Other"]
+ISSUE_STATUSES = ["Open", "In Progress", "Resolved"]
+METERS_PER_DEG_LAT = 111_320.0
+CHUNK = 50_000
+
+
+def _offset(lat: float, lon: float, north_m, east_m):
+    """Shift a coordinate by metre offsets (scalars or numpy arrays)."""
+    d_lat = north_m / METERS_PER_DEG_LAT
+    d_lon = east_m / (METERS_PER_DEG_LAT * cos(radians(lat)))
+    return lat + d_lat, lon + d_lon
+
+
+class CampusGenerator:
+    def __init__(self, conn, args):
+        self.conn = conn
+        self.args = args
+        self.rand = random.Random(args.seed)
+        self.rng = np.random.default_rng(args.seed)
+        self.end_date = date.fromisoformat(args.end_date)
+        self.start_date = self.end_date - timedelta(days=args.days - 1)
+        self.counts = {}
+
+    def _insert_many(self, table: str, columns, rows):
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        batch = []
+        total = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= CHUNK:
+                self.conn.executemany(sql, batch)
+                total += len(batch)
+                batch.clear()
+        if batch:
+            self.conn.executemany(sql, batch)
+            total += len(batch)
+        self.conn.commit()
+        self.counts[table] = self.counts.get(table, 0) + total
+        return total
+
+    def _ts(self, day: date, hour: int = 0, minute: int = 0, second: int = 0) -> str:
+        return datetime(day.year, day.month, day.day, hour, minute, second).isoformat()
+
+    def _random_day(self) -> date:
+        return self.start_date + timedelta(days=self.rand.randrange(self.args.days))
+
+    def users(self):
+        role_ids = {row["name"]: row["id"] for row in self.conn.execute("SELECT id, name FROM roles")}
+        password_hash = hash_password("student123")
+        created = self._ts(self.start_date)
+
+        teachers = [
+            (role_ids["teacher"], f"Teacher {i:04d}", None, self.rand.choice(DEPARTMENTS), None, None,
+             f"teacher{i:04d}", password_hash, created)
+            for i in range(self.args.teachers)
+        ]
+        self._insert_many(
+            "users",
+            ["role_id", "name", "enrollment", "department", "year", "batch", "username", "password_hash", "created_at"],
+            teachers,
+        )
+        self.teacher_ids = [
+            row["id"] for row in self.conn.execute("SELECT id FROM users WHERE username LIKE 'teacher____'")
+        ]
+
+        self.cohorts = {}
+        students = []
+        for i in range(self.args.students):
+            year = i % self.args.years + 1
+            batch = (i // self.args.years) % self.args.batches + 1
+            enrollment = f"ENR{year}{batch}-{i:06d}"
+            self.cohorts.setdefault((year, batch), []).append(enrollment)
+            students.append(
+                (role_ids["student"], f"Student {i:06d}", enrollment, DEPARTMENTS[i % len(DEPARTMENTS)],
+                 year, batch, None, password_hash, created)
+            )
+        self._insert_many(
+            "users",
+            ["role_id", "name", "enrollment", "department", "year", "batch", "username", "password_hash", "created_at"],
+            students,
+        )
+
+    def rooms(self):
+        self.room_coords = {}
+        for i in range(self.args.rooms):
+            north, east = self.rand.uniform(-300, 300), self.rand.uniform(-300, 300)
+            self.room_coords[f"R{i // 10 + 1}{i % 10:02d}"] = _offset(*CAMPUS_CENTER, north, east)
+        self._insert_many(
+            "rooms",
+            ["name", "building", "latitude", "longitude", "radius_m", "cell_lat", "cell_lon", "updated_at"],
+            (
+                (name, f"Block {name[1]}", lat, lon, 40.0, *grid_cell(lat, lon), self._ts(self.start_date, 8, 0))
+                for name, (lat, lon) in sorted(self.room_coords.items())
+            ),
+        )
+
+    def schedules(self):
+        """One weekly timetable per cohort; lectures are materialised from it."""
+        self.timetable = []
+        room_names = sorted(self.room_coords)
+        for (year, batch) in sorted(self.cohorts):
+            for day_idx, day in enumerate(DAYS[: self.args.weekdays]):
+                slots = self.rand.sample(SLOTS, self.args.lectures_per_day)
+                for hour, minute in sorted(slots):
+                    subject = self.rand.choice(SUBJECTS)
+                    self.timetable.append({
+                        "weekday": day_idx,
+                        "day": day,
+                        "hour": hour,
+                        "minute": minute,
+                        "subject": subject,
+                        "room": self.rand.choice(room_names),
+                        "teacher_id": self.rand.choice(self.teacher_ids),
+                        "year": year,
+                        "batch": batch,
+                    })
+        self._insert_many(
+            "schedules",
+            ["day", "time", "subject", "room", "teacher_id", "year", "batch", "weekday", "start_min", "end_min"],
+            (
+                (s["day"], f"{s['hour']:02d}:{s['minute']:02d}-{s['hour'] + 1:02d}:{s['minute']:02d}",
+                 s["subject"], s["room"], s["teacher_id"], s["year"], s["batch"],
+                 s["weekday"], s["hour"] * 60 + s["minute"], (s["hour"] + 1) * 60 + s["minute"])
+                for s in self.timetable
+            ),
+        )
+
+    def lectures_and_attendance(self):
+        by_weekday = {}
+        for slot in self.timetable:
+            by_weekday.setdefault(slot["weekday"], []).append(slot)
+
+        self.session_ids = []
+        lecture_cols = [
+            "session_id", "teacher_id", "subject", "room", "start_time", "end_time", "latitude",
+            "longitude", "radius_m", "late_after_min", "year", "batch", "created_at",
+        ]
+        attendance_cols = [
+            "session_id", "enrollment", "timestamp", "status", "latitude", "longitude", "accuracy", "distance_m",
+        ]
+        lecture_rows = []
+        attendance_rows = []
+        seq = 0
+        for offset in range(self.args.days):
+            day = self.start_date + timedelta(days=offset)
+            for slot in by_weekday.get(day.weekday(), []):
+                seq += 1
+                session_id = f"{slot['subject'][:4].upper()}-{seq:08x}"
+                start = datetime(day.year, day.month, day.day, slot["hour"], slot["minute"])
+                end = start + timedelta(minutes=60)
+                lat, lon = self.room_coords[slot["room"]]
+                radius = 40.0
+                late_after = 10
+                lecture_rows.append((
+                    session_id, slot["teacher_id"], slot["subject"], slot["room"], start.isoformat(),
+                    end.isoformat(), lat, lon, radius, late_after, slot["year"], slot["batch"],
+                    (start - timedelta(minutes=5)).isoformat(),
+                ))
+                self.session_ids.append(session_id)
+                attendance_rows.extend(
+                    self._attendance_for(session_id, start, lat, lon, radius, late_after,
+                                         self.cohorts.get((slot["year"], slot["batch"]), []))
+                )
+                if len(attendance_rows) >= CHUNK:
+                    self._insert_many("lectures", lecture_cols, lecture_rows)
+                    self._insert_many("attendance", attendance_cols, attendance_rows)
+                    lecture_rows, attendance_rows = [], []
+        self._insert_many("lectures", lecture_cols, lecture_rows)
+        self._insert_many("attendance", attendance_cols, attendance_rows)
+
+    def _attendance_for(self, session_id, start, lat, lon, radius, late_after, enrollments):
+        """Vectorised GPS scatter: most students inside the room, a tail of outliers far away."""
+        if not enrollments:
+            return []
+        rng = self.rng
+        present = rng.random(len(enrollments)) < self.args.attendance_rate
+        idx = np.flatnonzero(present)
+        n = len(idx)
+        if not n:
+            return []
+        spread = np.where(rng.random(n) < self.args.outlier_rate, rng.uniform(150, 2000, n), rng.gamma(2.0, 8.0, n))
+        bearing = rng.uniform(0, 2 * np.pi, n)
+        s_lat, s_lon = _offset(lat, lon, spread * np.cos(bearing), spread * np.sin(bearing))
+        accuracy = np.round(rng.lognormal(np.log(12), 0.6, n), 1)
+        delay_s = rng.exponential(6 * 60, n).astype(int)
+        late_cut = late_after * 60
+        rows = []
+        for k in range(n):
+            distance = float(spread[k])
+            if distance > radius:
+                status = f"Rejected (Out of Radius: {distance:.1f}m > {radius}m)"
+            elif delay_s[k] <= late_cut:
+                status = "Present"
+            else:
+                status = "Late"
+            rows.append((
+                session_id, enrollments[idx[k]], (start + timedelta(seconds=int(delay_s[k]))).isoformat(), status,
+                float(s_lat[k]), float(s_lon[k]), float(accuracy[k]), round(distance, 1),
+            ))
+        return rows
+
+    def notices(self):
+        self._insert_many(
+            "notices",
+            ["title", "body", "posted_by", "created_at"],
+            (
+                (f"[{self.rand.choice(['Normal', 'Important', 'Urgent'])}] Notice {i}",
+                 f"Synthetic notice body {i}. " * self.rand.randint(1, 8),
+                 self.rand.choice(self.teacher_ids),
+                 self._ts(self._random_day(), self.rand.randint(8, 18), self.rand.randint(0, 59)))
+                for i in range(self.args.notices)
+            ),
+        )
+
+    def issues(self):
+        enrolled_ids = [row["id"] for row in self.conn.execute(
+            "SELECT id FROM users WHERE enrollment IS NOT NULL LIMIT 5000"
+        )]
+        rows = []
+        for i in range(self.args.issues):
+            day = self._random_day()
+            status = self.rand.choice(ISSUE_STATUSES)
+            resolved = status == "Resolved"
+            rows.append((
+                f"Issue {i}", self.rand.choice(ISSUE_CATEGORIES), f"Synthetic issue description {i}", status,
+                self.rand.choice(enrolled_ids), self.rand.choice(self.teacher_ids) if resolved else None,
+                self._ts(day, 10), self._ts(day + timedelta(days=2), 12) if resolved else None,
+            ))
+        self._insert_many(
+            "issues",
+            ["title", "category", "description", "status", "reported_by", "resolved_by", "created_at", "resolved_at"],
+            rows,
+        )
+
+    def events(self):
+        rows = []
+        for i in range(self.args.events):
+            day = self._random_day()
+            rows.append((
+                f"Event {i}", f"Synthetic event description {i}", day.isoformat(),
+                self.rand.choice(sorted(self.room_coords)), self.rand.choice(self.teacher_ids),
+                self._ts(day - timedelta(days=14), 9),
+            ))
+        self._insert_many(
+            "events", ["title", "description", "event_date", "location", "created_by", "created_at"], rows
+        )
+
+    def feedback(self):
+        """Sample feedback from attendance without loading it all into memory."""
+        rows = self.conn.execute(
+            """
+            SELECT session_id, enrollment, timestamp FROM attendance
+            WHERE status IN ('Present', 'Late') AND ((id * 2654435761 + ?) % 1000) < ?
+            """,
+            (self.args.seed, int(self.args.feedback_rate * 1000)),
+        )
+        self._insert_many(
+            "feedback",
+            ["session_id", "enrollment", "rating", "comments", "created_at"],
+            (
+                (r["session_id"], r["enrollment"], self.rand.randint(1, 5),
+                 self.rand.choice(["", "Good pace", "Too fast", "Great examples"]), r["timestamp"])
+                for r in rows.fetchall()
+            ),
+        )
+
+    def run(self):
+        steps = [
+            ("users", self.users),
+            ("rooms", self.rooms),
+            ("schedules", self.schedules),
+            ("lectures + attendance", self.lectures_and_attendance),
+            ("notices", self.notices),
+            ("issues", self.issues),
+            ("events", self.events),
+            ("feedback", self.feedback),
+        ]
+        for label, step in steps:
+            started = time.perf_counter()
+            step()
+            print(f"  {label:<24} {time.perf_counter() - started:8.2f}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Smart Campus database.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_BENCH_DB, help="Output database path")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--students", type=int)
+    parser.add_argument("--teachers", type=int)
+    parser.add_argument("--days", type=int, help="Days of lecture history ending at --end-date")
+    parser.add_argument("--end-date", default="2026-02-20")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--batches", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=60)
+    parser.add_argument("--weekdays", type=int, default=5, help="Teaching days per week (Mon..)")
+    parser.add_argument("--lectures-per-day", type=int, default=3)
+    parser.add_argument("--attendance-rate", type=float, default=0.8)
+    parser.add_argument("--outlier-rate", type=float, default=0.03)
+    parser.add_argument("--notices", type=int, default=2000)
+    parser.add_argument("--issues", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--feedback-rate", type=float, default=0.05)
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing database")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    if args.db.exists():
+        if not args.force:
+            raise SystemExit(f"{args.db} already exists (use --force to overwrite)")
+        args.db.unlink()
+
+    conn = init_db(args.db)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    seed_defaults(conn, hash_password("admin123"))
+
+    print(f"Generating {args.preset} dataset into {args.db} (seed={args.seed})")
+    generator = CampusGenerator(conn, args)
+    started = time.perf_counter()
+    generator.run()
+    conn.close()
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+    for table, count in generator.counts.items():
+        print(f"  {table:<20} {count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
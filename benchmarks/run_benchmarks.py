@@ -0,0 +1,282 @@
+"""Headless benchmark of each page's data-access path.
+
+Usage (from the project root)::
+
+    python -m benchmarks.generate_data --preset medium
+    python -m benchmarks.run_benchmarks --output benchmarks/results/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/baseline.json
+
+Each case calls the same service functions the matching ``render_*`` function uses, without Streamlit.
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict
+
+import pandas as pd
+
+from benchmarks.common import (
+    DEFAULT_BENCH_DB,
+    DEFAULT_RESULTS,
+    compare_results,
+    load_results,
+    time_call,
+    write_results,
+)
+from core.cache import query_cache
+from core.db import get_db
+from services import attendance as attendance_service
+from services.active_sessions import active_sessions
+from services import events as event_service
+from services import feedback as feedback_service
+from services import issues as issue_service
+from services import lectures as lecture_service
+from services.lectures import CUT_OFF_DATE
+from services import lost_found as lost_found_service
+from services import notices as notice_service
+from services import resources as resource_service
+from services import schedules as schedule_service
+from services import settings as settings_service
+from services import users as user_service
+
+
+def build_context(conn) -> Dict:
+    """Pick representative ids from the generated data (deterministic: first rows by id)."""
+    student = conn.execute(
+        """
+        SELECT u.* FROM users u JOIN roles r ON u.role_id = r.id
+        WHERE r.name = 'student' AND u.year IS NOT NULL AND u.batch IS NOT NULL
+        ORDER BY u.id LIMIT 1
+        """
+    ).fetchone()
+    teacher = conn.execute(
+        """
+        SELECT u.id FROM users u JOIN roles r ON u.role_id = r.id
+        JOIN lectures l ON l.teacher_id = u.id
+        WHERE r.name = 'teacher' ORDER BY u.id LIMIT 1
+        """
+    ).fetchone()
+    lecture = conn.execute("SELECT session_id FROM lectures ORDER BY start_time DESC LIMIT 1").fetchone()
+    if not (student and teacher and lecture):
+        raise SystemExit("Benchmark database is empty; run benchmarks.generate_data first.")
+    return {
+        "student": dict(student),
+        "teacher_id": teacher["id"],
+        "session_id": lecture["session_id"],
+        "search": "Data",
+    }
+
+
+def admin_dashboard(conn, ctx):
+    user_service.count_by_role(conn, "student")
+    user_service.count_by_role(conn, "teacher")
+    lecture_service.count_all(conn)
+    attendance_service.count_all(conn)
+    rows = attendance_service.list_recent_with_subject(conn, limit=10)
+    rows += issue_service.list_recent(conn, limit=10)
+    rows += event_service.list_recent(conn, limit=10)
+    return rows
+
+
+def student_dashboard(conn, ctx):
+    s = ctx["student"]
+    attendance_service.student_summary(conn, s["enrollment"], s["year"], s["batch"])
+    notice_service.latest(conn)
+    timetable = schedule_service.cohort_timetable(conn, s["year"], s["batch"])
+    timetable.next_lecture(datetime.now())
+    return timetable.rows
+
+
+def notice_board(conn, ctx):
+    return [dict(row) for row in notice_service.list_recent(conn, limit=50)]
+
+
+def schedule_student(conn, ctx):
+    s = ctx["student"]
+    return schedule_service.list_for_cohort(conn, s["year"], s["batch"])
+
+
+def schedule_grid(conn, ctx):
+    s = ctx["student"]
+    return schedule_service.weekly_grid(conn, s["year"], s["batch"])
+
+
+def schedule_staff(conn, ctx):
+    user_service.student_cohorts(conn)
+    return schedule_service.list_all(conn)
+
+
+def feedback_student(conn, ctx):
+    session_ids = attendance_service.attended_session_ids(conn, ctx["student"]["enrollment"])
+    lecture_service.list_brief(conn, session_ids)
+    return feedback_service.list_with_lectures(conn)
+
+
+def feedback_staff(conn, ctx):
+    lecture_service.list_brief(conn)
+    return feedback_service.list_with_lectures(conn)
+
+
+def issues(conn, ctx):
+    return issue_service.list_all(conn)
+
+
+def lost_found(conn, ctx):
+    return lost_found_service.list_all(conn)
+
+
+def events(conn, ctx):
+    rows = event_service.list_with_poster(conn)
+    settings_service.get_setting(conn, "facility_email", "facility@college.edu")
+    return rows
+
+
+def resources_student(conn, ctx):
+    s = ctx["student"]
+    return resource_service.list_for_cohort(conn, s["year"], s["batch"])
+
+
+def search(conn, ctx):
+    like = f"%{ctx['search']}%"
+    rows = notice_service.search(conn, like)
+    rows += issue_service.search(conn, like)
+    rows += event_service.search(conn, like)
+    rows += resource_service.search(conn, like)
+    rows += lecture_service.search(conn, like)
+    return rows
+
+
+def analytics(conn, ctx):
+    summary = attendance_service.status_counts(conn)
+    issue_rows = issue_service.category_status(conn)
+    return len(summary) + len(issue_rows)
+
+
+def attendance_analytics(conn, ctx):
+    records = attendance_service.daily_status_counts(conn)
+    df = pd.DataFrame(records, columns=["day", "status", "n"])
+    df["date"] = pd.to_datetime(df["day"], unit="D").dt.date
+    return df.pivot_table(index="date", columns="status", values="n", aggfunc="sum", fill_value=0)
+
+
+def student_attendance_lists(conn, ctx):
+    s = ctx["student"]
+    matching = lecture_service.list_for_cohort(conn, s["year"], s["batch"], CUT_OFF_DATE, limit=20)
+    return matching + lecture_service.list_recent(conn, CUT_OFF_DATE, limit=50)
+
+
+def student_attendance_scan(conn, ctx):
+    """QR deep link, time to form: session id lookup plus the duplicate check (no lecture lists)."""
+    lecture = lecture_service.lookup_lecture(conn, ctx["session_id"])
+    active = active_sessions.get(conn, ctx["session_id"], datetime.now())
+    active.mark_of(ctx["student"]["enrollment"])
+    return [lecture]
+
+
+def student_attendance_submit(conn, ctx):
+    """Status computation on submit: duplicate check, geofence and window, up to the INSERT."""
+    active = active_sessions.get(conn, ctx["session_id"], datetime.now())
+    active.mark_of(ctx["student"]["enrollment"])
+    return [active.status_for(active.distance_m(23.0226, 72.5715), datetime.now())]
+
+
+def teacher_sessions(conn, ctx):
+    sessions = lecture_service.list_teacher_sessions(conn, ctx["teacher_id"], limit=20)
+    for session in sessions:
+        attendance_service.list_for_session(conn, session["session_id"])
+    return sessions
+
+
+def attendance_override(conn, ctx):
+    lecture_service.list_brief(conn, limit=200)
+    attendance_service.list_recent(conn, limit=50)
+    return attendance_service.list_for_override(conn, session_id=ctx["session_id"], status="Rejected")
+
+
+CASES: Dict[str, Callable] = {
+    "admin_dashboard": admin_dashboard,
+    "student_dashboard": student_dashboard,
+    "notice_board": notice_board,
+    "schedule.student": schedule_student,
+    "schedule.staff": schedule_staff,
+    "schedule.grid": schedule_grid,
+    "feedback.student": feedback_student,
+    "feedback.staff": feedback_staff,
+    "issues": issues,
+    "lost_found": lost_found,
+    "events": events,
+    "resources.student": resources_student,
+    "search": search,
+    "analytics": analytics,
+    "attendance.analytics": attendance_analytics,
+    "attendance.student_lists": student_attendance_lists,
+    "attendance.student_scan": student_attendance_scan,
+    "attendance.student_submit": student_attendance_submit,
+    "attendance.teacher_sessions": teacher_sessions,
+    "attendance.override": attendance_override,
+}
+
+
+def _run_case(case, conn, ctx, no_cache: bool):
+    if no_cache:
+        query_cache.clear()
+        active_sessions.clear()
+    return case(conn, ctx)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page data-access paths headlessly.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_BENCH_DB)
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Regression ratio for --baseline")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="Run only these case names")
+    parser.add_argument("--no-cache", action="store_true", help="Clear the query cache before every call")
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        raise SystemExit(f"{args.db} not found; run `python -m benchmarks.generate_data` first.")
+
+    conn = get_db(args.db)
+    ctx = build_context(conn)
+    results = {}
+    for name, case in CASES.items():
+        if args.only and name not in args.only:
+            continue
+        try:
+            stats = time_call(lambda: _run_case(case, conn, ctx, args.no_cache), repeat=args.repeat, warmup=args.warmup)
+        except sqlite3.Error as e:
+            print(f"{name:<36} ERROR {e}")
+            continue
+        results[name] = stats
+        print(f"{name:<36} median {stats['median_ms']:>10.3f}ms  p95 {stats['p95_ms']:>10.3f}ms  rows={stats['rows']}")
+    conn.close()
+
+    row_counts = {}
+    with sqlite3.connect(args.db) as raw:
+        for table in ("users", "lectures", "attendance", "notices", "issues", "events", "feedback", "schedules"):
+            row_counts[table] = raw.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    cache_stats = query_cache.stats()
+    print(f"\nQuery cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+    write_results(
+        args.output,
+        results,
+        {"db": str(args.db), "row_counts": row_counts, "query_cache": cache_stats, "no_cache": args.no_cache},
+    )
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), args.threshold)
+        if regressions:
+            print(f"\nRegressed beyond {args.threshold}x: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
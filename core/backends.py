@@ -0,0 +1,309 @@
+"""Storage backends: how :func:`core.db.get_db` connects, and the SQL that differs per engine.
+
+The service layer talks to a connection with the ``sqlite3`` surface the app has always
+used (``execute`` with ``?`` placeholders, ``executemany``, ``commit``, rows as
+:class:`core.models.Record`) and writes SQL both engines accept (``ON CONFLICT``,
+``RETURNING``, integer epoch columns).  A backend supplies that connection:
+
+* :class:`SQLiteBackend` - the default, a file such as ``data/smart_campus.db``;
+* :class:`PostgresBackend` - a server reached through ``psycopg`` (installed separately),
+  for deployments with several app nodes;
+* :class:`SQLiteServerStandIn` - a SQLite file driven through the same adapter as the
+  server backend (placeholder rewriting, row mapping, server dialect), to exercise that
+  path locally without a server.
+
+The backend comes from ``SMART_CAMPUS_DB_URL`` (``sqlite:////abs/path.db``,
+``postgresql://user@host/db`` or ``sqlite+server:////abs/path.db``); an explicit ``db_path``
+always means a SQLite file.  SQLite URLs follow SQLAlchemy: the path is what follows the
+third slash, so an absolute path needs four (``sqlite:////tmp/x.db``).  ``sqlite:///tmp/x.db``
+would name ``tmp/x.db`` under the working directory, so relative paths are rejected.  The schema in :func:`core.db.init_db` is SQLite DDL; a server
+database is created from its own migrations, with :meth:`Dialect.epoch` giving the
+expression for its epoch columns.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from core.models import record_factory, record_type
+
+DB_URL_ENV = "SMART_CAMPUS_DB_URL"
+
+
+@dataclass(frozen=True)
+class Dialect:
+    name: str
+    # Placeholder style the driver expects: "qmark" (?), "format" (%s) or "named" (:p1).
+    paramstyle: str
+
+    def epoch(self, expr: str) -> str:
+        """Integer seconds of a naive local ISO timestamp, read as UTC (see core.db.EPOCH_COLUMNS)."""
+        if self.name == "sqlite":
+            return f"CAST(strftime('%s', {expr}) AS INTEGER)"
+        return f"CAST(EXTRACT(EPOCH FROM CAST({expr} AS timestamp)) AS BIGINT)"
+
+
+SQLITE = Dialect("sqlite", "qmark")
+POSTGRES = Dialect("postgresql", "format")
+# Not "sqlite", so code that branches on the dialect takes its server path under the stand-in.
+SQLITE_SERVER = Dialect("sqlite+server", "named")
+
+
+def _escape(text: str, paramstyle: str) -> str:
+    # With parameters, "format" drivers read every "%" as a placeholder marker.
+    return text.replace("%", "%%") if paramstyle == "format" else text
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str, paramstyle: str) -> Tuple[str, int]:
+    """Rewrite ``?`` placeholders outside string literals and comments for ``paramstyle``.
+
+    Returns the new SQL and the number of placeholders.
+    """
+    if paramstyle == "qmark":
+        return sql, sql.count("?")
+    out = []
+    count = 0
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    if end + 1 < n and sql[end + 1] == ch:  # doubled quote inside the literal
+                        end += 2
+                        continue
+                    break
+                end += 1
+            out.append(_escape(sql[i:end + 1], paramstyle))
+            i = end + 1
+            continue
+        if ch == "-" and sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = n if end < 0 else end
+            out.append(_escape(sql[i:end], paramstyle))
+            i = end
+            continue
+        if ch == "?":
+            count += 1
+            out.append("%s" if paramstyle == "format" else f":p{count}")
+        elif ch == "%" and paramstyle == "format":
+            out.append("%%")
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out), count
+
+
+class ServerCursor:
+    """DB-API cursor wrapper: ``?`` placeholders in, :class:`Record` rows out."""
+
+    def __init__(self, raw, dialect: Dialect):
+        self._raw = raw
+        self._dialect = dialect
+        self._type = None
+
+    def _bind(self, sql: str, params):
+        translated, count = translate(sql, self._dialect.paramstyle)
+        params = tuple(params or ())
+        if not count and self._dialect.paramstyle == "format":
+            # Without parameters the driver does not interpret "%", so leave it unescaped.
+            return sql, None
+        sql = translated
+        if self._dialect.paramstyle == "named":
+            params = {f"p{i}": value for i, value in enumerate(params, 1)}
+        return sql, params
+
+    def execute(self, sql: str, params: Sequence = ()):
+        sql, bound = self._bind(sql, params)
+        self._raw.execute(sql, bound)
+        self._type = None
+        return self
+
+    def executemany(self, sql: str, seq: Iterable[Sequence]):
+        bound = [self._bind(sql, params) for params in seq]
+        if bound:
+            self._raw.executemany(bound[0][0], [params for _, params in bound])
+        self._type = None
+        return self
+
+    def _record(self, row):
+        if row is None:
+            return None
+        if self._type is None:
+            self._type = record_type(tuple(col[0] for col in self._raw.description))
+        return tuple.__new__(self._type, tuple(row))
+
+    def fetchone(self):
+        return self._record(self._raw.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._record(row) for row in self._raw.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._record(row) for row in self._raw.fetchall()]
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+
+class ServerConnection:
+    """A DB-API connection presenting the subset of ``sqlite3.Connection`` services use."""
+
+    shard_key: str = ""
+
+    def __init__(self, raw, dialect: Dialect, key: str):
+        self._raw = raw
+        self.dialect = dialect
+        # Cache key for core.cache (no credentials).
+        self.db_path = key
+        self.row_factory = None  # rows are always Records; kept for sqlite3 compatibility
+
+    def cursor(self) -> ServerCursor:
+        return ServerCursor(self._raw.cursor(), self.dialect)
+
+    def execute(self, sql: str, params: Sequence = ()) -> ServerCursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq: Iterable[Sequence]) -> ServerCursor:
+        return self.cursor().executemany(sql, seq)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class CampusConnection(sqlite3.Connection):
+    """Connection that remembers its resolved database path (the query cache keys on it)."""
+
+    db_path: str = ""
+    dialect: Dialect = SQLITE
+    # Set on connections to a core.shards shard file, with the campus database it attaches.
+    shard_key: str = ""
+    campus_path: str = ""
+
+
+class Backend:
+    name = ""
+    dialect: Dialect = SQLITE
+    # Exceptions the app reports as database errors.
+    errors: Tuple[type, ...] = (sqlite3.Error,)
+    # SQLite file behind the backend, if any; init_db creates its schema.
+    sqlite_path: Optional[Path] = None
+
+    def connect(self):
+        raise NotImplementedError
+
+
+class SQLiteBackend(Backend):
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.sqlite_path = Path(path)
+
+    def connect(self, check_same_thread: bool = True) -> CampusConnection:
+        path = self.sqlite_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, factory=CampusConnection, check_same_thread=check_same_thread)
+        conn.db_path = str(path.resolve())
+        conn.row_factory = record_factory
+        return conn
+
+
+class SQLiteServerStandIn(Backend):
+    name = "sqlite+server"
+    dialect = SQLITE_SERVER
+
+    def __init__(self, path):
+        self.sqlite_path = Path(path)
+
+    def connect(self) -> ServerConnection:
+        raw = sqlite3.connect(self.sqlite_path)
+        return ServerConnection(raw, self.dialect, f"{self.name}:{self.sqlite_path.resolve()}")
+
+
+class PostgresBackend(Backend):
+    name = "postgresql"
+    dialect = POSTGRES
+
+    def __init__(self, url: str):
+        self.url = url
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise RuntimeError(f"{DB_URL_ENV} points at PostgreSQL but psycopg is not installed ({exc})")
+        self._driver = psycopg
+        self.errors = (psycopg.Error,)
+
+    def connect(self) -> ServerConnection:
+        parts = urlsplit(self.url)
+        key = f"{self.name}://{parts.hostname or ''}:{parts.port or ''}{parts.path}"
+        return ServerConnection(self._driver.connect(self.url), self.dialect, key)
+
+
+def resolve_backend(db_path=None, default_path=None) -> Backend:
+    """The backend for an explicit SQLite ``db_path``, else for ``SMART_CAMPUS_DB_URL``."""
+    if db_path:
+        return SQLiteBackend(db_path)
+    url = os.environ.get(DB_URL_ENV, "").strip()
+    if not url:
+        return SQLiteBackend(default_path)
+    return _backend_for_url(url, default_path)
+
+
+@lru_cache(maxsize=8)
+def _backend_for_url(url: str, default_path) -> Backend:
+    scheme = url.split(":", 1)[0].lower()
+    if scheme in ("sqlite", "sqlite+server"):
+        path = _sqlite_url_path(url, scheme) or default_path
+        return SQLiteBackend(path) if scheme == "sqlite" else SQLiteServerStandIn(path)
+    if scheme in ("postgres", "postgresql"):
+        return PostgresBackend(url)
+    raise ValueError(f"Unsupported {DB_URL_ENV} scheme {scheme!r}")
+
+
+def _sqlite_url_path(url: str, scheme: str) -> Optional[str]:
+    # SQLAlchemy form: sqlite:////absolute/path; the part after "sqlite:///" is the path.
+    path = urlsplit(url).path
+    path = path[1:] if path.startswith("/") else path
+    if path and not Path(path).is_absolute():
+        raise ValueError(
+            f"{DB_URL_ENV} must name an absolute path; {url!r} would resolve to {path!r} under the "
+            f"working directory. Use four slashes, as in {scheme}:////{path}"
+        )
+    return path or None
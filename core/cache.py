@@ -0,0 +1,165 @@
+"""Process-wide query result cache invalidated by per-table version counters.
+
+Read services opt in with :func:`cached_query`, naming the tables their SQL reads.
+Write services call :func:`invalidate` after committing, which bumps those tables'
+versions; an entry is served only while every table it depends on still has the version
+recorded when it was loaded.  Entries also expire after a TTL, which bounds staleness
+from writers outside this process (CLI scripts, a second app instance), and the cache
+evicts least-recently-used entries past a memory cap.
+
+Entries are keyed by the connection's ``db_path`` (set by :func:`core.db.get_db`), so
+the app database and a benchmark database never share results.  Table versions are kept
+per logical database: a :mod:`core.shards` connection counts as its campus database
+(``campus_path``), so a write through either one drops the entries loaded through the
+other.  Connections without a ``db_path`` bypass the cache.
+"""
+from __future__ import annotations
+
+import dataclasses
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+DEFAULT_TTL_SEC = 300.0
+DEFAULT_MAX_BYTES = 32 * 2**20
+# Nesting levels _estimate_size follows (result -> rows -> values -> ...).
+SIZE_DEPTH = 4
+
+
+def _estimate_size(value, depth: int = SIZE_DEPTH) -> int:
+    """Rough retained size of a result, following containers (and dataclass fields) ``depth`` levels down.
+
+    Shared objects are counted each time they are reached; past ``depth`` only the
+    object itself is counted.
+    """
+    size = sys.getsizeof(value)
+    if depth <= 0 or isinstance(value, (str, bytes)):
+        return size
+    if isinstance(value, dict):
+        return size + sum(_estimate_size(k, depth - 1) + _estimate_size(v, depth - 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(_estimate_size(item, depth - 1) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return size + sum(_estimate_size(getattr(value, f.name), depth - 1) for f in dataclasses.fields(value))
+    return size
+
+
+class QueryCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL_SEC):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions: Dict[Tuple[str, str], int] = {}
+        # key -> (value, size, expires_at, versions)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _snapshot(self, db: str, tables: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get((db, table), 0) for table in tables)
+
+    def bump(self, db: str, *tables: str):
+        with self._lock:
+            for table in tables:
+                key = (db, table)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get_or_load(self, db: str, key: Hashable, tables: Tuple[str, ...], loader: Callable[[], object],
+                    ttl: Optional[float] = None):
+        now = time.monotonic()
+        with self._lock:
+            versions = self._snapshot(db, tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now and entry[3] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader()
+        if value is None:
+            # A miss (no such row yet) is not cached: the row may be inserted by a write the
+            # entry's tables don't cover, and the next lookup must see it.
+            return None
+        # Lists are stored as tuples so a caller mutating its copy cannot alter the cache.
+        stored = tuple(value) if isinstance(value, list) else value
+        size = _estimate_size(stored)
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            # A write that landed while the loader ran makes this result stale already.
+            if self._snapshot(db, tables) == versions and size <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                self._entries[key] = (stored, size, expires_at, versions)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted[1]
+                    self.evictions += 1
+        return stored
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_cache = QueryCache()
+
+
+def _db_key(conn) -> Optional[str]:
+    """The database whose table versions ``conn``'s reads and writes use."""
+    return getattr(conn, "campus_path", "") or getattr(conn, "db_path", None)
+
+
+def invalidate(conn, *tables: str):
+    """Mark ``tables`` as changed for ``conn``'s database; call after committing a write."""
+    db = _db_key(conn)
+    if db is not None:
+        query_cache.bump(db, *tables)
+
+
+def cached_query(*tables: str, ttl: Optional[float] = None):
+    """Cache ``fn(conn, *args, **kwargs)`` until one of ``tables`` is invalidated.
+
+    List results are returned as fresh lists, so callers may extend or sort them.  ``None``
+    results are not cached.
+    """
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(conn, *args, **kwargs):
+            db = _db_key(conn)
+            if db is None:
+                return fn(conn, *args, **kwargs)
+            # A shard connection resolves sharded tables to its own file, so its results
+            # are kept apart from the campus connection's even though they share versions.
+            key = (conn.db_path, name, args, tuple(sorted(kwargs.items())))
+            value = query_cache.get_or_load(db, key, tables, lambda: fn(conn, *args, **kwargs), ttl)
+            return list(value) if isinstance(value, tuple) and not hasattr(value, "_fields") else value
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
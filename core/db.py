@@ -1,20 +1,65 @@
-import sqlite3
 from pathlib import Path
 
-from core.utils import now_iso
+from core.backends import SQLITE, SQLiteBackend, resolve_backend
+from core.utils import now_iso, schedule_slot
 
 DB_PATH = Path(__file__).resolve().parent.parent / "data" / "smart_campus.db"
 
+# (table, ISO text column, epoch column).  Each epoch column is a VIRTUAL generated column
+# holding the text's naive local time as integer seconds (``strftime('%s')`` reads it as
+# UTC, which keeps local day boundaries at multiples of 86400), so range filters and day
+# buckets compare indexed integers.  Unparseable text gives NULL.
+EPOCH_COLUMNS = [
+    ("lectures", "start_time", "start_epoch"),
+    ("lectures", "end_time", "end_epoch"),
+    ("lectures", "created_at", "created_epoch"),
+    ("attendance", "timestamp", "timestamp_epoch"),
+    ("users", "created_at", "created_epoch"),
+    ("notices", "created_at", "created_epoch"),
+    ("resources", "created_at", "created_epoch"),
+    ("issues", "created_at", "created_epoch"),
+    ("lost_found", "created_at", "created_epoch"),
+    ("events", "created_at", "created_epoch"),
+    ("event_registrations", "created_at", "created_epoch"),
+    ("feedback", "created_at", "created_epoch"),
+    ("audit_logs", "created_at", "created_epoch"),
+    ("attendance_flags", "created_at", "created_epoch"),
+]
+# Trailing columns that let an epoch index cover its queries (daily status counts).
+EPOCH_INDEX_INCLUDE = {("attendance", "timestamp_epoch"): ("status",)}
+
+
+def get_db(db_path=None):
+    """A connection to ``db_path`` (a SQLite file), else to the configured backend."""
+    return resolve_backend(db_path, DB_PATH).connect()
+
+
+def uses_sqlite() -> bool:
+    """Whether the configured backend is a SQLite file (maintenance and archives need one)."""
+    return resolve_backend(None, DB_PATH).name == "sqlite"
+
+
+def database_errors():
+    """Exception types of the configured backend, for ``except`` clauses around database calls."""
+    return resolve_backend(None, DB_PATH).errors
 
-def get_db():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
+def init_db(db_path=None):
+    backend = resolve_backend(db_path, DB_PATH)
+    if backend.name != "sqlite":
+        # A server database is migrated on its own; the stand-in's file gets the SQLite schema.
+        if backend.sqlite_path is not None:
+            _init_sqlite(backend.sqlite_path).close()
+        return backend.connect()
+    return _init_sqlite(backend.sqlite_path)
 
-def init_db():
-    conn = get_db()
+
+def _init_sqlite(db_path):
+    conn = SQLiteBackend(db_path).connect()
+    # Only takes effect on a new, empty file; see core.maintenance for existing ones.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # Readers (and the backup) never block writers, and commits append to the WAL.
+    conn.execute("PRAGMA journal_mode = WAL")
     cursor = conn.cursor()
 
     cursor.execute(
@@ -219,6 +264,66 @@ def init_db():
         """
     )
 
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            building TEXT,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            radius_m REAL NOT NULL,
+            cell_lat INTEGER NOT NULL,
+            cell_lon INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rooms_cell ON rooms(cell_lat, cell_lon)")
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attendance_flags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            attendance_id INTEGER NOT NULL,
+            session_id TEXT NOT NULL,
+            enrollment TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            score REAL,
+            details TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            created_at TEXT NOT NULL,
+            reviewed_by INTEGER,
+            reviewed_at TEXT,
+            UNIQUE(attendance_id, kind)
+        )
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_flags_status ON attendance_flags(status, created_at)")
+
+    # Login sessions shared by every app process (core.state); expires_at is Unix seconds.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_sessions (
+            sid TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_app_sessions_expires ON app_sessions(expires_at)")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_session_values (
+            sid TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (sid, key)
+        )
+        """
+    )
+
     def _ensure_column(table: str, column: str, col_type: str):
         cols = [row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
         if column not in cols:
@@ -231,24 +336,78 @@ def init_db():
     _ensure_column("schedules", "batch", "INTEGER")
     _ensure_column("resources", "year", "INTEGER")
     _ensure_column("resources", "batch", "INTEGER")
+    _ensure_column("events", "contact_email", "TEXT")
+    _ensure_column("lectures", "qr_rotation_sec", "INTEGER")
+    _ensure_column("lectures", "schedule_id", "INTEGER")
+    _ensure_column("schedules", "weekday", "INTEGER")
+    _ensure_column("schedules", "start_min", "INTEGER")
+    _ensure_column("schedules", "end_min", "INTEGER")
+    backfill_schedule_slots(conn)
+    ensure_epoch_columns(conn)
+
+    # One materialised lecture per timetable slot occurrence.
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_lectures_schedule_start ON lectures(schedule_id, start_time)"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lectures_teacher_start ON lectures(teacher_id, start_time)")
+    # Interval index for timetable conflict checks and the weekly grid.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_slot ON schedules(weekday, start_min, end_min)")
+    # Watermark scans of new marks (services.anomalies) and the latest-marks lists.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance(timestamp)")
+    # Per-student timeline: latest position lookups for the travel-speed check.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_enrollment_time ON attendance(enrollment, timestamp)")
 
     conn.commit()
     return conn
 
 
+def ensure_epoch_columns(conn):
+    """Add and index the generated epoch columns in :data:`EPOCH_COLUMNS` that are missing."""
+    existing = {}
+    for table, source, column in EPOCH_COLUMNS:
+        if table not in existing:
+            # table_xinfo, unlike table_info, lists generated columns.
+            existing[table] = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        if not existing[table]:
+            continue  # table not created in this database (yet)
+        if column not in existing[table]:
+            conn.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} INTEGER "
+                f"GENERATED ALWAYS AS ({SQLITE.epoch(source)}) VIRTUAL"
+            )
+            existing[table].add(column)
+        indexed = ", ".join((column,) + EPOCH_INDEX_INCLUDE.get((table, column), ()))
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({indexed})")
+    conn.commit()
+
+
+def backfill_schedule_slots(conn):
+    """Parse free-text day/time into the structured columns for rows that lack them."""
+    rows = conn.execute("SELECT id, day, time FROM schedules WHERE weekday IS NULL").fetchall()
+    updates = []
+    for row in rows:
+        try:
+            updates.append((*schedule_slot(row["day"], row["time"]), row["id"]))
+        except ValueError:
+            continue  # Left NULL: the scheduler skips slots it cannot place.
+    if updates:
+        conn.executemany("UPDATE schedules SET weekday = ?, start_min = ?, end_min = ? WHERE id = ?", updates)
+
+
 def seed_defaults(conn, password_hash):
     cursor = conn.cursor()
     roles = ["student", "teacher", "admin"]
     for role in roles:
-        cursor.execute("INSERT OR IGNORE INTO roles (name) VALUES (?)", (role,))
+        cursor.execute("INSERT INTO roles (name) VALUES (?) ON CONFLICT DO NOTHING", (role,))
 
     cursor.execute("SELECT id FROM roles WHERE name = ?", ("admin",))
     admin_role_id = cursor.fetchone()["id"]
 
     cursor.execute(
         """
-        INSERT OR IGNORE INTO users (role_id, name, username, password_hash, created_at)
+        INSERT INTO users (role_id, name, username, password_hash, created_at)
         VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
         """,
         (admin_role_id, "System Admin", "admin", password_hash, now_iso()),
     )
@@ -258,8 +417,9 @@ def seed_defaults(conn, password_hash):
 
     cursor.execute(
         """
-        INSERT OR IGNORE INTO users (role_id, name, username, password_hash, created_at)
+        INSERT INTO users (role_id, name, username, password_hash, created_at)
         VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
         """,
         (teacher_role_id, "Default Teacher", "teacher", password_hash, now_iso()),
     )
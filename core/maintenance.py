@@ -0,0 +1,332 @@
+"""Routine upkeep of the SQLite database: backups, statistics, vacuum and WAL checkpoints.
+
+Every task is short and yields to the app's writers:
+
+* ``backup`` copies the live database with the online backup API.  In WAL mode the copy is
+  one step inside a single read transaction, which never blocks writers; in rollback mode
+  it copies ``BACKUP_STEP_PAGES`` at a time and sleeps between steps so writes interleave.
+* ``optimize`` runs ``PRAGMA optimize`` with a bounded ``analysis_limit``; ``analyze``
+  (CLI only) rebuilds all statistics with a full ``ANALYZE``.
+* ``vacuum`` returns free pages with ``PRAGMA incremental_vacuum`` in small committed
+  batches.  It needs ``auto_vacuum = INCREMENTAL``, which new databases get from
+  :func:`core.db.init_db`; an existing file is converted once with
+  ``enable-incremental-vacuum`` (a full VACUUM, so run it outside teaching hours).
+* ``checkpoint`` runs a PASSIVE WAL checkpoint, which copies what it can without waiting.
+
+:class:`MaintenanceScheduler` runs them from a daemon thread on fixed intervals and puts
+``backup`` and ``vacuum`` off while a lecture is in progress.  The app starts one per
+process with :func:`start_background`, so every replica runs its own; set
+``SMART_CAMPUS_MAINTENANCE=off`` on all but one (or on all of them, and let cron use the
+CLI instead)::
+
+    python -m core.maintenance status
+    python -m core.maintenance backup --keep 14
+    python -m core.maintenance all
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+from core.db import DB_PATH, get_db
+from core.utils import local_epoch, now_local
+
+BACKUP_KEEP = 7
+BACKUP_STEP_PAGES = 512
+BACKUP_STEP_SLEEP_SEC = 0.05
+OPTIMIZE_ANALYSIS_LIMIT = 1000
+VACUUM_BATCH_PAGES = 256
+VACUUM_MAX_PAGES = 8192
+
+# Seconds between runs of each task in the background scheduler.
+TASK_INTERVALS_SEC = {
+    "checkpoint": 5 * 60,
+    "optimize": 6 * 3600,
+    "vacuum": 6 * 3600,
+    "backup": 24 * 3600,
+}
+# Tasks that write many pages; they wait until no lecture is running.
+DEFERRED_DURING_LECTURES = ("backup", "vacuum")
+SCHEDULER_TICK_SEC = 60
+MAINTENANCE_ENV = "SMART_CAMPUS_MAINTENANCE"
+MAINTENANCE_MODES = ("thread", "off")
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    task: str
+    elapsed_ms: float
+    detail: str
+    finished_at: str = ""
+
+    def __str__(self) -> str:
+        return f"{self.task}: {self.detail} ({self.elapsed_ms:.1f} ms)"
+
+
+def _pragma(conn, name: str):
+    row = conn.execute(f"PRAGMA {name}").fetchone()
+    return row[0] if row else None
+
+
+def _db_file(conn) -> Path:
+    return Path(getattr(conn, "db_path", "") or DB_PATH)
+
+
+def backup_dir(db_file: Path) -> Path:
+    return db_file.parent / "backups"
+
+
+def backup(conn, dest: Optional[Path] = None, keep: int = BACKUP_KEEP) -> str:
+    """Snapshot the database to ``dest`` (default: a timestamped file under ``backups/``).
+
+    The copy is written to a ``.part`` file and renamed into place, so a listed backup is
+    always complete.  With the default destination only the newest ``keep`` are kept.
+    """
+    db_file = _db_file(conn)
+    pruned = 0
+    if dest is None:
+        directory = backup_dir(db_file)
+        directory.mkdir(parents=True, exist_ok=True)
+        dest = directory / f"{db_file.stem}-{now_local().strftime('%Y%m%d-%H%M%S')}.db"
+    else:
+        directory = None
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+
+    wal = str(_pragma(conn, "journal_mode")).lower() == "wal"
+    target = sqlite3.connect(part)
+    try:
+        if wal:
+            conn.backup(target)
+        else:
+            conn.backup(target, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP_SEC)
+    finally:
+        target.close()
+    os.replace(part, dest)
+
+    if directory is not None:
+        snapshots = sorted(directory.glob(f"{db_file.stem}-*.db"))
+        for old in snapshots[:-keep] if keep > 0 else []:
+            old.unlink(missing_ok=True)
+            pruned += 1
+    size_mb = dest.stat().st_size / 2**20
+    return f"{dest} ({size_mb:.1f} MB{', pruned ' + str(pruned) if pruned else ''})"
+
+
+def optimize(conn) -> str:
+    """Refresh planner statistics that ``PRAGMA optimize`` judges stale."""
+    conn.execute(f"PRAGMA analysis_limit = {OPTIMIZE_ANALYSIS_LIMIT}")
+    conn.execute("PRAGMA optimize")
+    return f"optimize (analysis_limit={OPTIMIZE_ANALYSIS_LIMIT})"
+
+
+def analyze(conn) -> str:
+    """Rebuild statistics for every table and index."""
+    conn.execute("PRAGMA analysis_limit = 0")
+    conn.execute("ANALYZE")
+    conn.commit()
+    return "full ANALYZE"
+
+
+def incremental_vacuum(conn, max_pages: int = VACUUM_MAX_PAGES, batch_pages: int = VACUUM_BATCH_PAGES) -> str:
+    """Release up to ``max_pages`` free pages, committing every ``batch_pages``."""
+    if _pragma(conn, "auto_vacuum") != 2:
+        free = _pragma(conn, "freelist_count")
+        return f"skipped: auto_vacuum is not INCREMENTAL ({free} free pages; see enable-incremental-vacuum)"
+    before = _pragma(conn, "freelist_count")
+    released = 0
+    while released < max_pages:
+        free = _pragma(conn, "freelist_count")
+        if not free:
+            break
+        step = min(batch_pages, free, max_pages - released)
+        # Each batch is its own short write transaction.
+        conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+        conn.commit()
+        released += step
+    return f"released {before - _pragma(conn, 'freelist_count')} of {before} free pages"
+
+
+def enable_incremental_vacuum(conn) -> str:
+    """Switch an existing file to ``auto_vacuum = INCREMENTAL``; rewrites the whole file."""
+    if _pragma(conn, "auto_vacuum") == 2:
+        return "already INCREMENTAL"
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return f"auto_vacuum = {_pragma(conn, 'auto_vacuum')} after VACUUM"
+
+
+def checkpoint(conn, mode: str = "PASSIVE") -> str:
+    """Copy WAL frames back into the database; PASSIVE never waits on readers or writers."""
+    if str(_pragma(conn, "journal_mode")).lower() != "wal":
+        return "skipped: not in WAL mode"
+    busy, log_frames, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return f"{mode.lower()} checkpoint: {done}/{log_frames} frames{' (busy)' if busy else ''}"
+
+
+def status(conn) -> str:
+    db_file = _db_file(conn)
+    wal_file = db_file.with_name(db_file.name + "-wal")
+    page_size = _pragma(conn, "page_size")
+    parts = [
+        f"journal_mode={_pragma(conn, 'journal_mode')}",
+        f"auto_vacuum={AUTO_VACUUM_MODES.get(_pragma(conn, 'auto_vacuum'))}",
+        f"size={_pragma(conn, 'page_count') * page_size / 2**20:.1f} MB",
+        f"free={_pragma(conn, 'freelist_count') * page_size / 2**20:.1f} MB",
+        f"wal={wal_file.stat().st_size / 2**20 if wal_file.exists() else 0:.1f} MB",
+    ]
+    snapshots = sorted(backup_dir(db_file).glob(f"{db_file.stem}-*.db"))
+    parts.append(f"last backup={snapshots[-1].name if snapshots else 'never'}")
+    return ", ".join(parts)
+
+
+TASKS: Dict[str, Callable[..., str]] = {
+    "checkpoint": checkpoint,
+    "optimize": optimize,
+    "vacuum": incremental_vacuum,
+    "backup": backup,
+}
+
+CLI_ONLY: Dict[str, Callable[..., str]] = {
+    "analyze": analyze,
+    "enable-incremental-vacuum": enable_incremental_vacuum,
+    "status": status,
+}
+
+
+def run_task(conn, task: str, **kwargs) -> TaskResult:
+    started = time.perf_counter()
+    detail = TASKS[task](conn, **kwargs) if task in TASKS else CLI_ONLY[task](conn, **kwargs)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    return TaskResult(task, elapsed_ms, detail, now_local().isoformat(timespec="seconds"))
+
+
+def lectures_in_progress(conn, now: Optional[datetime] = None) -> bool:
+    now_epoch = local_epoch(now or now_local())
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM lectures WHERE start_epoch <= ? AND end_epoch > ? LIMIT 1", (now_epoch, now_epoch)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return False  # schema not migrated yet; nothing is being marked against it
+    return row is not None
+
+
+class MaintenanceScheduler:
+    """Runs the :data:`TASKS` every :data:`TASK_INTERVALS_SEC` on a daemon thread."""
+
+    def __init__(self, db_path=None, intervals: Optional[Dict[str, float]] = None,
+                 tick_sec: float = SCHEDULER_TICK_SEC):
+        self.db_path = db_path
+        self.intervals = dict(intervals or TASK_INTERVALS_SEC)
+        self.tick_sec = tick_sec
+        self.history: Deque[TaskResult] = deque(maxlen=100)
+        # The first run of each task waits one full interval: startup is busy enough.
+        self._last_run: Dict[str, float] = {task: time.monotonic() for task in self.intervals}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def due(self, now: float) -> List[str]:
+        return [task for task, interval in self.intervals.items() if now - self._last_run[task] >= interval]
+
+    def run_due(self) -> List[TaskResult]:
+        tasks = self.due(time.monotonic())
+        if not tasks:
+            return []
+        results = []
+        conn = get_db(self.db_path)
+        try:
+            busy = lectures_in_progress(conn)
+            for task in tasks:
+                if busy and task in DEFERRED_DURING_LECTURES:
+                    continue
+                try:
+                    result = run_task(conn, task)
+                except sqlite3.Error as exc:
+                    result = TaskResult(task, 0.0, f"failed: {exc}", now_local().isoformat(timespec="seconds"))
+                self._last_run[task] = time.monotonic()
+                self.history.append(result)
+                results.append(result)
+        finally:
+            conn.close()
+        return results
+
+    def _loop(self):
+        while not self._stop.wait(self.tick_sec):
+            self.run_due()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_schedulers: Dict[str, MaintenanceScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def background_enabled() -> bool:
+    """Whether this process should run the scheduler (``$SMART_CAMPUS_MAINTENANCE``, default ``thread``)."""
+    mode = os.environ.get(MAINTENANCE_ENV, "").strip().lower() or "thread"
+    if mode not in MAINTENANCE_MODES:
+        raise ValueError(f"{MAINTENANCE_ENV} must be one of {', '.join(MAINTENANCE_MODES)} (got {mode!r})")
+    return mode == "thread"
+
+
+def start_background(db_path=None) -> MaintenanceScheduler:
+    """The process's scheduler for ``db_path``, started on first call (Streamlit reruns)."""
+    key = str(Path(db_path or DB_PATH).resolve())
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = _schedulers[key] = MaintenanceScheduler(db_path)
+        scheduler.start()
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up, analyze, vacuum and checkpoint the database.")
+    parser.add_argument(
+        "task", nargs="?", default="status",
+        choices=["all", *TASKS, *CLI_ONLY],
+        help="'all' runs checkpoint, optimize, vacuum and backup in that order",
+    )
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    parser.add_argument("--dest", help="Backup file (default: data/backups/<name>-<time>.db)")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Timestamped backups to keep")
+    parser.add_argument("--truncate", action="store_true", help="Checkpoint in TRUNCATE mode (waits for readers)")
+    parser.add_argument("--max-pages", type=int, default=VACUUM_MAX_PAGES, help="Free pages to release per vacuum")
+    args = parser.parse_args(argv)
+
+    options = {
+        "backup": {"dest": Path(args.dest) if args.dest else None, "keep": args.keep},
+        "checkpoint": {"mode": "TRUNCATE" if args.truncate else "PASSIVE"},
+        "vacuum": {"max_pages": args.max_pages},
+    }
+    tasks = ["checkpoint", "optimize", "vacuum", "backup"] if args.task == "all" else [args.task]
+    conn = get_db(args.db)
+    try:
+        for task in tasks:
+            print(run_task(conn, task, **options.get(task, {})))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compact row records used as the connection row factory.
+
+Every row is a tuple subclass with ``__slots__ = ()``: no per-row ``__dict__``, attribute
+access by column name, and the mapping-style helpers (``row["col"]``, ``keys()``,
+``get()``, ``dict(row)``) the modules already rely on.  Queries whose column list matches
+one of the typed models below get that class; any other column list gets an ad hoc
+record class, built once per distinct column list.
+"""
+from __future__ import annotations
+
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, Tuple
+
+
+class Record:
+    """Mixin for namedtuple classes; ``_fields`` comes from the namedtuple base."""
+
+    __slots__ = ()
+    _keys: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+
+    def __init_subclass__(cls, keys: Tuple[str, ...] = None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._keys = tuple(keys) if keys is not None else cls._fields
+        # First occurrence wins for duplicate column names, as with sqlite3.Row.
+        cls._index = {}
+        for i, name in enumerate(cls._keys):
+            cls._index.setdefault(name, i)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def get(self, key: str, default=None):
+        i = self._index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def __reduce__(self):
+        return (_restore, (type(self).__name__, self._keys, tuple(self)))
+
+
+def _model(name: str, fields: str):
+    return namedtuple(f"_{name}", fields)
+
+
+class User(Record, _model(
+    "User", "id role_id name enrollment department year batch username password_hash created_at"
+)):
+    __slots__ = ()
+
+
+class Lecture(Record, _model(
+    "Lecture",
+    "id session_id teacher_id subject room start_time end_time latitude longitude radius_m "
+    "late_after_min year batch created_at qr_rotation_sec schedule_id",
+)):
+    __slots__ = ()
+
+
+class Attendance(Record, _model(
+    "Attendance",
+    "id session_id enrollment timestamp status latitude longitude accuracy distance_m override_by override_reason",
+)):
+    __slots__ = ()
+
+
+class Notice(Record, _model("Notice", "id title body posted_by created_at poster")):
+    __slots__ = ()
+
+
+class Schedule(Record, _model(
+    "Schedule", "id day time subject room teacher_id year batch weekday start_min end_min"
+)):
+    __slots__ = ()
+
+
+class Room(Record, _model("Room", "id name building latitude longitude radius_m")):
+    __slots__ = ()
+
+
+MODELS = {cls._fields: cls for cls in (User, Lecture, Attendance, Notice, Schedule, Room)}
+
+
+def columns(model, alias: str = "") -> str:
+    """SELECT list for ``model`` in field order, optionally qualified with a table alias."""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + name for name in model._fields)
+
+
+@lru_cache(maxsize=512)
+def record_type(fields: Tuple[str, ...], name: str = "Row"):
+    model = MODELS.get(fields)
+    if model is not None:
+        return model
+    # rename=True turns names such as "COUNT(*)" into positional attributes (_0, ...);
+    # item access and keys() still use the original column names.
+    base = namedtuple(f"_{name}", fields, rename=True)
+    return type(name, (Record, base), {"__slots__": ()}, keys=fields)
+
+
+def _restore(name: str, fields: Tuple[str, ...], values: tuple):
+    return tuple.__new__(record_type(fields, name), values)
+
+
+_last = (None, None)
+
+
+def record_factory(cursor, row):
+    """``sqlite3`` row factory returning :class:`Record` tuples.
+
+    ``cursor.description`` is the same object for every row of a statement, so the
+    record class lookup is an identity check on the hot path.  The (description, class)
+    pair is swapped as one tuple so concurrent script threads never mix them up.
+    """
+    global _last
+    description = cursor.description
+    last = _last
+    if last[0] is not description:
+        last = (description, record_type(tuple(col[0] for col in description)))
+        _last = last
+    return tuple.__new__(last[1], row)
@@ -1,14 +1,165 @@
+"""QR code images addressed by the SHA-256 of their payload.
+
+The same payload always maps to the same ``qr_<digest>.png`` file, and its PNG bytes are
+kept in an in-process LRU, so re-rendering or "regenerating" a code never re-encodes it.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import qrcode
+from PIL import Image, ImageDraw, ImageFont
 
 from core.utils import QR_DIR
 
+QR_CACHE_SIZE = 256
+# Names generate_qr writes; collect_garbage only ever deletes these.
+GENERATED_NAME = re.compile(r"qr_[0-9a-f]{64}\.png")
+
+# A4 at 150 dpi, 3 x 4 codes per page.
+SHEET_PAGE_SIZE = (1240, 1754)
+SHEET_GRID = (3, 4)
+SHEET_MARGIN = 60
+# Below this many codes a process pool costs more to start than it saves.
+SHEET_POOL_MIN_ITEMS = 24
+
+
+def qr_digest(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def qr_path_for(data: str) -> Path:
+    return QR_DIR / f"qr_{qr_digest(data)}.png"
+
+
+def render_png(data: str) -> bytes:
+    """Encode ``data`` straight to PNG bytes, bypassing both caches (for one-off payloads)."""
+    buffer = io.BytesIO()
+    qrcode.make(data).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_png_bytes(data: str) -> bytes:
+    """PNG bytes for ``data``: from memory, else from the disk store, else freshly encoded."""
+    path = qr_path_for(data)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return render_png(data)
+
+
+def _write_atomic(path: Path, payload: bytes):
+    # Write to a temp file in the same directory and rename, so readers never see a partial PNG.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".qr_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 
 def generate_qr(data: str) -> Path:
-    filename = f"qr_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.png"
-    path = QR_DIR / filename
-    image = qrcode.make(data)
-    image.save(path)
+    """Ensure the QR image for ``data`` exists on disk and return its path."""
+    path = qr_path_for(data)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, qr_png_bytes(data))
     return path
+
+
+def collect_garbage(keep: Iterable[str], min_age_sec: float = 3600) -> int:
+    """Delete QR images whose payload is not in ``keep``; returns the number removed.
+
+    Only digest-named files written by :func:`generate_qr` are considered; anything else in
+    the directory (such as the timestamp-named images checked into the repository) is left
+    alone.  Files younger than ``min_age_sec`` are kept so a code written for a lecture
+    that is still being saved is not collected.
+    """
+    keep_names = {qr_path_for(data).name for data in keep}
+    cutoff = time.time() - min_age_sec
+    removed = 0
+    for path in QR_DIR.glob("qr_*.png"):
+        if path.name in keep_names or not GENERATED_NAME.fullmatch(path.name):
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+
+def render_png_batch(payloads: Sequence[str], workers: Optional[int] = None) -> List[bytes]:
+    """Encode many payloads, spreading the work over a process pool for large batches."""
+    workers = workers or min(4, os.cpu_count() or 1)
+    if workers <= 1 or len(payloads) < SHEET_POOL_MIN_ITEMS:
+        return [render_png(data) for data in payloads]
+    # "spawn" keeps the pool safe to start from inside the threaded Streamlit server.
+    context = multiprocessing.get_context("spawn")
+    chunksize = max(1, len(payloads) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(render_png, payloads, chunksize=chunksize))
+
+
+def _sheet_font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def build_qr_sheet(
+    items: Sequence[Tuple[str, str]],
+    fmt: str = "PDF",
+    workers: Optional[int] = None,
+) -> bytes:
+    """Lay out ``(payload, caption)`` pairs as a printable sheet.
+
+    ``fmt="PDF"`` gives one page per grid of codes; ``fmt="PNG"`` stacks the pages into one
+    tall image.  Captions may contain newlines.
+    """
+    pngs = render_png_batch([payload for payload, _ in items], workers)
+    cols, rows = SHEET_GRID
+    page_w, page_h = SHEET_PAGE_SIZE
+    cell_w = (page_w - 2 * SHEET_MARGIN) // cols
+    cell_h = (page_h - 2 * SHEET_MARGIN) // rows
+    qr_size = min(cell_w - 20, cell_h - 110)
+    font = _sheet_font(20)
+
+    pages = []
+    per_page = cols * rows
+    for first in range(0, max(len(items), 1), per_page):
+        page = Image.new("RGB", SHEET_PAGE_SIZE, "white")
+        draw = ImageDraw.Draw(page)
+        for slot, index in enumerate(range(first, min(first + per_page, len(items)))):
+            x = SHEET_MARGIN + (slot % cols) * cell_w
+            y = SHEET_MARGIN + (slot // cols) * cell_h
+            code = Image.open(io.BytesIO(pngs[index])).convert("RGB").resize((qr_size, qr_size), Image.NEAREST)
+            page.paste(code, (x + (cell_w - qr_size) // 2, y))
+            draw.multiline_text((x + 10, y + qr_size + 8), items[index][1], fill="black", font=font, spacing=4)
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    if fmt.upper() == "PDF":
+        pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    else:
+        sheet = Image.new("RGB", (page_w, page_h * len(pages)), "white")
+        for i, page in enumerate(pages):
+            sheet.paste(page, (0, i * page_h))
+        sheet.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -1,4 +1,7 @@
 import hashlib
+import hmac
+import time
+from typing import Optional
 
 
 def hash_password(password: str) -> str:
@@ -7,3 +10,58 @@ def hash_password(password: str) -> str:
 
 def verify_password(password: str, password_hash: str) -> bool:
     return hash_password(password) == password_hash
+
+
+def token_window(period_sec: int, now: Optional[float] = None) -> int:
+    """Index of the ``period_sec``-long window containing ``now`` (epoch seconds)."""
+    return int((time.time() if now is None else now) // period_sec)
+
+
+def _token_mac(secret: str, session_id: str, window: int) -> str:
+    message = f"{session_id}:{window}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()[:16]
+
+
+def sign_session_token(secret: str, session_id: str, period_sec: int, now: Optional[float] = None) -> str:
+    """Short-lived token for a rotating QR code: ``<window hex>.<truncated HMAC-SHA256>``."""
+    window = token_window(period_sec, now)
+    return f"{window:x}.{_token_mac(secret, session_id, window)}"
+
+
+def verify_session_token(
+    secret: str,
+    session_id: str,
+    token: str,
+    period_sec: int,
+    grace_windows: int = 1,
+    now: Optional[float] = None,
+) -> bool:
+    """Check ``token`` without any stored state.
+
+    Tokens from the current window and the ``grace_windows`` before it are accepted, so a
+    code scanned just before it rotated still works.
+    """
+    try:
+        window_hex, mac = token.split(".", 1)
+        window = int(window_hex, 16)
+    except (AttributeError, ValueError):
+        return False
+    current = token_window(period_sec, now)
+    if not current - grace_windows <= window <= current:
+        return False
+    return hmac.compare_digest(mac, _token_mac(secret, session_id, window))
+
+
+def sign_value(secret: str, value: str) -> str:
+    """``<value>.<HMAC-SHA256>`` for a value handed to the browser and read back later."""
+    mac = hmac.new(secret.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{value}.{mac}"
+
+
+def unsign_value(secret: str, token: str) -> Optional[str]:
+    """The value inside a :func:`sign_value` token, or ``None`` if it was altered."""
+    value, _, mac = (token or "").rpartition(".")
+    if not value:
+        return None
+    expected = hmac.new(secret.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return value if hmac.compare_digest(mac, expected) else None
@@ -0,0 +1,419 @@
+"""Optional sharding of attendance and feedback into per-term or per-department files.
+
+SQLite takes one write lock per file, so with every mark in ``smart_campus.db`` all
+lectures queue behind each other.  With ``SMART_CAMPUS_SHARDING=term`` (or
+``department``) the rows of :data:`SHARDED_TABLES` live in ``data/shards/<name>-<key>.db``
+instead, keyed by the lecture the row belongs to: its academic term, or its teacher's
+department (which must then not change once their marks are sharded).  Lectures, users
+and everything else stay in the campus database, which every shard connection ATTACHes
+as ``campus``; unqualified table names resolve to the shard's own tables first, so the
+service functions run unchanged on either kind of connection.
+
+* :func:`route_session` returns the connection that owns one lecture's rows (the campus
+  connection itself when sharding is off);
+* :func:`fan_out` calls a read function on the campus connection and on every shard and
+  returns the per-database results for the caller to merge (:func:`merge_counts`,
+  :func:`concat`).
+
+Not shard-aware yet; each of these sees only the rows still in the campus tables unless
+noted:
+
+* :mod:`services.retention` archives only campus ``attendance`` rows;
+* :func:`services.anomalies.scan` reads only campus marks, so sharded marks are never
+  flagged;
+* the travel check's cache (:data:`services.anomalies.last_positions`) only sees the
+  shard the current lecture writes to, so a journey between two shards is not flagged;
+* the "Attendance" CSV export (:func:`modules.analytics.render_exports`) is a plain
+  ``SELECT`` on the campus database.
+
+Overrides (:func:`services.attendance.override_listed`), teacher session counts and the
+recent-marks lists do cover every shard.
+
+Row ids are only unique within a file.  A new shard's ids start above the campus ids, so
+rows moved by ``split`` keep theirs (``attendance_flags`` refer to them).  Existing rows
+are moved into shards with::
+
+    SMART_CAMPUS_SHARDING=term python -m core.shards split
+    python -m core.shards status
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.backends import SQLiteBackend
+from core.db import DB_PATH
+
+SHARDING_ENV = "SMART_CAMPUS_SHARDING"
+SHARD_MODES = ("term", "department")
+SHARDED_TABLES = ("attendance", "feedback")
+CAMPUS_SCHEMA = "campus"
+# Fixed term boundaries: a shard key must never change once rows are written under it.
+TERM_START_MONTHS = (1, 7)
+FAN_OUT_WORKERS = 4
+# Idle connections kept per shard file; at least FAN_OUT_WORKERS so fan-outs reuse them.
+POOL_IDLE_PER_SHARD = 4
+SPLIT_BATCH_SIZE = 5000
+# Present in the shard directory while split() runs (or after it crashed); see split_running.
+SPLIT_MARKER = ".split-running"
+
+
+def sharding_mode() -> str:
+    mode = os.environ.get(SHARDING_ENV, "").strip().lower()
+    if mode and mode not in SHARD_MODES:
+        raise ValueError(f"{SHARDING_ENV} must be one of {', '.join(SHARD_MODES)} (got {mode!r})")
+    return mode
+
+
+def term_key(start_time: str) -> str:
+    """``2026t1`` for a lecture starting in the first term of 2026, and so on."""
+    year, month = int(start_time[:4]), int(start_time[5:7])
+    index = sum(1 for start in TERM_START_MONTHS if start <= month)
+    return f"{year}t{index}"
+
+
+def department_key(department: Optional[str]) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", (department or "").strip().lower()).strip("-")
+    return slug or "general"
+
+
+class ShardRouter:
+    """Maps lectures to shard files and pools connections to them.
+
+    A thread keeps the connection :meth:`connection` gave it for each shard while it runs
+    (Streamlit starts a thread per script run).  Connections of finished threads, and those
+    released after a fan-out read (:meth:`release`), go back to a pool of at most
+    :data:`POOL_IDLE_PER_SHARD` per shard, and the rest are closed.
+    """
+
+    def __init__(self, db_path=None, mode: Optional[str] = None):
+        self.db_file = Path(db_path or DB_PATH).resolve()
+        self.mode = mode or sharding_mode() or "term"
+        self.shard_dir = self.db_file.parent / "shards"
+        self._keys: Dict[str, str] = {}
+        self._ready: set = set()
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._idle: Dict[str, List] = {}
+        # thread ident -> (thread, {shard key: connection})
+        self._owned: Dict[int, tuple] = {}
+
+    def path(self, key: str) -> Path:
+        return self.shard_dir / f"{self.db_file.stem}-{key}{self.db_file.suffix}"
+
+    def keys(self) -> List[str]:
+        prefix = f"{self.db_file.stem}-"
+        return sorted(p.stem[len(prefix):] for p in self.shard_dir.glob(f"{prefix}*{self.db_file.suffix}"))
+
+    def key_for_lecture(self, start_time: str, department: Optional[str]) -> str:
+        return term_key(start_time) if self.mode == "term" else department_key(department)
+
+    def key_for_session(self, conn, session_id: str) -> Optional[str]:
+        """The shard of a lecture, looked up once in the campus database; ``None`` if unknown."""
+        key = self._keys.get(session_id)
+        if key is None:
+            row = conn.execute(
+                """
+                SELECT l.start_time, u.department FROM lectures l LEFT JOIN users u ON u.id = l.teacher_id
+                WHERE l.session_id = ?
+                """,
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            key = self._keys[session_id] = self.key_for_lecture(row[0], row[1])
+        return key
+
+    def _ensure_schema(self, conn, key: str):
+        # The shard tables and indexes are created from the campus database's own DDL.
+        with self._lock:
+            if key in self._ready:
+                return
+            statements = conn.execute(
+                f"""
+                SELECT sql FROM {CAMPUS_SCHEMA}.sqlite_master
+                WHERE tbl_name IN ({', '.join('?' * len(SHARDED_TABLES))}) AND sql IS NOT NULL
+                ORDER BY type = 'index'
+                """,
+                SHARDED_TABLES,
+            ).fetchall()
+            for (sql,) in statements:
+                conn.execute(re.sub(r"^CREATE (TABLE|INDEX) ", r"CREATE \1 IF NOT EXISTS ", sql))
+            for table in SHARDED_TABLES:
+                self._align_sequence(conn, table)
+            conn.commit()
+            self._ready.add(key)
+
+    @staticmethod
+    def _align_sequence(conn, table: str):
+        # New shard rows get ids above every campus id, so split() can keep the campus ids
+        # (attendance_flags refer to them) without colliding with marks written since.
+        row = conn.execute(f"SELECT seq FROM {CAMPUS_SCHEMA}.sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        campus_seq = row[0] if row else 0
+        row = conn.execute("SELECT seq FROM main.sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        if row is None:
+            conn.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)", (table, campus_seq))
+        elif row[0] < campus_seq:
+            conn.execute("UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?", (campus_seq, table))
+
+    def open(self, key: str):
+        """A new connection to shard ``key`` with the campus database attached; caller closes it.
+
+        It may be handed between threads (never used by two at once), as the pool does.
+        """
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        conn = SQLiteBackend(self.path(key)).connect(check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"ATTACH DATABASE ? AS {CAMPUS_SCHEMA}", (str(self.db_file),))
+        conn.shard_key = key
+        conn.campus_path = str(self.db_file)
+        self._ensure_schema(conn, key)
+        return conn
+
+    def acquire(self, key: str):
+        """A pooled connection to shard ``key``; hand it back with :meth:`release`."""
+        with self._pool_lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return self.open(key)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._pool_lock:
+            idle = self._idle.setdefault(conn.shard_key, [])
+            if len(idle) < POOL_IDLE_PER_SHARD:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _reap(self):
+        # Connections of threads that have finished (earlier script runs) return to the pool.
+        with self._pool_lock:
+            finished = [ident for ident, (thread, _) in self._owned.items() if not thread.is_alive()]
+            conns = [conn for ident in finished for conn in self._owned.pop(ident)[1].values()]
+        for conn in conns:
+            self.release(conn)
+
+    def connection(self, key: str):
+        """This thread's connection to shard ``key``, kept until the thread ends."""
+        thread = threading.current_thread()
+        owned = self._owned.get(thread.ident)
+        if owned is not None and owned[0] is thread and key in owned[1]:
+            return owned[1][key]
+        self._reap()
+        conn = self.acquire(key)
+        with self._pool_lock:
+            owned = self._owned.get(thread.ident)
+            if owned is None or owned[0] is not thread:
+                owned = self._owned[thread.ident] = (thread, {})
+            owned[1][key] = conn
+        return conn
+
+    def close(self):
+        """Close every pooled and thread-held connection."""
+        with self._pool_lock:
+            conns = [conn for idle in self._idle.values() for conn in idle]
+            conns += [conn for _, held in self._owned.values() for conn in held.values()]
+            self._idle.clear()
+            self._owned.clear()
+        for conn in conns:
+            conn.close()
+
+
+_routers: Dict[str, ShardRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def router_for(conn) -> Optional[ShardRouter]:
+    """The router for the campus database behind ``conn``, or ``None`` when sharding is off."""
+    mode = sharding_mode()
+    if not mode or getattr(conn, "shard_key", None):
+        return None
+    key = str(Path(getattr(conn, "db_path", "") or DB_PATH).resolve())
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None or router.mode != mode:
+            if router is not None:
+                router.close()
+            router = _routers[key] = ShardRouter(key, mode)
+    return router
+
+
+def route_session(conn, session_id: str):
+    """The connection holding ``session_id``'s attendance and feedback rows."""
+    router = router_for(conn)
+    if router is None or not session_id:
+        return conn
+    key = router.key_for_session(conn, session_id)
+    if key is None:
+        return conn
+    return router.connection(key)
+
+
+def shard_connection(conn, key: Optional[str]):
+    """The connection for a row's ``shard_key`` (``""`` for the campus database itself).
+
+    Row ids are only unique within one file, so a row listed by a fan-out read is written
+    back through the connection it was read from, not the one its lecture routes to.
+    """
+    if not key:
+        return conn
+    router = router_for(conn)
+    if router is None:
+        raise ValueError(f"Shard {key!r} requested but {SHARDING_ENV} is not set")
+    return router.connection(key)
+
+
+def split_running(conn) -> bool:
+    """Whether :func:`split` may still hold rows of the shard behind ``conn`` in the campus tables."""
+    if not getattr(conn, "shard_key", ""):
+        return False
+    return (Path(conn.db_path).parent / SPLIT_MARKER).exists()
+
+
+def fan_out(conn, fn: Callable, *args, **kwargs) -> List:
+    """``fn(conn, ...)`` on the campus connection followed by every shard, in key order.
+
+    Shards are queried from a small thread pool, each on its own connection (SQLite
+    releases the GIL while it reads).  Rows still in the campus tables (written before
+    sharding was switched on, or not yet split) are included by the first call.
+    """
+    results = [fn(conn, *args, **kwargs)]
+    router = router_for(conn)
+    if router is None:
+        return results
+    keys = router.keys()
+    if not keys:
+        return results
+
+    def _run(key: str):
+        shard = router.acquire(key)
+        try:
+            return fn(shard, *args, **kwargs)
+        finally:
+            router.release(shard)
+
+    with ThreadPoolExecutor(max_workers=min(FAN_OUT_WORKERS, len(keys))) as pool:
+        results.extend(pool.map(_run, keys))
+    return results
+
+
+def merge_counts(results: Iterable[Dict]) -> Dict:
+    merged: Dict = {}
+    for counts in results:
+        for key, value in counts.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def concat(results: Iterable[List]) -> List:
+    return [row for rows in results for row in rows]
+
+
+def split(conn, router: ShardRouter, batch_size: int = SPLIT_BATCH_SIZE) -> Dict[str, Tuple[int, int]]:
+    """Move campus rows of :data:`SHARDED_TABLES` into their shards.
+
+    Returns ``(moved, kept)`` per shard.  A campus row whose id or ``(session_id,
+    enrollment)`` is already taken in the shard is kept in the campus table, not dropped;
+    ``status`` lists what is left to resolve by hand.  While it runs, :data:`SPLIT_MARKER`
+    in the shard directory makes :func:`services.attendance.mark` look for an existing
+    mark in the campus table too (:func:`split_running`).
+    """
+    lectures = conn.execute(
+        "SELECT l.session_id, l.start_time, u.department FROM lectures l LEFT JOIN users u ON u.id = l.teacher_id"
+    ).fetchall()
+    by_key: Dict[str, List[str]] = {}
+    for session_id, start_time, department in lectures:
+        by_key.setdefault(router.key_for_lecture(start_time, department), []).append(session_id)
+
+    result: Dict[str, Tuple[int, int]] = {}
+    router.shard_dir.mkdir(parents=True, exist_ok=True)
+    marker = router.shard_dir / SPLIT_MARKER
+    marker.touch()
+    try:
+        for key, session_ids in by_key.items():
+            result[key] = _split_shard(router, key, session_ids, batch_size)
+    finally:
+        marker.unlink(missing_ok=True)
+    return result
+
+
+def _split_shard(router: ShardRouter, key: str, session_ids: List[str], batch_size: int) -> Tuple[int, int]:
+    shard = router.open(key)
+    moved = kept = 0
+    try:
+        for table in SHARDED_TABLES:
+            names = ", ".join(row[1] for row in shard.execute(f"PRAGMA main.table_info({table})"))
+            for i in range(0, len(session_ids), batch_size):
+                chunk = session_ids[i:i + batch_size]
+                marks = ", ".join("?" * len(chunk))
+                try:
+                    # Both files are locked up front, in the order mark() takes them.
+                    shard.execute("BEGIN IMMEDIATE")
+                    # Ids are kept, so a batch interrupted between the files is simply redone;
+                    # only the rows that landed in the shard leave the campus table.
+                    landed = shard.execute(
+                        f"INSERT INTO main.{table} ({names}) "
+                        f"SELECT {names} FROM {CAMPUS_SCHEMA}.{table} WHERE session_id IN ({marks}) "
+                        "ON CONFLICT DO NOTHING RETURNING id",
+                        chunk,
+                    ).fetchall()
+                    shard.executemany(f"DELETE FROM {CAMPUS_SCHEMA}.{table} WHERE id = ?", landed)
+                    remaining = shard.execute(
+                        f"SELECT COUNT(*) FROM {CAMPUS_SCHEMA}.{table} WHERE session_id IN ({marks})", chunk
+                    ).fetchone()[0]
+                    shard.commit()
+                except sqlite3.Error:
+                    shard.rollback()
+                    raise
+                moved += len(landed)
+                kept += remaining
+    finally:
+        shard.close()
+    return moved, kept
+
+
+def main(argv=None):
+    from core.db import init_db
+
+    parser = argparse.ArgumentParser(description="Split attendance and feedback into shard databases.")
+    parser.add_argument("command", choices=["status", "split"])
+    parser.add_argument("--mode", choices=SHARD_MODES, help=f"Shard key (default: ${SHARDING_ENV} or term)")
+    parser.add_argument("--db", help="Campus database path (defaults to the app database)")
+    args = parser.parse_args(argv)
+
+    conn = init_db(args.db)
+    router = ShardRouter(args.db, args.mode)
+    try:
+        if args.command == "split":
+            for key, (moved, kept) in sorted(split(conn, router).items()):
+                conflicts = f", {kept:,} kept in the campus database (id or mark already in the shard)" if kept else ""
+                print(f"{key}: moved {moved:,} row(s){conflicts}")
+        for key in router.keys():
+            shard = router.open(key)
+            try:
+                counts = ", ".join(
+                    f"{table}={shard.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]:,}"
+                    for table in SHARDED_TABLES
+                )
+            finally:
+                shard.close()
+            print(f"{router.path(key)}: {counts}")
+        campus = ", ".join(
+            f"{table}={conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:,}" for table in SHARDED_TABLES
+        )
+        print(f"{router.db_file} (unsharded rows): {campus}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Login sessions and per-session values kept outside the Streamlit process.
+
+``st.session_state`` lives in the process that holds the browser's websocket, so a
+reconnect routed to another replica (or a restart) loses the login, the captured GPS fix,
+the teacher's current QR and the "already submitted" lock.  The pieces that must survive
+are kept in a :class:`StateStore` instead, keyed by a random session id:
+
+* :class:`DatabaseStateStore` (default) - the ``app_sessions`` and ``app_session_values``
+  tables of the configured database (:func:`core.db.get_db`), shared by every process;
+* :class:`MemoryStateStore` - a dict in this process, for a single-process deployment.
+
+``SMART_CAMPUS_STATE_STORE`` picks one by name from :data:`STATE_STORES`, where other
+stores can be registered.  The browser holds the session id signed with the app's key
+(:func:`services.sessions.start`), so a tampered or guessed token is rejected before
+any lookup.  Values are JSON.
+
+Only this state is shared.  Each process still keeps its own caches, and several
+replicas see each other's writes only once these expire:
+
+* :data:`core.cache.query_cache` - read results, up to their TTL (300 s by default);
+* :func:`services.lectures.lookup_lecture` - lecture rows, up to four hours;
+* :data:`services.active_sessions` - the marks of running lectures (another replica's
+  mark is still caught by the table's unique key, see :func:`services.attendance.mark`).
+
+There is no cross-process invalidation, so run one replica, or accept that notices,
+timetables and settings edited on one replica can appear late on the others.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.utils import now_iso
+
+STATE_STORE_ENV = "SMART_CAMPUS_STATE_STORE"
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    sid: str
+    user_id: int
+    # Unix seconds.
+    expires_at: int
+
+
+class StateStore:
+    """Sessions (``sid -> user``) and their values; every method takes the caller's connection."""
+
+    def create(self, conn, sid: str, user_id: int, expires_at: int):
+        raise NotImplementedError
+
+    def load(self, conn, sid: str, now: Optional[float] = None) -> Optional[SessionRecord]:
+        """The session if it exists and has not expired."""
+        raise NotImplementedError
+
+    def extend(self, conn, sid: str, expires_at: int):
+        raise NotImplementedError
+
+    def delete(self, conn, sid: str):
+        """End the session and drop its values."""
+        raise NotImplementedError
+
+    def purge(self, conn, now: Optional[float] = None) -> int:
+        """Delete expired sessions; returns how many."""
+        raise NotImplementedError
+
+    def get(self, conn, sid: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, conn, sid: str, key: str, value: Any):
+        raise NotImplementedError
+
+    def pop(self, conn, sid: str, key: str):
+        raise NotImplementedError
+
+
+class DatabaseStateStore(StateStore):
+    """Sessions in the app database; one row per value, so concurrent tabs don't overwrite each other."""
+
+    def create(self, conn, sid: str, user_id: int, expires_at: int):
+        conn.execute(
+            "INSERT INTO app_sessions (sid, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (sid, user_id, now_iso(), expires_at),
+        )
+        conn.commit()
+
+    def load(self, conn, sid: str, now: Optional[float] = None) -> Optional[SessionRecord]:
+        row = conn.execute(
+            "SELECT sid, user_id, expires_at FROM app_sessions WHERE sid = ? AND expires_at > ?",
+            (sid, int(time.time() if now is None else now)),
+        ).fetchone()
+        return SessionRecord(row[0], row[1], row[2]) if row else None
+
+    def extend(self, conn, sid: str, expires_at: int):
+        conn.execute("UPDATE app_sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+        conn.commit()
+
+    def delete(self, conn, sid: str):
+        conn.execute("DELETE FROM app_session_values WHERE sid = ?", (sid,))
+        conn.execute("DELETE FROM app_sessions WHERE sid = ?", (sid,))
+        conn.commit()
+
+    def purge(self, conn, now: Optional[float] = None) -> int:
+        cutoff = int(time.time() if now is None else now)
+        conn.execute(
+            "DELETE FROM app_session_values WHERE sid IN (SELECT sid FROM app_sessions WHERE expires_at <= ?)",
+            (cutoff,),
+        )
+        count = conn.execute("DELETE FROM app_sessions WHERE expires_at <= ?", (cutoff,)).rowcount
+        conn.commit()
+        return count
+
+    def get(self, conn, sid: str, key: str, default: Any = None) -> Any:
+        row = conn.execute(
+            "SELECT value FROM app_session_values WHERE sid = ? AND key = ?", (sid, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, conn, sid: str, key: str, value: Any):
+        conn.execute(
+            """
+            INSERT INTO app_session_values (sid, key, value) VALUES (?, ?, ?)
+            ON CONFLICT(sid, key) DO UPDATE SET value = excluded.value
+            """,
+            (sid, key, json.dumps(value)),
+        )
+        conn.commit()
+
+    def pop(self, conn, sid: str, key: str):
+        conn.execute("DELETE FROM app_session_values WHERE sid = ? AND key = ?", (sid, key))
+        conn.commit()
+
+
+class MemoryStateStore(StateStore):
+    """Sessions in this process only: they do not survive a restart or reach other replicas."""
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionRecord] = {}
+        self._values: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def create(self, conn, sid: str, user_id: int, expires_at: int):
+        with self._lock:
+            self._sessions[sid] = SessionRecord(sid, user_id, expires_at)
+
+    def load(self, conn, sid: str, now: Optional[float] = None) -> Optional[SessionRecord]:
+        record = self._sessions.get(sid)
+        if record is None or record.expires_at <= (time.time() if now is None else now):
+            return None
+        return record
+
+    def extend(self, conn, sid: str, expires_at: int):
+        with self._lock:
+            record = self._sessions.get(sid)
+            if record is not None:
+                self._sessions[sid] = SessionRecord(sid, record.user_id, expires_at)
+
+    def delete(self, conn, sid: str):
+        with self._lock:
+            self._sessions.pop(sid, None)
+            for key in [key for key in self._values if key[0] == sid]:
+                del self._values[key]
+
+    def purge(self, conn, now: Optional[float] = None) -> int:
+        cutoff = time.time() if now is None else now
+        expired = [sid for sid, record in self._sessions.items() if record.expires_at <= cutoff]
+        for sid in expired:
+            self.delete(conn, sid)
+        return len(expired)
+
+    def get(self, conn, sid: str, key: str, default: Any = None) -> Any:
+        value = self._values.get((sid, key))
+        return json.loads(value) if value is not None else default
+
+    def set(self, conn, sid: str, key: str, value: Any):
+        # Stored as JSON like the database store, so both hand back the same types.
+        with self._lock:
+            self._values[(sid, key)] = json.dumps(value)
+
+    def pop(self, conn, sid: str, key: str):
+        with self._lock:
+            self._values.pop((sid, key), None)
+
+
+STATE_STORES: Dict[str, Callable[[], StateStore]] = {
+    "database": DatabaseStateStore,
+    "memory": MemoryStateStore,
+}
+
+_stores: Dict[str, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def state_store() -> StateStore:
+    """The process's store, chosen by ``SMART_CAMPUS_STATE_STORE`` (default ``database``)."""
+    name = os.environ.get(STATE_STORE_ENV, "").strip().lower() or "database"
+    if name not in STATE_STORES:
+        raise ValueError(f"{STATE_STORE_ENV} must be one of {', '.join(STATE_STORES)} (got {name!r})")
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = STATE_STORES[name]()
+    return store
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import calendar
+from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
 from math import radians, sin, cos, sqrt, atan2
 from pathlib import Path
@@ -15,6 +16,8 @@ QR_DIR = DATA_DIR / "qr"
 
 APP_TZ = ZoneInfo("Asia/Kolkata")
 
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
 
 def ensure_dirs():
     UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
@@ -33,6 +36,16 @@ def now_local() -> datetime:
     return datetime.now(APP_TZ).replace(tzinfo=None)
 
 
+def local_epoch(value) -> int:
+    """Seconds since 1970-01-01 of a naive local time, as SQLite's ``strftime('%s', ...)``
+    reads the stored ISO text (see ``core.db.EPOCH_COLUMNS``)."""
+    if isinstance(value, str):
+        value = parse_iso(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    return calendar.timegm(value.timetuple())
+
+
 def parse_iso(value: str) -> datetime:
     dt = datetime.fromisoformat(value)
     if dt.tzinfo is not None:
@@ -44,6 +57,29 @@ def add_minutes(value: datetime, minutes: int) -> datetime:
     return value + timedelta(minutes=minutes)
 
 
+def parse_time_range(value: str) -> Tuple[time, time]:
+    """Parse a schedule slot such as ``"10:00-11:00"`` (spaces and en dashes allowed)."""
+    parts = str(value).replace("–", "-").split("-")
+    if len(parts) != 2:
+        raise ValueError(f"Invalid time range: {value!r}")
+    start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in parts)
+    if end <= start:
+        raise ValueError(f"Time range ends before it starts: {value!r}")
+    return start, end
+
+
+def time_range_minutes(value: str) -> Tuple[int, int]:
+    """``"10:00-11:00"`` -> minutes after midnight ``(600, 660)``."""
+    start, end = parse_time_range(value)
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def schedule_slot(day: str, time_range: str) -> Tuple[int, int, int]:
+    """Structured ``(weekday, start_min, end_min)`` for a schedule row; raises ``ValueError``."""
+    start_min, end_min = time_range_minutes(time_range)
+    return WEEKDAYS.index(str(day).strip()[:3].title()), start_min, end_min
+
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     r = 6371000.0
     dlat = radians(lat2 - lat1)
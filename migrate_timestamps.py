@@ -1,10 +1,30 @@
+"""Convert stored timestamps from naive UTC to naive local (Asia/Kolkata) time.
+
+Tables are walked in primary-key order one chunk at a time: each chunk is converted with
+pandas, written with ``executemany`` and committed together with its checkpoint in
+``migration_checkpoints``, so an interrupted run resumes where it stopped and a finished
+table is never shifted twice.  Memory use is bounded by ``--chunk-size``.
+
+Usage::
+
+    python migrate_timestamps.py                 # dry run: count and sample changes
+    python migrate_timestamps.py --apply         # convert, resuming from checkpoints
+    python migrate_timestamps.py --apply --restart
+"""
 import argparse
 import sqlite3
-from datetime import datetime, timezone
+import time
 from zoneinfo import ZoneInfo
 
-from core.db import DB_PATH
+import pandas as pd
+
+from core.db import EPOCH_COLUMNS, ensure_epoch_columns, get_db
+from core.utils import now_iso
+
 APP_TZ = ZoneInfo("Asia/Kolkata")
+MIGRATION = "timestamps_to_ist"
+DEFAULT_CHUNK_SIZE = 10_000
+PROGRESS_INTERVAL_SEC = 2.0
 
 TABLES = [
     ("users", "id", ["created_at"]),
@@ -22,54 +42,178 @@ TABLES = [
 ]
 
 
-def _convert_to_ist(value: str) -> str | None:
-    if not value:
-        return None
-    try:
-        dt = datetime.fromisoformat(value)
-    except ValueError:
-        return None
-
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    dt = dt.astimezone(APP_TZ).replace(tzinfo=None)
-    return dt.isoformat()
-
-
-def main(apply: bool):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    total_updates = 0
-
-    for table, pk, cols in TABLES:
-        columns = ", ".join([pk] + cols)
-        rows = conn.execute(f"SELECT {columns} FROM {table}").fetchall()
-        for row in rows:
-            updates = {}
-            for col in cols:
-                new_value = _convert_to_ist(row[col])
-                if new_value and new_value != row[col]:
-                    updates[col] = new_value
-            if updates:
-                total_updates += 1
-                if apply:
-                    set_clause = ", ".join([f"{c} = ?" for c in updates.keys()])
-                    values = list(updates.values()) + [row[pk]]
-                    conn.execute(f"UPDATE {table} SET {set_clause} WHERE {pk} = ?", values)
-                else:
-                    print(f"{table}.{row[pk]} -> {updates}")
+def _ensure_checkpoints(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            migration TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            last_key,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            finished INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (migration, table_name)
+        )
+        """
+    )
+    conn.commit()
+
+
+def _load_checkpoint(conn, table: str):
+    row = conn.execute(
+        "SELECT last_key, rows_done, finished FROM migration_checkpoints WHERE migration = ? AND table_name = ?",
+        (MIGRATION, table),
+    ).fetchone()
+    return (row[0], row[1], bool(row[2])) if row else (None, 0, False)
+
+
+def _save_checkpoint(conn, table: str, last_key, rows_done: int, finished: bool):
+    conn.execute(
+        """
+        INSERT INTO migration_checkpoints (migration, table_name, last_key, rows_done, finished, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(migration, table_name) DO UPDATE SET
+            last_key = excluded.last_key, rows_done = excluded.rows_done,
+            finished = excluded.finished, updated_at = excluded.updated_at
+        """,
+        (MIGRATION, table, last_key, rows_done, int(finished), now_iso()),
+    )
+
+
+def _to_ist(values: pd.Series) -> pd.Series:
+    """Vectorised ``datetime.fromisoformat(v)`` -> IST ``isoformat()``; naive values are UTC.
+
+    Unparseable and empty values map to ``None`` (left unchanged).
+    """
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True)
+    local = parsed.dt.tz_convert(APP_TZ).dt.tz_localize(None)
+    text = local.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    # isoformat() only prints microseconds when there are some.
+    micro = local.dt.microsecond.fillna(0) != 0
+    text = text.where(~micro, text + "." + local.dt.strftime("%f"))
+    return text.where(parsed.notna(), None)
+
+
+def _convert_chunk(chunk: pd.DataFrame, pk: str, cols):
+    """``(new values..., pk)`` parameter rows for the rows in ``chunk`` that change."""
+    new = pd.DataFrame({col: _to_ist(chunk[col]) for col in cols})
+    # A column keeps its old value where it cannot be converted.
+    changed = pd.Series(False, index=chunk.index)
+    for col in cols:
+        differs = new[col].notna() & (new[col] != chunk[col])
+        changed |= differs
+        new[col] = new[col].where(new[col].notna(), chunk[col])
+    new[pk] = chunk[pk]
+    updates = new.loc[changed, cols + [pk]].astype(object)
+    # NULL columns come back as NaN; bind (and print) them as NULL again.
+    updates = updates.where(updates.notna(), None)
+    return list(updates.itertuples(index=False, name=None))
+
 
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def migrate_table(conn, table: str, pk: str, cols, chunk_size: int, apply: bool, restart: bool, show: int) -> int:
+    """Convert one table; returns the number of rows changed (or that would change)."""
+    last_key, rows_done, finished = (None, 0, False) if restart else _load_checkpoint(conn, table)
+    if finished:
+        print(f"{table}: already converted ({rows_done:,} rows), skipping")
+        return 0
+
+    select = f"SELECT {', '.join([pk] + cols)} FROM {table}"
+    set_clause = ", ".join(f"{col} = ?" for col in cols)
+    total_changed = 0
+    started = last_report = time.perf_counter()
+    scanned = 0
+    while True:
+        if last_key is None:
+            cursor = conn.execute(f"{select} ORDER BY {pk} LIMIT ?", (chunk_size,))
+        else:
+            cursor = conn.execute(f"{select} WHERE {pk} > ? ORDER BY {pk} LIMIT ?", (last_key, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        chunk = pd.DataFrame.from_records(rows, columns=[pk] + cols)
+        updates = _convert_chunk(chunk, pk, cols)
+        last_key = rows[-1][0]
+        scanned += len(rows)
+        rows_done += len(rows)
+        total_changed += len(updates)
+
+        if apply:
+            conn.executemany(f"UPDATE {table} SET {set_clause} WHERE {pk} = ?", updates)
+            _save_checkpoint(conn, table, last_key, rows_done, finished=False)
+            conn.commit()
+        else:
+            for params in updates[: max(show - (total_changed - len(updates)), 0)]:
+                print(f"{table}.{params[-1]} -> {dict(zip(cols, params[:-1]))}")
+
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL_SEC:
+            print(f"  {table}: {rows_done:,} rows ({scanned / (now - started):,.0f} rows/s)")
+            last_report = now
+
+    elapsed = time.perf_counter() - started
     if apply:
+        _save_checkpoint(conn, table, last_key, rows_done, finished=True)
         conn.commit()
-        print(f"Updated rows: {total_updates}")
-    else:
-        print(f"Dry run complete. Rows that would update: {total_updates}")
+    rate = f"{scanned / elapsed:,.0f} rows/s" if elapsed > 0 and scanned else "-"
+    print(f"{table}: {scanned:,} rows scanned, {total_changed:,} {'updated' if apply else 'to update'} ({rate})")
+    return total_changed
 
-    conn.close()
 
+def _report_unreadable(conn):
+    # Values SQLite cannot read as a time get a NULL epoch and drop out of range filters.
+    for table, source, column in EPOCH_COLUMNS:
+        try:
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {source} IS NOT NULL AND strftime('%s', {source}) IS NULL"
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            continue
+        if count:
+            print(f"{table}.{source}: {count} value(s) unreadable as a timestamp ({column} will be NULL)")
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert stored UTC timestamps to local time in chunks.")
     parser.add_argument("--apply", action="store_true", help="Apply updates to the database")
-    args = parser.parse_args()
-    main(args.apply)
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and convert every table again")
+    parser.add_argument("--tables", nargs="*", help="Only these tables")
+    parser.add_argument("--show", type=int, default=5, help="Sample changes printed per table in a dry run")
+    args = parser.parse_args(argv)
+
+    conn = get_db(args.db)
+    try:
+        if args.apply:
+            _ensure_checkpoints(conn)
+        elif not _table_exists(conn, "migration_checkpoints"):
+            args.restart = True  # nothing to resume from
+
+        total_updates = 0
+        started = time.perf_counter()
+        for table, pk, cols in TABLES:
+            if args.tables and table not in args.tables:
+                continue
+            if not _table_exists(conn, table):
+                continue
+            total_updates += migrate_table(conn, table, pk, cols, args.chunk_size, args.apply, args.restart, args.show)
+        elapsed = time.perf_counter() - started
+
+        if args.apply:
+            print(f"Updated rows: {total_updates} ({elapsed:.1f}s)")
+            ensure_epoch_columns(conn)
+            print("Epoch columns and indexes in place.")
+        else:
+            print(f"Dry run complete. Rows that would update: {total_updates} ({elapsed:.1f}s)")
+
+        _report_unreadable(conn)
+    finally:
+        # An interrupted chunk is rolled back here; its checkpoint was not committed either.
+        conn.close()
+
+if __name__ == "__main__":
+    main()
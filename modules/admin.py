@@ -1,7 +1,11 @@
 import streamlit as st
 
 from core.security import hash_password
-from core.utils import now_iso
+from services import attendance as attendance_service
+from services import events as event_service
+from services import issues as issue_service
+from services import lectures as lecture_service
+from services import users as user_service
 
 
 def render_admin_dashboard(conn, user):
@@ -12,33 +16,19 @@ def render_admin_dashboard(conn, user):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_students = conn.execute(
-            """
-            SELECT COUNT(*)
-            FROM users u
-            JOIN roles r ON u.role_id = r.id
-            WHERE r.name = 'student'
-            """
-        ).fetchone()[0]
+        total_students = user_service.count_by_role(conn, "student")
         st.metric("👨‍🎓 Total Students", total_students)
     
     with col2:
-        total_teachers = conn.execute(
-            """
-            SELECT COUNT(*)
-            FROM users u
-            JOIN roles r ON u.role_id = r.id
-            WHERE r.name = 'teacher'
-            """
-        ).fetchone()[0]
+        total_teachers = user_service.count_by_role(conn, "teacher")
         st.metric("👨‍🏫 Total Teachers", total_teachers)
     
     with col3:
-        total_lectures = conn.execute("SELECT COUNT(*) FROM lectures").fetchone()[0]
+        total_lectures = lecture_service.count_all(conn)
         st.metric("📚 Total Lectures", total_lectures)
     
     with col4:
-        total_attendance = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        total_attendance = attendance_service.count_all(conn)
         st.metric("✅ Attendance Records", total_attendance)
     
     st.markdown("---")
@@ -70,15 +60,7 @@ def render_admin_dashboard(conn, user):
     tab1, tab2, tab3 = st.tabs(["Recent Attendance", "Recent Issues", "Recent Events"])
     
     with tab1:
-        recent_attendance = conn.execute(
-            """
-            SELECT a.enrollment, a.status, a.timestamp, l.subject
-            FROM attendance a
-            LEFT JOIN lectures l ON a.session_id = l.session_id
-            ORDER BY a.timestamp DESC
-            LIMIT 10
-            """
-        ).fetchall()
+        recent_attendance = attendance_service.list_recent_with_subject(conn, limit=10)
         
         if recent_attendance:
             for record in recent_attendance:
@@ -87,9 +69,7 @@ def render_admin_dashboard(conn, user):
             st.info("No recent attendance records")
     
     with tab2:
-        recent_issues = conn.execute(
-            "SELECT title, category, status, created_at FROM issues ORDER BY created_at DESC LIMIT 10"
-        ).fetchall()
+        recent_issues = issue_service.list_recent(conn, limit=10)
         
         if recent_issues:
             for issue in recent_issues:
@@ -98,9 +78,7 @@ def render_admin_dashboard(conn, user):
             st.info("No recent issues")
     
     with tab3:
-        recent_events = conn.execute(
-            "SELECT title, event_date, location FROM events ORDER BY created_at DESC LIMIT 10"
-        ).fetchall()
+        recent_events = event_service.list_recent(conn, limit=10)
         
         if recent_events:
             for event in recent_events:
@@ -135,20 +113,11 @@ def render_user_management(conn, user):
                 st.error("❌ Please fill all required fields.")
                 return
 
-            existing = conn.execute("SELECT id FROM users WHERE enrollment = ?", (enrollment,)).fetchone()
-            if existing:
+            if user_service.enrollment_exists(conn, enrollment):
                 st.warning("⚠️ Enrollment already registered.")
                 return
 
-            role_id = conn.execute("SELECT id FROM roles WHERE name = ?", ("student",)).fetchone()[0]
-            conn.execute(
-                """
-                INSERT INTO users (role_id, name, enrollment, department, year, batch, password_hash, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (role_id, name, enrollment, department, year, batch, hash_password(password), now_iso()),
-            )
-            conn.commit()
+            user_service.create_student(conn, name, enrollment, department, year, batch, hash_password(password))
             st.success(f"✅ Student {name} registered successfully!")
     
     with tab2:
@@ -169,20 +138,11 @@ def render_user_management(conn, user):
                 st.error("❌ Please fill all required fields.")
                 return
 
-            existing = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
-            if existing:
+            if user_service.username_exists(conn, username):
                 st.warning("⚠️ Username already exists.")
                 return
 
-            role_id = conn.execute("SELECT id FROM roles WHERE name = ?", ("teacher",)).fetchone()[0]
-            conn.execute(
-                """
-                INSERT INTO users (role_id, name, username, department, password_hash, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (role_id, name, username, department, hash_password(password), now_iso()),
-            )
-            conn.commit()
+            user_service.create_teacher(conn, name, username, department, hash_password(password))
             st.success(f"✅ Teacher {name} registered successfully!")
     
     with tab3:
@@ -190,22 +150,8 @@ def render_user_management(conn, user):
         
         filter_role = st.selectbox("Filter by Role", ["All", "Students", "Teachers", "Admins"])
         
-        query = """
-            SELECT u.id, u.name, u.enrollment, u.username, u.department, u.year, u.batch, r.name as role, u.created_at
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.id
-        """
-        
-        if filter_role == "Students":
-            query += " WHERE r.name = 'student'"
-        elif filter_role == "Teachers":
-            query += " WHERE r.name = 'teacher'"
-        elif filter_role == "Admins":
-            query += " WHERE r.name = 'admin'"
-        
-        query += " ORDER BY u.created_at DESC"
-        
-        users = conn.execute(query).fetchall()
+        role_filter = {"Students": "student", "Teachers": "teacher", "Admins": "admin"}.get(filter_role)
+        users = user_service.list_users(conn, role_filter)
         
         if users:
             st.write(f"📊 Total Users: {len(users)}")
@@ -219,8 +165,7 @@ def render_user_management(conn, user):
                 with col3:
                     if st.button("🗑️", key=f"del_{u[0]}"):
                         if u[7] != "admin":  # Don't allow deleting admin
-                            conn.execute("DELETE FROM users WHERE id = ?", (u[0],))
-                            conn.commit()
+                            user_service.delete_user(conn, u[0])
                             st.success("Deleted")
                             st.rerun()
                 st.divider()
@@ -229,15 +174,7 @@ def render_user_management(conn, user):
 
         st.markdown("---")
         st.subheader("✏️ Update Student Year/Batch")
-        students = conn.execute(
-            """
-            SELECT u.enrollment, u.name, u.year, u.batch
-            FROM users u
-            JOIN roles r ON u.role_id = r.id
-            WHERE r.name = 'student'
-            ORDER BY u.name
-            """
-        ).fetchall()
+        students = user_service.list_students(conn)
         if students:
             student_options = {
                 f"{s[1]} ({s[0]})": s for s in students if s[0]
@@ -248,11 +185,7 @@ def render_user_management(conn, user):
                 new_year = st.selectbox("Year", [1, 2, 3, 4, 5], index=max((selected[2] or 1) - 1, 0))
                 new_batch = st.selectbox("Batch", [1, 2, 3, 4], index=max((selected[3] or 1) - 1, 0))
                 if st.button("Update Student"):
-                    conn.execute(
-                        "UPDATE users SET year = ?, batch = ? WHERE enrollment = ?",
-                        (new_year, new_batch, selected[0]),
-                    )
-                    conn.commit()
+                    user_service.update_student_cohort(conn, selected[0], new_year, new_batch)
                     st.success("Student updated.")
         else:
             st.info("No students found")
@@ -262,14 +195,7 @@ def render_user_management(conn, user):
         
         if st.button("📥 Export All Students as CSV"):
             import pandas as pd
-            students = conn.execute(
-                """
-                SELECT u.name, u.enrollment, u.department, u.year, u.batch, u.created_at
-                FROM users u
-                JOIN roles r ON u.role_id = r.id
-                WHERE r.name = 'student'
-                """
-            ).fetchall()
+            students = user_service.export_students(conn)
             df = pd.DataFrame(students, columns=["Name", "Enrollment", "Department", "Year", "Batch", "Created"])
             csv = df.to_csv(index=False)
             st.download_button(
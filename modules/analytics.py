@@ -2,7 +2,11 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from core.utils import summarize_counts, to_chart_data
+from core.db import uses_sqlite
+from core.utils import to_chart_data
+from services import attendance as attendance_service
+from services import issues as issue_service
+from services import retention as retention_service
 
 
 def render_analytics(conn):
@@ -14,9 +18,8 @@ def render_analytics(conn):
     ])
 
     with tab1:
-        data = conn.execute("SELECT status FROM attendance").fetchall()
-        if data:
-            summary = summarize_counts([dict(row) for row in data], "status")
+        summary = attendance_service.status_counts(conn)
+        if summary:
             labels, counts = to_chart_data(summary)
             fig, ax = plt.subplots()
             ax.bar(labels, counts)
@@ -26,12 +29,9 @@ def render_analytics(conn):
         else:
             st.info("No attendance data yet.")
     with tab2:
-        data = conn.execute("SELECT category, status FROM issues").fetchall()
+        data = issue_service.category_status(conn)
         if data:
-            if data and hasattr(data[0], "keys"):
-                df = pd.DataFrame(data, columns=data[0].keys())
-            else:
-                df = pd.DataFrame(data, columns=["category", "status"])
+            df = pd.DataFrame(data, columns=data[0].keys())
             pivot = df.pivot_table(index="category", columns="status", aggfunc="size", fill_value=0)
             fig, ax = plt.subplots()
             pivot.plot(kind="bar", ax=ax)
@@ -51,8 +51,14 @@ def render_exports(conn):
         "Resources": "SELECT * FROM resources",
         "Events": "SELECT * FROM events",
     }
+    if uses_sqlite():
+        # The archive is an ATTACHed SQLite file (services.retention).
+        export_map["Attendance (all terms)"] = "SELECT * FROM attendance_all"
+        export_map["Audit Log (all terms)"] = "SELECT * FROM audit_logs_all"
     dataset = st.selectbox("Select Dataset", list(export_map.keys()))
     if st.button("Generate CSV"):
+        if "all terms" in dataset:
+            retention_service.attach_archive(conn)
         df = pd.read_sql_query(export_map[dataset], conn)
         st.download_button(
             label="Download CSV",
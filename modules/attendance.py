@@ -1,9 +1,8 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime, timedelta
+from pathlib import Path
 import time
-from uuid import uuid4
-import sqlite3
 
 import streamlit as st
 import pandas as pd
@@ -11,16 +10,37 @@ import matplotlib.pyplot as plt
 
 from streamlit_js_eval import streamlit_js_eval
 
-from core.db import get_db
-from core.utils import haversine_distance, now_iso, parse_iso, add_minutes, now_local
-from core.qr import generate_qr
+from core.db import database_errors, get_db
+from core.utils import parse_iso, now_local
+from core.qr import build_qr_sheet, generate_qr, qr_png_bytes, render_png
+from core.security import sign_session_token, verify_session_token
+from core.shards import route_session
+from services import anomalies as anomaly_service
+from services import attendance as attendance_service
+from services.active_sessions import active_sessions
+from services import lectures as lecture_service
+from services import rooms as room_service
+from services import scheduler
+from services import schedules as schedule_service
+from services.lectures import CUT_OFF_DATE, attendance_url as lecture_attendance_url
+from services import users as user_service
+from services.audit import log_audit
+from services.settings import (
+    DEFAULT_LATE_AFTER_MIN,
+    DEFAULT_QR_ROTATION_SEC,
+    DEFAULT_RADIUS_M,
+    DEFAULT_TIME_WINDOW_MIN,
+    get_float,
+    qr_signing_secret,
+)
+
+from modules.auth import clear_query_params, session_value, set_session_value
+
+QR_ROTATION_CHOICES = [0, 10, 15, 30, 60]
+OTHER_ROOM = "Other room (capture GPS)"
+# After a valid rotating-QR scan the student has this long to capture GPS and submit.
+QR_SUBMIT_WINDOW_SEC = 300
 
-APP_BASE_URL = "https://smart-campus-system-4rvhza22xqtxanom66dczk.streamlit.app"
-CUT_OFF_DATE = "2026-02-20"
-
-
-# Initialize session state for GPS location
-st.session_state.setdefault("geo_location", None)
 
 # Helpers to read query params robustly (supports list values)
 def _qp_get(params, key: str):
@@ -32,18 +52,27 @@ def _qp_get(params, key: str):
         return val[0] if val else None
     return val
 
-def _sync_geo_from_url():
+def _geo_location(conn):
+    # Kept with the login (modules.auth), so a reconnect to another replica keeps the fix.
+    return session_value(conn, "geo_location")
+
+
+def _set_geo_location(conn, geo):
+    set_session_value(conn, "geo_location", geo)
+
+
+def _sync_geo_from_url(conn):
     params = _get_query_params()
     lat = _qp_get(params, "geo_lat")
     lon = _qp_get(params, "geo_lon")
     acc = _qp_get(params, "geo_acc")
     if lat is not None and lon is not None:
         try:
-            st.session_state.geo_location = {
+            _set_geo_location(conn, {
                 "lat": float(lat),
                 "lon": float(lon),
                 "acc": float(acc) if acc is not None else 0.0,
-            }
+            })
         except (ValueError, TypeError):
             pass
 
@@ -58,26 +87,26 @@ def _get_query_params():
         return {}
 
 
-def _render_geolocation_block(use_mock: bool = True):
+def _render_geolocation_block(conn, use_mock: bool = True):
     """Render GPS capture UI (streamlit-js-eval)"""
 
     st.markdown("### Capture Your Location")
     if use_mock:
         if st.button("Use Mock GPS", key="mock_gps", help="For testing without real GPS"):
             # Mock GPS coordinates (somewhere reasonable)
-            st.session_state.geo_location = {
+            _set_geo_location(conn, {
                 "lat": 23.0225,  # Example: Ahmedabad
                 "lon": 72.5714,
                 "acc": 10.0,
                 "source": "mock",
-            }
+            })
             st.success("Mock GPS enabled for demo!")
             st.rerun()
 
     if st.button("Clear", key="clear_geo"):
-        st.session_state.geo_location = None
+        _set_geo_location(conn, None)
         try:
-            st.query_params.clear()
+            clear_query_params()
         except Exception:
             pass
         st.rerun()
@@ -118,7 +147,7 @@ def _render_geolocation_block(use_mock: bool = True):
     GPS_TIMEOUT = 10
 
     if loc and isinstance(loc, dict) and "lat" in loc and "lon" in loc:
-        st.session_state.geo_location = loc
+        _set_geo_location(conn, loc)
         st.session_state.gps_request = False
         st.session_state.pop("gps_started_at", None)
         st.success("GPS captured")
@@ -145,9 +174,9 @@ def _render_geolocation_block(use_mock: bool = True):
             st.info("Waiting for GPS...")
 
 
-def _get_geo_from_query():
-    if "geo_location" in st.session_state and st.session_state.geo_location:
-        geo = st.session_state.geo_location
+def _get_geo_from_query(conn):
+    geo = _geo_location(conn)
+    if geo:
         lat = geo.get("lat")
         lon = geo.get("lon")
         acc = geo.get("acc")
@@ -156,133 +185,57 @@ def _get_geo_from_query():
     return None
 
 
-def _attendance_status(lecture, distance_m: float) -> str:
-    # Use local time because lecture times are stored as naive local times
-    now = now_local()
-    start = parse_iso(lecture["start_time"])
-    end = parse_iso(lecture["end_time"])
-    late_after = add_minutes(start, int(lecture["late_after_min"]))
-    radius_m = float(lecture["radius_m"])
-
-    # Add a small buffer (2 minutes) to start time to account for clock drift
-    start_buffer = start - timedelta(minutes=2)
-
-    if now < start_buffer:
-        return f"Rejected (Too Early - Starts {start.strftime('%H:%M')})"
-    if now > end:
-        return f"Rejected (Closed - Ended {end.strftime('%H:%M')})"
-
-    if distance_m <= radius_m:
-        return "Present" if now <= late_after else "Late"
-
-    return f"Rejected (Out of Radius: {distance_m:.1f}m > {radius_m}m)"
-
-
-def _log_audit(conn, action: str, details: str, actor_id: int | None):
-    conn.execute(
-        "INSERT INTO audit_logs (action, details, actor_id, created_at) VALUES (?, ?, ?, ?)",
-        (action, details, actor_id, now_iso()),
-    )
-    conn.commit()
-
-
-def _get_setting(conn, key: str, default: float) -> float:
-    row = conn.execute("SELECT value FROM system_settings WHERE key = ?", (key,)).fetchone()
-    return float(row["value"]) if row else float(default)
-
-
 def render_teacher_attendance(conn, user):
     st.title("✅ Attendance Management")
     st.markdown("---")
     
-    # Initialize session state
-    if "geo_location" not in st.session_state:
-        st.session_state.geo_location = None
-    
-    tab1, tab2 = st.tabs(["📝 Create New Session", "📋 View Sessions"])
+    tab1, tab2, tab3 = st.tabs(["📝 Create New Session", "📋 View Sessions", "📅 Bulk from Timetable"])
     
     with tab1:
         st.subheader("Create Lecture Session")
-        
-        # STEP 1: Get GPS Location
-        st.info("📍 You must be physically present at the classroom. GPS location will be verified.")
-        st.markdown("### Step 1: Capture Your GPS Location")
-        
-        # Sync GPS from URL (robust for both list/str values)
-        _sync_geo_from_url()
-
-        # Render GPS capture component
-        _render_geolocation_block(use_mock=True)
-
-        # Fallback control to force sync if rerun timing misses
-        params = _get_query_params()
-        col_sync, col_dbg = st.columns([1, 3])
-        with col_sync:
-            if st.button("🔄 Sync GPS Now", help="Force sync GPS from URL params"):
-                _sync_geo_from_url()
-                if st.session_state.geo_location:
-                    st.success("✅ GPS synced successfully!")
-                else:
-                    st.warning("⚠️ No GPS found. Try 'Mock GPS' or enter manually.")
-                st.rerun()
 
-        with col_dbg:
-            lat_dbg = _qp_get(params, "geo_lat")
-            lon_dbg = _qp_get(params, "geo_lon")
-            if lat_dbg and lon_dbg and not st.session_state.geo_location:
-                st.caption(f"GPS in URL → lat={lat_dbg}, lon={lon_dbg} (sync needed)")
+        _render_scheduled_session(conn, user)
         
-        # Manual entry fallback (always available)
-        with st.expander("Manual GPS Entry", expanded=not bool(st.session_state.geo_location)):
-            m_lat = st.number_input("Manual Latitude", value=0.0, format="%.6f", key="teacher_manual_lat")
-            m_lon = st.number_input("Manual Longitude", value=0.0, format="%.6f", key="teacher_manual_lon")
-            m_acc = st.number_input("Manual Accuracy (m)", min_value=0.0, value=10.0, key="teacher_manual_acc")
-            if st.button("Use Manual Coordinates", help="Use these coordinates if GPS fails"):
-                if m_lat == 0.0 and m_lon == 0.0:
-                    st.warning("Please enter valid coordinates.")
-                else:
-                    st.session_state.geo_location = {"lat": m_lat, "lon": m_lon, "acc": m_acc, "source": "manual"}
-                    st.success("Manual coordinates saved.")
-                    st.rerun()
+        rooms = room_service.list_rooms(conn)
+        registered_room = None
+        if rooms:
+            room_by_name = {r.name: r for r in rooms}
+            picked = st.selectbox(
+                "🏫 Room",
+                list(room_by_name) + [OTHER_ROOM],
+                help="Registered rooms carry surveyed coordinates, so no GPS capture is needed",
+            )
+            registered_room = room_by_name.get(picked)
 
-        # Show location if captured
-        if st.session_state.geo_location:
-            geo = st.session_state.geo_location
-            source_emoji = "🎭" if geo.get("source") == "mock" else "🌍"
-            source_text = "Mock GPS (Demo Mode)" if geo.get("source") == "mock" else "Real GPS"
+        if registered_room is None:
+            _render_teacher_gps_step(conn)
+        else:
             st.success(
-                f"✅ Location Captured! {source_emoji} {source_text}\n📍 Lat: {geo['lat']:.6f} | Lon: {geo['lon']:.6f} | Accuracy: {geo['acc']:.1f}m"
+                f"📍 Using the surveyed location of **{registered_room.name}** "
+                f"({registered_room.latitude:.6f}, {registered_room.longitude:.6f}), radius {registered_room.radius_m:.0f}m"
             )
 
-
         # STEP 2: Lecture form (always visible)
         st.markdown("---")
         st.markdown("### Step 2: Enter Lecture Details")
 
-        student_rows = conn.execute(
-            """
-            SELECT u.year, u.batch
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.id
-            WHERE r.name = 'student'
-            """
-        ).fetchall()
-        available_years = sorted({row["year"] for row in student_rows if row["year"] is not None})
-        for y in [1, 2, 3, 4, 5]:
-            if y not in available_years:
-                available_years.append(y)
-        available_years = sorted(available_years)
-
-        default_radius = _get_setting(conn, "radius_m", 100)
-        default_late = int(_get_setting(conn, "late_after_min", 10))
-        default_duration = int(_get_setting(conn, "time_window_min", 60))
+        cohorts = user_service.student_cohorts(conn)
+        available_years = user_service.year_choices(cohorts)
+
+        default_radius = get_float(conn, "radius_m", DEFAULT_RADIUS_M)
+        default_late = int(get_float(conn, "late_after_min", DEFAULT_LATE_AFTER_MIN))
+        default_duration = int(get_float(conn, "time_window_min", DEFAULT_TIME_WINDOW_MIN))
+        default_rotation = int(get_float(conn, "qr_rotation_sec", DEFAULT_QR_ROTATION_SEC))
 
         with st.form("lecture_form", clear_on_submit=False):
             col1, col2 = st.columns(2)
 
             with col1:
                 subject = st.text_input("📚 Subject *", placeholder="e.g., Data Structures")
-                room = st.text_input("🏫 Room / Classroom *", placeholder="e.g., Lab 301")
+                if registered_room is None:
+                    room = st.text_input("🏫 Room / Classroom *", placeholder="e.g., Lab 301")
+                else:
+                    room = registered_room.name
                 now_local_dt = now_local()
                 date = st.date_input("📅 Lecture Date", value=now_local_dt.date())
                 start_time = st.time_input("⏰ Start Time", value=now_local_dt.time().replace(second=0, microsecond=0))
@@ -291,15 +244,22 @@ def render_teacher_attendance(conn, user):
             with col2:
                 duration_min = st.number_input("⏱️ Duration (minutes)", min_value=30, max_value=240, value=default_duration)
                 late_after_min = st.number_input("⏳ Late After (minutes)", min_value=0, max_value=30, value=default_late)
-                radius_m = st.slider("📍 Allowed Radius (meters)", min_value=10, max_value=100, value=int(default_radius))
-                available_batches = sorted(
-                    {row["batch"] for row in student_rows if row["year"] == year and row["batch"] is not None}
-                )
-                if not available_batches:
-                    available_batches = [1, 2, 3, 4]
+                room_radius = registered_room.radius_m if registered_room else default_radius
+                radius_m = st.slider("📍 Allowed Radius (meters)", min_value=10, max_value=100, value=int(min(max(room_radius, 10), 100)))
+                available_batches = user_service.batch_choices(cohorts, year)
                 batch = st.selectbox("👥 Batch *", available_batches, key="lecture_batch")
+                qr_rotation_sec = st.selectbox(
+                    "🔁 Rotating QR",
+                    QR_ROTATION_CHOICES,
+                    index=QR_ROTATION_CHOICES.index(default_rotation) if default_rotation in QR_ROTATION_CHOICES else 0,
+                    format_func=lambda sec: "Off (static code)" if not sec else f"New code every {sec}s",
+                    help="A photo of a rotating code stops working once it rotates",
+                )
 
-            st.info("💡 Session will be created at your current GPS location. Students must be within the radius to mark attendance.")
+            if registered_room is None:
+                st.info("💡 Session will be created at your current GPS location. Students must be within the radius to mark attendance.")
+            else:
+                st.info("💡 Session will be created at the room's surveyed location. Students must be within the radius to mark attendance.")
 
             submitted = st.form_submit_button("🚀 Create Session & Generate QR", use_container_width=True, type="primary")
 
@@ -308,42 +268,38 @@ def render_teacher_attendance(conn, user):
                 st.error("❌ Subject and room are required.")
                 return
 
-            if not st.session_state.geo_location:
+            geo = _geo_location(conn)
+            if registered_room is None and not geo:
                 st.error("❌ Please capture GPS or enter manual coordinates before creating the session.")
                 return
 
             try:
-                geo = st.session_state.geo_location
-                lat = geo["lat"]
-                lon = geo["lon"]
+                if registered_room is not None:
+                    lat, lon = registered_room.latitude, registered_room.longitude
+                else:
+                    lat = geo["lat"]
+                    lon = geo["lon"]
 
                 start_dt = datetime.combine(date, start_time)
                 end_dt = start_dt + pd.Timedelta(minutes=int(duration_min))
-                session_id = f"{subject[:4].upper()}-{uuid4().hex[:8]}"
-
-                # Insert into database
-                conn.execute(
-                    """
-                    INSERT INTO lectures (session_id, teacher_id, subject, room, start_time, end_time, latitude, longitude, radius_m, late_after_min, year, batch, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        session_id,
-                        user["id"],
-                        subject,
-                        room,
-                        start_dt.isoformat(),
-                        end_dt.isoformat(),
-                        lat,
-                        lon,
-                        radius_m,
-                        int(late_after_min),
-                        int(year),
-                        int(batch),
-                        now_iso(),
-                    ),
+                session_id = lecture_service.new_session_id(subject)
+
+                lecture_service.create_lecture(
+                    conn,
+                    session_id,
+                    user["id"],
+                    subject,
+                    room,
+                    start_dt,
+                    end_dt,
+                    lat,
+                    lon,
+                    radius_m,
+                    int(late_after_min),
+                    int(year),
+                    int(batch),
+                    int(qr_rotation_sec),
                 )
-                conn.commit()
 
                 st.success(f"✅ Lecture session created: **{session_id}**")
 
@@ -352,7 +308,7 @@ def render_teacher_attendance(conn, user):
 
                 with col1:
                     st.markdown("### 📱 QR Code")
-                    attendance_url = f"{APP_BASE_URL}/?session_id={session_id}"
+                    attendance_url = lecture_attendance_url(session_id)
 
                     st.markdown("#### Generating QR Code...")
                     try:
@@ -361,7 +317,7 @@ def render_teacher_attendance(conn, user):
                             # Verify file is real and get file size
                             file_size = qr_path.stat().st_size
                             st.success(f"✅ QR Code generated successfully!")
-                            st.session_state["last_qr_info"] = {
+                            set_session_value(conn, "last_qr_info", {
                                 "session_id": session_id,
                                 "subject": subject,
                                 "room": room,
@@ -373,7 +329,8 @@ def render_teacher_attendance(conn, user):
                                 "location": f"({lat:.6f}, {lon:.6f})",
                                 "qr_path": str(qr_path),
                                 "file_size": file_size,
-                            }
+                                "rotation_sec": int(qr_rotation_sec),
+                            })
                         else:
                             st.error("❌ QR file not found after generation")
                     except Exception as e:
@@ -385,7 +342,7 @@ def render_teacher_attendance(conn, user):
                 # Keep geo for convenience; do not clear immediately
                 # Clear URL params to avoid duplicate sync
                 try:
-                    st.query_params.clear()
+                    clear_query_params()
                 except Exception:
                     pass
 
@@ -393,35 +350,47 @@ def render_teacher_attendance(conn, user):
                 st.error(f"❌ Error creating session: {str(e)}")
 
         # Fullscreen QR display (outside submission block so it persists across reruns)
-        qr_info = st.session_state.get("last_qr_info")
+        qr_info = session_value(conn, "last_qr_info")
         if qr_info:
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown("### 📱 QR Code")
-                st.image(
-                    qr_info["qr_path"],
-                    caption=f"Scan to mark attendance for {qr_info['subject']}",
-                    width=300,
-                )
+                if qr_info.get("rotation_sec"):
+                    _render_rotating_qr(
+                        qr_signing_secret(conn),
+                        qr_info["session_id"],
+                        qr_info["rotation_sec"],
+                        f"Scan to mark attendance for {qr_info['subject']}",
+                        width=300,
+                    )
+                else:
+                    st.image(
+                        qr_png_bytes(qr_info["attendance_url"]),
+                        caption=f"Scan to mark attendance for {qr_info['subject']}",
+                        width=300,
+                    )
                 if st.button("🔍 View Fullscreen QR", key=f"full_qr_{qr_info['session_id']}"):
-                    st.session_state.full_qr_path = qr_info["qr_path"]
+                    st.session_state.full_qr_data = qr_info["attendance_url"]
+                    st.session_state.full_qr_rotation = (qr_info["session_id"], qr_info.get("rotation_sec") or 0)
                     st.session_state.full_qr_caption = f"Scan to mark attendance for {qr_info['subject']}"
                     st.session_state.show_full_qr = True
 
                 with st.expander("🔍 QR Code Details", expanded=False):
                     st.caption(f"📁 File Path: {qr_info['qr_path']}")
                     st.caption(f"📊 File Size: {qr_info['file_size']} bytes")
-                    st.caption("✅ File Exists: True")
+                    st.caption(f"✅ File Exists: {Path(qr_info['qr_path']).exists()}")
                     st.caption(f"📍 URL Encoded: {qr_info['attendance_url']}")
 
             with col2:
                 st.markdown("### 🔗 Direct Link")
                 st.code(qr_info["attendance_url"], language="text")
+                if qr_info.get("rotation_sec"):
+                    st.caption("🔁 Rotating QR is on: students must scan the live code; this link alone is not accepted.")
 
                 if st.button(
                     "🔄 Regenerate QR",
                     key=f"regen_qr_{qr_info['session_id']}",
-                    help="Generate a new QR code",
+                    help="Restore the QR image file if it was cleaned up (the code itself never changes)",
                 ):
                     try:
                         new_qr_path = generate_qr(qr_info["attendance_url"])
@@ -431,10 +400,8 @@ def render_teacher_attendance(conn, user):
                             "qr_path": str(new_qr_path),
                             "file_size": new_file_size,
                         }
-                        st.session_state["last_qr_info"] = qr_info
-                        if st.session_state.get("show_full_qr"):
-                            st.session_state.full_qr_path = qr_info["qr_path"]
-                        st.success(f"✅ QR regenerated! ({new_file_size} bytes)")
+                        set_session_value(conn, "last_qr_info", qr_info)
+                        st.success(f"✅ QR code is up to date ({new_file_size} bytes)")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Failed to regenerate: {e}")
@@ -450,43 +417,37 @@ def render_teacher_attendance(conn, user):
                 - 🌍 Location: {qr_info['location']}
                 """)
 
-        if st.session_state.get("show_full_qr") and st.session_state.get("full_qr_path"):
+        if st.session_state.get("show_full_qr") and st.session_state.get("full_qr_data"):
             st.markdown("---")
             st.markdown("### 📱 QR Code (Fullscreen)")
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
-                from pathlib import Path
-                qr_file = Path(st.session_state.full_qr_path)
-                if qr_file.exists():
+                full_session_id, full_rotation = st.session_state.get("full_qr_rotation", (None, 0))
+                if full_rotation:
+                    _render_rotating_qr(
+                        qr_signing_secret(conn),
+                        full_session_id,
+                        full_rotation,
+                        st.session_state.get("full_qr_caption", "QR Code"),
+                    )
+                else:
                     st.image(
-                        st.session_state.full_qr_path,
+                        qr_png_bytes(st.session_state.full_qr_data),
                         caption=st.session_state.get("full_qr_caption", "QR Code"),
                         use_container_width=True,
                     )
-                else:
-                    st.error("QR code file no longer exists.")
-                    st.session_state.show_full_qr = False
             col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
                 if st.button("✖️ Close Fullscreen", key="close_full_qr", use_container_width=True):
                     st.session_state.show_full_qr = False
-                    st.session_state.pop("full_qr_path", None)
+                    st.session_state.pop("full_qr_data", None)
+                    st.session_state.pop("full_qr_rotation", None)
                     st.session_state.pop("full_qr_caption", None)
                     st.rerun()
 
     with tab2:
         st.subheader("📋 Recent Lecture Sessions")
-        sessions = conn.execute(
-            """
-            SELECT session_id, subject, room, start_time, end_time, year, batch,
-                   (SELECT COUNT(*) FROM attendance WHERE session_id = lectures.session_id) as attendance_count
-            FROM lectures
-            WHERE teacher_id = ?
-            ORDER BY start_time DESC
-            LIMIT 20
-            """,
-            (user["id"],)
-        ).fetchall()
+        sessions = lecture_service.list_teacher_sessions(conn, user["id"], limit=20)
         
         if not sessions:
             st.info("📭 No sessions created yet. Create your first session above!")
@@ -512,17 +473,7 @@ def render_teacher_attendance(conn, user):
                         selected_session = session[0]
                 
                 # Show attendance for this session
-                att_records = conn.execute(
-                    """
-                    SELECT a.enrollment, u.name, a.status, a.timestamp, a.distance_m,
-                           a.latitude, a.longitude, a.accuracy
-                    FROM attendance a
-                    LEFT JOIN users u ON a.enrollment = u.enrollment
-                    WHERE a.session_id = ?
-                    ORDER BY a.timestamp
-                    """,
-                    (session[0],)
-                ).fetchall()
+                att_records = attendance_service.list_for_session(conn, session[0])
                 
                 if att_records:
                     for record in att_records:
@@ -553,46 +504,231 @@ def render_teacher_attendance(conn, user):
                         )
                         st.dataframe(df, use_container_width=True)
 
+    with tab3:
+        _render_bulk_timetable(conn, user)
+
+
+def _render_teacher_gps_step(conn):
+    # STEP 1: Get GPS Location
+    st.info("📍 You must be physically present at the classroom. GPS location will be verified.")
+    st.markdown("### Step 1: Capture Your GPS Location")
+    
+    # Sync GPS from URL (robust for both list/str values)
+    _sync_geo_from_url(conn)
+
+    # Render GPS capture component
+    _render_geolocation_block(conn, use_mock=True)
+
+    # Fallback control to force sync if rerun timing misses
+    params = _get_query_params()
+    col_sync, col_dbg = st.columns([1, 3])
+    with col_sync:
+        if st.button("🔄 Sync GPS Now", help="Force sync GPS from URL params"):
+            _sync_geo_from_url(conn)
+            if _geo_location(conn):
+                st.success("✅ GPS synced successfully!")
+            else:
+                st.warning("⚠️ No GPS found. Try 'Mock GPS' or enter manually.")
+            st.rerun()
+
+    geo = _geo_location(conn)
+    with col_dbg:
+        lat_dbg = _qp_get(params, "geo_lat")
+        lon_dbg = _qp_get(params, "geo_lon")
+        if lat_dbg and lon_dbg and not geo:
+            st.caption(f"GPS in URL → lat={lat_dbg}, lon={lon_dbg} (sync needed)")
+    
+    # Manual entry fallback (always available)
+    with st.expander("Manual GPS Entry", expanded=not bool(geo)):
+        m_lat = st.number_input("Manual Latitude", value=0.0, format="%.6f", key="teacher_manual_lat")
+        m_lon = st.number_input("Manual Longitude", value=0.0, format="%.6f", key="teacher_manual_lon")
+        m_acc = st.number_input("Manual Accuracy (m)", min_value=0.0, value=10.0, key="teacher_manual_acc")
+        if st.button("Use Manual Coordinates", help="Use these coordinates if GPS fails"):
+            if m_lat == 0.0 and m_lon == 0.0:
+                st.warning("Please enter valid coordinates.")
+            else:
+                _set_geo_location(conn, {"lat": m_lat, "lon": m_lon, "acc": m_acc, "source": "manual"})
+                st.success("Manual coordinates saved.")
+                st.rerun()
+
+    # Show location if captured
+    if geo:
+        source_emoji = "🎭" if geo.get("source") == "mock" else "🌍"
+        source_text = "Mock GPS (Demo Mode)" if geo.get("source") == "mock" else "Real GPS"
+        st.success(
+            f"✅ Location Captured! {source_emoji} {source_text}\n📍 Lat: {geo['lat']:.6f} | Lon: {geo['lon']:.6f} | Accuracy: {geo['acc']:.1f}m"
+        )
+
+
+def _render_scheduled_session(conn, user):
+    """Offer the timetable lecture that is starting now, so no form or GPS fix is needed."""
+    scheduler.materialize_if_due(conn)
+    lecture = scheduler.session_for_class_start(conn, user["id"])
+    if not lecture:
+        return
+
+    start = parse_iso(lecture.start_time)
+    end = parse_iso(lecture.end_time)
+    st.success(
+        f"📅 **From your timetable:** {lecture.subject} in {lecture.room or '-'}, "
+        f"{start:%H:%M}-{end:%H:%M} (Y{lecture.year or '-'} B{lecture.batch or '-'})"
+    )
+    qr_info = session_value(conn, "last_qr_info") or {}
+    if qr_info.get("session_id") == lecture.session_id:
+        return
+    if st.button("📱 Show QR for this lecture", key=f"scheduled_{lecture.session_id}", type="primary"):
+        url = lecture_attendance_url(lecture.session_id)
+        qr_path = generate_qr(url)
+        set_session_value(conn, "last_qr_info", {
+            "session_id": lecture.session_id,
+            "subject": lecture.subject,
+            "room": lecture.room,
+            "date": start.date().isoformat(),
+            "time_range": f"{start:%H:%M} - {end:%H:%M}",
+            "attendance_url": url,
+            "radius_m": lecture.radius_m,
+            "late_after_min": lecture.late_after_min,
+            "location": f"({lecture.latitude:.6f}, {lecture.longitude:.6f})",
+            "qr_path": str(qr_path),
+            "file_size": qr_path.stat().st_size,
+            "rotation_sec": lecture.qr_rotation_sec or 0,
+        })
+        st.rerun()
+    st.markdown("---")
+
+
+def _render_bulk_timetable(conn, user):
+    st.subheader("Create a Week of Lectures from Your Timetable")
+    schedules = schedule_service.list_for_teacher(conn, user["id"])
+    if not schedules:
+        st.info("You have no timetable entries yet. Add them on the Schedule page.")
+        return
+
+    today = now_local().date()
+    next_monday = today + timedelta(days=(7 - today.weekday()) % 7)
+    geo = _geo_location(conn) or {}
+
+    with st.form("bulk_timetable_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            week_start = st.date_input("📅 Week starting (Monday)", value=next_monday)
+            st.caption("Registered rooms use their surveyed location; these coordinates cover the rest.")
+            latitude = st.number_input("Latitude", value=float(geo.get("lat", 0.0)), format="%.6f")
+            longitude = st.number_input("Longitude", value=float(geo.get("lon", 0.0)), format="%.6f")
+        with col2:
+            radius_m = st.slider("📍 Allowed Radius (meters)", min_value=10, max_value=100, value=int(get_float(conn, "radius_m", DEFAULT_RADIUS_M)))
+            late_after_min = st.number_input("⏳ Late After (minutes)", min_value=0, max_value=30, value=int(get_float(conn, "late_after_min", DEFAULT_LATE_AFTER_MIN)))
+            sheet_format = st.radio("QR sheet format", ["PDF", "PNG"], horizontal=True)
+        submitted = st.form_submit_button("🚀 Create Lectures & QR Sheet", use_container_width=True, type="primary")
+
+    week_start = week_start - timedelta(days=week_start.weekday())
+    occurrences, skipped = schedule_service.week_occurrences(schedules, week_start)
+    st.caption(f"{len(occurrences)} lecture(s) for the week of {week_start.isoformat()}")
+    if skipped:
+        st.warning(f"⚠️ {len(skipped)} timetable row(s) have an unreadable day or time and will be skipped.")
+
+    if submitted:
+        if not occurrences:
+            st.error("❌ No timetable slots to create.")
+            return
+        room_locations = {r.name: (r.latitude, r.longitude, r.radius_m) for r in room_service.list_rooms(conn)}
+        unregistered = {row.room for row, _, _ in occurrences} - set(room_locations)
+        if unregistered and latitude == 0.0 and longitude == 0.0:
+            st.error(f"❌ Rooms without surveyed coordinates ({', '.join(sorted(map(str, unregistered)))}) need GPS: capture it in the first tab or enter the classroom coordinates.")
+            return
+        try:
+            session_ids = lecture_service.bulk_create_lectures(
+                conn,
+                user["id"],
+                occurrences,
+                latitude,
+                longitude,
+                radius_m,
+                int(late_after_min),
+                room_locations,
+                int(get_float(conn, "qr_rotation_sec", DEFAULT_QR_ROTATION_SEC)),
+            )
+        except database_errors() as e:
+            st.error(f"❌ No lectures were created: {e}")
+            return
+        items = [
+            (
+                lecture_attendance_url(session_id),
+                f"{row.subject} | {row.room or '-'}\n{start:%a %Y-%m-%d %H:%M}-{end:%H:%M}\n{session_id}",
+            )
+            for session_id, (row, start, end) in zip(session_ids, occurrences)
+        ]
+        with st.spinner("Generating QR codes..."):
+            sheet = build_qr_sheet(items, fmt=sheet_format)
+        st.session_state["bulk_qr_sheet"] = (sheet, sheet_format, week_start.isoformat())
+        st.success(f"✅ Created {len(session_ids)} lecture session(s).")
+
+    if occurrences:
+        preview = pd.DataFrame(
+            [(row.subject, row.room, f"{start:%a %d %b}", f"{start:%H:%M}-{end:%H:%M}", row.year, row.batch) for row, start, end in occurrences],
+            columns=["Subject", "Room", "Date", "Time", "Year", "Batch"],
+        )
+        st.dataframe(preview, use_container_width=True)
+
+    last_sheet = st.session_state.get("bulk_qr_sheet")
+    if last_sheet:
+        sheet, sheet_format, sheet_week = last_sheet
+        st.download_button(
+            "⬇️ Download QR Sheet",
+            data=sheet,
+            file_name=f"qr_sheet_{sheet_week}.{sheet_format.lower()}",
+            mime="application/pdf" if sheet_format == "PDF" else "image/png",
+        )
+
+
+def _render_rotating_qr(secret: str, session_id: str, rotation_sec: int, caption: str, width=None):
+    """Live QR that re-signs its token every ``rotation_sec``; rendered in memory, never written to disk."""
+
+    def _draw():
+        token = sign_session_token(secret, session_id, rotation_sec)
+        png = render_png(lecture_attendance_url(session_id, token))
+        if width:
+            st.image(png, caption=caption, width=width)
+        else:
+            st.image(png, caption=caption, use_container_width=True)
+        st.caption(f"🔁 Code refreshes every {rotation_sec}s")
+
+    st.fragment(run_every=rotation_sec)(_draw)()
+
+
+def _qr_scan_fresh(conn, session_id: str) -> bool:
+    verified_at = (session_value(conn, "qr_verified_at") or {}).get(session_id)
+    return verified_at is not None and time.time() - verified_at <= QR_SUBMIT_WINDOW_SEC
+
 
 def render_student_attendance(conn, user):
     st.title("✅ Mark Attendance")
     st.markdown("---")
     
-    # Ensure session state is initialized
-    st.session_state.setdefault("attendance_lock", set())
-
     params = _get_query_params()
     session_id = (_qp_get(params, "session_id") or "").strip()
 
     if st.button("🔄 Refresh sessions", help="Reload the latest lecture list"):
         st.rerun()
 
+    # QR deep link: resolve the session by its id alone and skip the lecture lists.
+    lecture = lecture_service.lookup_lecture(conn, session_id) if session_id else None
+    if lecture:
+        _render_student_mark_form(conn, user, params, session_id, lecture)
+        return
+
     fresh_conn = get_db()
     try:
         student_year = user.get("year")
         student_batch = user.get("batch")
         
         # Get lectures matching student's year/batch
-        if student_year and student_batch:
-            matching_lectures = fresh_conn.execute(
-                """
-                SELECT * FROM lectures
-                WHERE (year IS NULL OR year = ?) AND (batch IS NULL OR batch = ?) AND date(start_time) <= ?
-                ORDER BY start_time DESC LIMIT 20
-                """,
-                (student_year, student_batch, CUT_OFF_DATE),
-            ).fetchall()
-        else:
-            matching_lectures = fresh_conn.execute(
-                "SELECT * FROM lectures WHERE date(start_time) <= ? ORDER BY start_time DESC LIMIT 20",
-                (CUT_OFF_DATE,)
-            ).fetchall()
-        
+        matching_lectures = lecture_service.list_for_cohort(
+            fresh_conn, student_year, student_batch, CUT_OFF_DATE, limit=20
+        )
+
         # Get all lectures for override search
-        all_lectures = fresh_conn.execute(
-            "SELECT * FROM lectures WHERE date(start_time) <= ? ORDER BY start_time DESC LIMIT 50",
-            (CUT_OFF_DATE,),
-        ).fetchall()
+        all_lectures = lecture_service.list_recent(fresh_conn, CUT_OFF_DATE, limit=50)
     finally:
         fresh_conn.close()
     
@@ -612,35 +748,27 @@ def render_student_attendance(conn, user):
         if selected == "-- Select --":
             return None
         return selected
-    if not session_id:
-        session_id = _select_session()
-        if not session_id:
-            return
 
-    # Lookup lecture from matching_lecture_map first, then all_lecture_map
+    if session_id:
+        st.warning("⚠️ Invalid or expired session. Please select a valid lecture below.")
+    session_id = _select_session()
+    if not session_id:
+        return
     lecture = matching_lecture_map.get(session_id) or all_lecture_map.get(session_id)
-    
-    if session_id and not lecture:
-        lecture = conn.execute(
-            "SELECT * FROM lectures WHERE session_id = ?",
-            (session_id,),
-        ).fetchone()
-    
     if not lecture:
-        st.warning("⚠️ Invalid or expired session. Please select a valid lecture below.")
-        session_id = _select_session()
-        if not session_id:
-            return
-        lecture = matching_lecture_map.get(session_id) or all_lecture_map.get(session_id)
-        if not lecture:
-            lecture = conn.execute(
-                "SELECT * FROM lectures WHERE session_id = ?",
-                (session_id,),
-            ).fetchone()
-        if not lecture:
-            st.error("❌ Invalid or expired session.")
-            return
+        lecture = lecture_service.lookup_lecture(conn, session_id)
+    if not lecture:
+        st.error("❌ Invalid or expired session.")
+        return
+
+    _render_student_mark_form(conn, user, params, session_id, lecture)
+
 
+def _render_student_mark_form(conn, user, params, session_id: str, lecture):
+    # Marks, the active-session state and the travel check all use the lecture's shard;
+    # login state stays in the campus database.
+    campus_conn = conn
+    conn = route_session(conn, session_id)
     _lec_date = str(lecture['start_time'])[:10]
     _lec_start = str(lecture['start_time'])[11:16]
     _lec_end = str(lecture['end_time'])[11:16]
@@ -655,16 +783,29 @@ def render_student_attendance(conn, user):
     
     st.markdown("---")
 
-    # Ensure session state initialized
-    st.session_state.setdefault("attendance_lock", set())
+    rotation_sec = lecture["qr_rotation_sec"]
+    if rotation_sec:
+        token = _qp_get(params, "t")
+        if token and verify_session_token(qr_signing_secret(conn), session_id, token, rotation_sec):
+            # Every accepted scan restarts the submit window; a rescan after it lapsed works again.
+            now = time.time()
+            verified = {
+                sid: at for sid, at in (session_value(campus_conn, "qr_verified_at") or {}).items()
+                if now - at <= QR_SUBMIT_WINDOW_SEC
+            }
+            verified[session_id] = now
+            set_session_value(campus_conn, "qr_verified_at", verified)
+
+    active = active_sessions.get(conn, session_id, now_local())
+    if active is None:
+        st.error("❌ Invalid or expired session.")
+        return
 
     # Check if already marked
-    existing = conn.execute(
-        "SELECT status, timestamp FROM attendance WHERE session_id = ? AND enrollment = ?",
-        (session_id, user["enrollment"])
-    ).fetchone()
-    
-    if existing:
+    existing = active.mark_of(user["enrollment"])
+    retry = active.can_retry(user["enrollment"])
+
+    if existing and not retry:
         status_color = "green" if existing[0] == "Present" else ("orange" if existing[0] == "Late" else "red")
         _marked_date = str(existing[1])[:10]
         _marked_time = str(existing[1])[11:16]
@@ -678,39 +819,50 @@ def render_student_attendance(conn, user):
         """, unsafe_allow_html=True)
         return
     
-    if session_id in st.session_state.attendance_lock:
+    if session_id in (session_value(campus_conn, "attendance_lock") or []):
         st.warning("⚠️ Attendance already marked in this browser session.")
         return
 
+    if retry:
+        st.warning(f"⚠️ Your last attempt was **{existing[0]}**. You can try again while the lecture is open.")
+
+    if rotation_sec and not _qr_scan_fresh(campus_conn, session_id):
+        st.error("🔁 This lecture uses a rotating QR code. Scan the live code shown in class to mark attendance.")
+        return
+
     # Better GPS capture flow for students
     st.info("📍 **Step 1:** Click 'Get Real GPS Location' below (or use 'Mock GPS' for testing)")
     st.info("📍 **Step 2:** If GPS fails, scroll down and enter coordinates manually")
     
-    _render_geolocation_block(use_mock=True)
+    _render_geolocation_block(campus_conn, use_mock=True)
     
     # Sync GPS from URL if present
-    _sync_geo_from_url()
+    _sync_geo_from_url(campus_conn)
     
     # Manual Sync Button
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔄 Sync GPS Now", help="Force sync GPS from URL"):
-            _sync_geo_from_url()
-            if st.session_state.geo_location:
+            _sync_geo_from_url(campus_conn)
+            if _geo_location(campus_conn):
                 st.success("✅ GPS synced!")
             st.rerun()
     with col2:
         if st.button(" Use Mock GPS", key="student_mock", help="For demo/testing"):
-            st.session_state.geo_location = {
+            _set_geo_location(campus_conn, {
                 "lat": 23.0225,
                 "lon": 72.5714,
                 "acc": 10.0,
                 "source": "mock"
-            }
+            })
             st.success(" Mock GPS enabled!")
             st.rerun()
 
-    geo = _get_geo_from_query()
+    geo = _get_geo_from_query(campus_conn)
+    if geo:
+        nearest = room_service.nearest_room(conn, float(geo[0]), float(geo[1]))
+        if nearest:
+            st.caption(f"📍 You appear to be in **{nearest[0].name}** ({nearest[1]:.0f}m from its surveyed point)")
 
     default_lat = float(geo[0]) if geo else 0.0
     default_lon = float(geo[1]) if geo else 0.0
@@ -758,27 +910,41 @@ def render_student_attendance(conn, user):
             st.error("❌ Please enable GPS or enter coordinates manually.")
             return
 
+        if rotation_sec and not _qr_scan_fresh(campus_conn, session_id):
+            st.error("⌛ Your QR scan has expired. Scan the live code again.")
+            return
+
         lat = float(lat)
         lon = float(lon)
         acc = float(acc)
-        lecture_lat = float(lecture["latitude"])
-        lecture_lon = float(lecture["longitude"])
-        distance_m = haversine_distance(lat, lon, lecture_lat, lecture_lon)
-        status = _attendance_status(lecture, distance_m)
-
-        if acc > 100 or distance_m > float(lecture["radius_m"]) * 1.5:
-            _log_audit(conn, "ATTENDANCE_ANOMALY", f"{user['enrollment']} accuracy={acc} distance={distance_m:.1f}", user["id"])
-
-        try:
-            conn.execute(
-                """
-                INSERT INTO attendance (session_id, enrollment, timestamp, status, latitude, longitude, accuracy, distance_m)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (session_id, user["enrollment"], now_iso(), status, lat, lon, acc, distance_m),
-            )
-            conn.commit()
-            st.session_state.attendance_lock.add(session_id)
+        distance_m = active.distance_m(lat, lon)
+        # Use local time because lecture times are stored as naive local times
+        status = active.status_for(distance_m, now_local())
+
+        if acc > 100 or distance_m > active.radius_m * 1.5:
+            log_audit(conn, "ATTENDANCE_ANOMALY", f"{user['enrollment']} accuracy={acc} distance={distance_m:.1f}", user["id"])
+
+        previous = anomaly_service.last_positions.get(conn, user["enrollment"])
+        result = attendance_service.mark(conn, session_id, user["enrollment"], status, lat, lon, acc, distance_m)
+        if result is not None:
+            speed = anomaly_service.implied_speed(previous, session_id, result[1], lat, lon)
+            if speed is not None:
+                log_audit(
+                    conn,
+                    "IMPOSSIBLE_TRAVEL",
+                    f"{user['enrollment']} {previous.session_id} -> {session_id} at {speed * 3.6:.0f} km/h",
+                    user["id"],
+                )
+        if result is None:
+            if retry and status.startswith("Rejected"):
+                st.error(f"❌ {status}. Your earlier attempt stands; try again from the classroom.")
+            else:
+                st.error("❌ Attendance already submitted for this session.")
+        else:
+            status = result[0]
+            if status in attendance_service.ATTENDED_STATUSES:
+                lock = session_value(campus_conn, "attendance_lock") or []
+                set_session_value(campus_conn, "attendance_lock", [*lock, session_id])
 
             status_color = "green" if "Present" in status else ("orange" if "Late" in status else "red")
             st.markdown(f"""
@@ -790,71 +956,158 @@ def render_student_attendance(conn, user):
             </div>
             """, unsafe_allow_html=True)
 
-        except sqlite3.IntegrityError:
-            st.error("❌ Attendance already submitted for this session.")
+
+OVERRIDE_STATUSES = ["Present", "Late", "Rejected (Manual)"]
+OVERRIDE_FILTER_STATUSES = ["Any", "Present", "Late", "Rejected"]
 
 
 def render_attendance_override(conn, user=None):
     st.subheader("Manual Override")
-    records = conn.execute(
-        "SELECT * FROM attendance ORDER BY timestamp DESC LIMIT 50"
-    ).fetchall()
+    actor_id = user["id"] if user else None
+    bulk_tab, flags_tab, single_tab = st.tabs(["📋 Bulk Override", "🚩 Anomaly Flags", "✏️ Single Record"])
+
+    with bulk_tab:
+        _render_bulk_override(conn, actor_id)
+
+    with flags_tab:
+        _render_anomaly_flags(conn, actor_id)
+
+    with single_tab:
+        records = attendance_service.list_for_override(conn, limit=50)
+        if not records:
+            st.info("No attendance records.")
+            return
+
+        df = pd.DataFrame(records, columns=list(records[0].keys()))
+        st.dataframe(df, column_config={"shard": None}, use_container_width=True)
+        # Ids repeat across shard files, so a record is picked from the list rather than typed.
+        choice = st.selectbox(
+            "Attendance record",
+            range(len(records)),
+            format_func=lambda i: f"#{records[i]['id']} {records[i]['enrollment']} | {records[i]['session_id']} | {records[i]['status']}",
+        )
+        record = records[choice]
+        status = st.selectbox("New Status", OVERRIDE_STATUSES)
+        reason = st.text_area("Reason for Override")
+
+        if st.button("Apply Override"):
+            if not reason:
+                st.warning("Reason is required.")
+                return
+            attendance_service.override_listed(conn, [(record["shard"], record["id"])], status, reason, actor_id)
+            st.success("Override saved.")
+
+
+def _render_bulk_override(conn, actor_id):
+    sessions = lecture_service.list_brief(conn, limit=200)
+    labels = {row["session_id"]: f"{row['subject']} - {row['room']} | {str(row['start_time'])[:16]}" for row in sessions}
+    col1, col2 = st.columns(2)
+    with col1:
+        session_id = st.selectbox(
+            "Lecture", list(labels) + ["All"], format_func=lambda x: labels.get(x, x), key="bulk_override_session"
+        )
+        status_filter = st.selectbox("Current Status", OVERRIDE_FILTER_STATUSES, key="bulk_override_status")
+    with col2:
+        min_distance = st.number_input("Min distance (m)", min_value=0.0, value=0.0, step=5.0, key="bulk_override_min")
+        max_distance = st.number_input(
+            "Max distance (m, 0 = no limit)", min_value=0.0, value=0.0, step=5.0, key="bulk_override_max"
+        )
+
+    records = attendance_service.list_for_override(
+        conn,
+        session_id=None if session_id == "All" else session_id,
+        status=None if status_filter == "Any" else status_filter,
+        min_distance_m=min_distance or None,
+        max_distance_m=max_distance or None,
+    )
     if not records:
-        st.info("No attendance records.")
+        st.info("No attendance records match these filters.")
         return
 
-    df = pd.DataFrame(records)
-    st.dataframe(df, use_container_width=True)
-    record_id = st.number_input("Attendance ID", min_value=1, step=1)
-    status = st.selectbox("New Status", ["Present", "Late", "Rejected (Manual)"])
-    reason = st.text_area("Reason for Override")
+    df = pd.DataFrame(records, columns=list(records[0].keys()))
+    df.insert(0, "select", st.checkbox("Select all", value=True, key="bulk_override_all"))
+    edited = st.data_editor(
+        df,
+        column_config={"select": st.column_config.CheckboxColumn("✔", default=False), "shard": None},
+        disabled=[c for c in df.columns if c != "select"],
+        hide_index=True,
+        use_container_width=True,
+        key="bulk_override_editor",
+    )
+    selected = list(edited.loc[edited["select"], ["shard", "id"]].itertuples(index=False, name=None))
+
+    with st.form("bulk_override_form"):
+        status = st.selectbox("New Status", OVERRIDE_STATUSES)
+        reason = st.text_area("Reason for Override")
+        submitted = st.form_submit_button(f"Apply to {len(selected)} selected", type="primary")
 
-    if st.button("Apply Override"):
+    if submitted:
         if not reason:
             st.warning("Reason is required.")
             return
-        conn.execute(
-            """
-            UPDATE attendance
-            SET status = ?, override_reason = ?, override_by = ?
-            WHERE id = ?
-            """,
-            (status, reason, user["id"] if user else None, int(record_id)),
-        )
-        conn.commit()
-        st.success("Override saved.")
+        if not selected:
+            st.warning("Select at least one record.")
+            return
+        # Each mark is written back to the database it was listed from.
+        changed = attendance_service.override_listed(conn, selected, status, reason, actor_id)
+        st.success(f"Override saved for {changed} record(s).")
+
 
+def _render_anomaly_flags(conn, actor_id):
+    st.caption("Shared coordinates, impossible travel and remote clusters found by the anomaly scan.")
+    if st.button("🔎 Scan new marks", key="anomaly_scan"):
+        result = anomaly_service.scan(conn)
+        st.success(f"Scanned {result.marks} new mark(s) in {result.sessions} session(s); {result.new_flags} new flag(s).")
 
-def render_attendance_analytics(conn):
+    flags = anomaly_service.list_flags(conn)
+    if not flags:
+        st.info("No open anomaly flags.")
+        return
+
+    df = pd.DataFrame(flags, columns=list(flags[0].keys()))
+    df.insert(0, "select", False)
+    edited = st.data_editor(
+        df,
+        column_config={"select": st.column_config.CheckboxColumn("✔", default=False)},
+        disabled=[c for c in df.columns if c != "select"],
+        hide_index=True,
+        use_container_width=True,
+        key="anomaly_flags_editor",
+    )
+    chosen = edited[edited["select"]]
+
+    col1, col2 = st.columns(2)
+    if col1.button(f"🚫 Confirm & reject {len(chosen)} mark(s)", disabled=chosen.empty, key="anomaly_confirm"):
+        for kind, group in chosen.groupby("kind"):
+            attendance_service.override_in_sessions(
+                conn,
+                group[["session_id", "attendance_id"]].itertuples(index=False, name=None),
+                "Rejected (Manual)",
+                f"Anomaly: {kind}",
+                actor_id,
+            )
+        anomaly_service.resolve_flags(conn, chosen["id"].tolist(), "confirmed", actor_id)
+        st.rerun()
+    if col2.button(f"✅ Dismiss {len(chosen)} flag(s)", disabled=chosen.empty, key="anomaly_dismiss"):
+        anomaly_service.resolve_flags(conn, chosen["id"].tolist(), "dismissed", actor_id)
+        st.rerun()
+
+
+def render_attendance_analytics(conn, user=None):
     st.subheader("Attendance Analytics")
     # If a teacher is logged in, show only attendance for their lectures
-    user = st.session_state.get("user")
     if user and user.get("role_name") == "teacher":
-        records = conn.execute(
-            "SELECT a.status, a.timestamp FROM attendance a JOIN lectures l ON a.session_id = l.session_id WHERE l.teacher_id = ?",
-            (user.get("id"),),
-        ).fetchall()
+        records = attendance_service.daily_status_counts(conn, teacher_id=user.get("id"))
     else:
-        records = conn.execute("SELECT status, timestamp FROM attendance").fetchall()
+        records = attendance_service.daily_status_counts(conn)
     if not records:
         st.info("No attendance data yet.")
         return
 
-    df = pd.DataFrame(records, columns=["status", "timestamp"])
-    if df.empty or "timestamp" not in df.columns:
-        st.info("No attendance data yet.")
-        return
-
-    # Parse timestamps defensively; coerce invalid values to NaT
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    # Drop rows with invalid timestamps
-    df = df.dropna(subset=["timestamp"]).copy()
-    if df.empty:
-        st.info("No valid attendance timestamps available.")
-        return
-
-    df["date"] = df["timestamp"].dt.date
-    summary = df.groupby(["date", "status"]).size().unstack(fill_value=0)
+    # Bucketed by day in SQL on the integer epoch column; only the day labels are converted.
+    df = pd.DataFrame(records, columns=["day", "status", "n"])
+    df["date"] = pd.to_datetime(df["day"], unit="D").dt.date
+    summary = df.pivot_table(index="date", columns="status", values="n", aggfunc="sum", fill_value=0)
 
     fig, ax = plt.subplots()
     summary.plot(kind="bar", ax=ax)
@@ -1,16 +1,75 @@
 import streamlit as st
 
 from core.security import verify_password
+from services import sessions as session_service
+from services import users as user_service
+
+# Query parameter holding the signed session token, so any app replica can resume the login.
+SESSION_PARAM = "sid"
+
+
+def current_session(conn, refresh: bool = False):
+    """This browser's login session, or ``None`` when logged out or the token is invalid.
+
+    The token is checked against the store once per script run (:func:`current_user`,
+    which app.py calls first, refreshes it); later calls in the run reuse that result.
+    """
+    token = st.query_params.get(SESSION_PARAM)
+    cached = st.session_state.get("login_session")
+    if not refresh and cached is not None and cached[0] == token:
+        return cached[1]
+    session = session_service.resolve(conn, token)
+    st.session_state["login_session"] = (token, session)
+    return session
+
+
+def current_user(conn):
+    """The logged-in user as a dict, loaded fresh from the database on every run."""
+    session = current_session(conn, refresh=True)
+    user = user_service.get_by_id(conn, session.user_id) if session else None
+    return dict(user) if user else None
+
+
+def _sign_in(conn, user):
+    st.query_params[SESSION_PARAM] = session_service.start(conn, user["id"])
+
+
+def sign_out(conn):
+    session_service.end(conn, current_session(conn))
+    st.query_params.pop(SESSION_PARAM, None)
+    st.session_state.pop("login_session", None)
+
+
+def clear_query_params():
+    """Drop everything from the URL except the session token."""
+    token = st.query_params.get(SESSION_PARAM)
+    st.query_params.clear()
+    if token:
+        st.query_params[SESSION_PARAM] = token
+
+
+def session_value(conn, key: str, default=None):
+    session = current_session(conn)
+    return session_service.get_value(conn, session, key, default) if session else default
+
+
+def set_session_value(conn, key: str, value):
+    """Store ``value`` (JSON) for this login; ``None`` removes it."""
+    session = current_session(conn)
+    if session is None:
+        return
+    if value is None:
+        session_service.pop_value(conn, session, key)
+    else:
+        session_service.set_value(conn, session, key, value)
 
 
 def get_user_by_enrollment(conn, enrollment: str):
-    cursor = conn.execute("SELECT * FROM users WHERE enrollment = ?", (enrollment,))
-    return cursor.fetchone()
+    return user_service.get_by_enrollment(conn, enrollment)
 
 
 def get_user_by_username(conn, username: str):
-    cursor = conn.execute("SELECT * FROM users WHERE username = ?", (username,))
-    return cursor.fetchone()
+    return user_service.get_by_username(conn, username)
 
 
 def login_user(conn):
@@ -23,8 +82,7 @@ def login_user(conn):
         if st.button("Login", key="login_student"):
             user = get_user_by_enrollment(conn, enrollment)
             if user and verify_password(password, user["password_hash"]):
-                st.session_state.user = dict(user)
-                st.session_state.role = role
+                _sign_in(conn, user)
                 st.success("Logged in successfully.")
                 st.rerun()
             else:
@@ -35,14 +93,11 @@ def login_user(conn):
         if st.button("Login", key="login_admin"):
             user = get_user_by_username(conn, username)
             if user and verify_password(password, user["password_hash"]):
-                actual_role = conn.execute(
-                    "SELECT name FROM roles WHERE id = ?", (user["role_id"],)
-                ).fetchone()
-                if not actual_role or actual_role["name"] != role:
+                actual_role = user_service.role_name(conn, user["role_id"])
+                if actual_role != role:
                     st.error(f"This account is not a {role}.")
                     return
-                st.session_state.user = dict(user)
-                st.session_state.role = role
+                _sign_in(conn, user)
                 st.success("Logged in successfully.")
                 st.rerun()
             else:
@@ -2,41 +2,26 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from core.utils import build_timeline, rows_to_dataframe
+from core.utils import now_local, rows_to_dataframe
+from services import attendance as attendance_service
+from services import notices as notice_service
+from services import schedules as schedule_service
 
 
 def render_student_dashboard(conn, user):
     st.subheader("Student Dashboard")
 
-    student_year = user.get("year")
-    student_batch = user.get("batch")
-    if student_year and student_batch:
-        total_lectures = conn.execute(
-            """
-            SELECT COUNT(*) FROM lectures
-            WHERE (year IS NULL OR year = ?) AND (batch IS NULL OR batch = ?)
-            """,
-            (student_year, student_batch),
-        ).fetchone()[0]
-    else:
-        total_lectures = conn.execute("SELECT COUNT(*) FROM lectures").fetchone()[0]
-
-    attended_lectures = conn.execute(
-        """
-        SELECT COUNT(*) FROM attendance a
-        WHERE a.enrollment = ? AND a.status IN ('Present', 'Late')
-        """,
-        (user["enrollment"],),
-    ).fetchone()[0]
-
-    attendance_pct = (attended_lectures / total_lectures * 100) if total_lectures else 0
+    summary = attendance_service.student_summary(conn, user["enrollment"], user.get("year"), user.get("batch"))
+    total_lectures = summary.total_lectures
+    attended_lectures = summary.attended
+    attendance_pct = summary.percent
 
     # ── 1. Attendance Pie Chart ──
     st.markdown("### 📊 Your Attendance")
     st.metric("✅ Attendance %", f"{attendance_pct:.1f}%", help="Based on lectures available for your year/batch")
 
     if total_lectures:
-        missed_lectures = max(total_lectures - attended_lectures, 0)
+        missed_lectures = summary.missed
         fig, ax = plt.subplots(figsize=(4, 4))
         ax.pie(
             [attended_lectures, missed_lectures],
@@ -54,20 +39,10 @@ def render_student_dashboard(conn, user):
 
     # ── 2. Latest Notice ──
     st.markdown("### 📢 Latest Notice")
-    latest_notice = conn.execute(
-        "SELECT n.title, n.body, n.created_at, u.name as poster FROM notices n LEFT JOIN users u ON n.posted_by = u.id ORDER BY n.created_at DESC LIMIT 1"
-    ).fetchone()
+    latest_notice = notice_service.latest(conn)
 
     if latest_notice:
-        try:
-            notice = dict(latest_notice)
-        except Exception:
-            notice = {
-                "title": latest_notice[0] if len(latest_notice) > 0 else "",
-                "body": latest_notice[1] if len(latest_notice) > 1 else "",
-                "created_at": latest_notice[2] if len(latest_notice) > 2 else "",
-                "poster": latest_notice[3] if len(latest_notice) > 3 else "Unknown",
-            }
+        notice = latest_notice
         n_title = str(notice.get("title", ""))
         n_body = str(notice.get("body", ""))
         n_date = str(notice.get("created_at", ""))[:10]
@@ -96,11 +71,26 @@ def render_student_dashboard(conn, user):
 
     # ── 3. Your Schedule ──
     st.markdown("### 🗓️ Your Schedule")
-    schedules = conn.execute("SELECT * FROM schedules ORDER BY day, time").fetchall()
+    year, batch = user.get("year"), user.get("batch")
+    if not (year and batch):
+        st.info("Your year/batch is not set yet, so no timetable can be shown.")
+        return
 
-    if schedules:
-        df = rows_to_dataframe(schedules)
-        display_cols = [c for c in ["day", "time", "subject", "room"] if c in df.columns]
-        st.dataframe(df[display_cols] if display_cols else df, use_container_width=True)
-    else:
-        st.info("No schedule entries yet.")
+    timetable = schedule_service.cohort_timetable(conn, year, batch)
+    if not timetable.rows:
+        st.info("No schedule entries for your year/batch yet.")
+        return
+
+    now = now_local()
+    current = timetable.current_lecture(now)
+    upcoming = timetable.next_lecture(now)
+    col1, col2 = st.columns(2)
+    if current:
+        col1.metric("🟢 Now", current.subject, f"{current.time} · {current.room or '-'}", delta_color="off")
+    if upcoming:
+        row, start = upcoming
+        col2.metric("⏭️ Next Lecture", row.subject, f"{start:%a %H:%M} · {row.room or '-'}", delta_color="off")
+
+    df = rows_to_dataframe(list(timetable.rows))
+    display_cols = [c for c in ["day", "time", "subject", "room"] if c in df.columns]
+    st.dataframe(df[display_cols] if display_cols else df, use_container_width=True)
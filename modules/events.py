@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-from core.utils import now_iso, rows_to_dataframe
+from services import events as event_service
+from services import settings as settings_service
 
 
 def render_events(conn, user):
@@ -20,51 +21,31 @@ def render_events(conn, user):
             if not (title and description and location):
                 st.error("All fields are required.")
             else:
-                # ensure contact_email column exists
-                cols = [r["name"] for r in conn.execute("PRAGMA table_info(events)").fetchall()]
-                if "contact_email" not in cols:
-                    conn.execute("ALTER TABLE events ADD COLUMN contact_email TEXT")
-
-                conn.execute(
-                    """
-                    INSERT INTO events (title, description, event_date, location, created_by, created_at, contact_email)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (title, description, event_date.isoformat(), location, user["id"], now_iso(), contact_email),
+                event_service.create_event(
+                    conn, title, description, event_date.isoformat(), location, user["id"], contact_email
                 )
-                conn.commit()
                 st.success("Event created.")
 
-    events = conn.execute("SELECT e.*, u.name as poster FROM events e LEFT JOIN users u ON e.created_by = u.id ORDER BY event_date DESC").fetchall()
+    events = event_service.list_with_poster(conn)
     if not events:
         st.info("No events yet.")
         return
     # Render events as notice-like containers (no table)
 
     # Fetch facility email from settings or use a sensible default
-    row = conn.execute("SELECT value FROM system_settings WHERE key = ?", ("facility_email",)).fetchone()
-    facility_email = row[0] if row and len(row) > 0 else "facility@college.edu"
+    facility_email = settings_service.get_setting(conn, "facility_email", "facility@college.edu")
 
     # Render events as notice-like cards with registration instructions via email
     st.markdown("---")
     st.subheader("Event Details & Registration")
     for ev in events:
-        if hasattr(ev, "keys"):
-            eid = ev["id"]
-            title = ev["title"]
-            keys = list(ev.keys())
-            desc = ev["description"] if "description" in keys else ""
-            date = ev["event_date"] if "event_date" in keys else ""
-            location = ev["location"] if "location" in keys else ""
-            contact = ev["contact_email"] if "contact_email" in keys else None
-            poster = ev["poster"] if "poster" in keys else None
-            created_at = ev["created_at"] if "created_at" in keys else None
-        else:
-            # column order fallback
-            eid, title, desc, date, location = ev[0], ev[1], ev[2], ev[3], ev[4]
-            contact = ev[5] if len(ev) > 5 else None
-            poster = None
-            created_at = None
+        title = ev["title"]
+        desc = ev.get("description", "")
+        date = ev.get("event_date", "")
+        location = ev.get("location", "")
+        contact = ev.get("contact_email")
+        poster = ev.get("poster")
+        created_at = ev.get("created_at")
 
         safe_subject = title.replace(' ', '%20')
         contact_info = f"Contact: {contact}" if contact else f"Email: {facility_email}"
@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
 
-from core.utils import now_iso, rows_to_dataframe
+from core.utils import rows_to_dataframe
+from services import attendance as attendance_service
+from services import feedback as feedback_service
+from services import lectures as lecture_service
 
 
 def render_feedback(conn, user):
@@ -9,42 +12,22 @@ def render_feedback(conn, user):
 
     # Students may only give feedback for lectures they attended (Present or Late).
     if user.get("role_name") == "student":
-        att_rows = conn.execute(
-            "SELECT DISTINCT session_id FROM attendance WHERE enrollment = ? AND status IN ('Present', 'Late')",
-            (user.get("enrollment"),),
-        ).fetchall()
-        session_ids = [r["session_id"] for r in att_rows] if att_rows else []
+        session_ids = attendance_service.attended_session_ids(conn, user.get("enrollment"))
         if not session_ids:
             st.info("No attended lectures found for feedback.")
             return
-        placeholders = ",".join(["?" for _ in session_ids])
-        lectures = conn.execute(
-            f"SELECT session_id, subject, room, start_time, end_time FROM lectures WHERE session_id IN ({placeholders}) ORDER BY start_time DESC",
-            tuple(session_ids),
-        ).fetchall()
+        lectures = lecture_service.list_brief(conn, session_ids)
     else:
-        lectures = conn.execute(
-            "SELECT session_id, subject, room, start_time, end_time FROM lectures ORDER BY start_time DESC"
-        ).fetchall()
+        lectures = lecture_service.list_brief(conn)
     if not lectures:
         st.info("No lectures found.")
         return
 
-    if lectures and hasattr(lectures[0], "keys"):
-        lecture_map = {row["session_id"]: row for row in lectures}
-    else:
-        # columns order: session_id, subject, room, start_time, end_time
-        lecture_map = {row[0]: row for row in lectures}
+    lecture_map = {row.session_id: row for row in lectures}
 
     def _lecture_label(session_id: str) -> str:
         row = lecture_map[session_id]
-        if isinstance(row, dict) or hasattr(row, "keys"):
-            subject = row["subject"]
-            room = row["room"]
-            start_time = row["start_time"]
-            end_time = row["end_time"]
-        else:
-            subject, room, start_time, end_time = row[1], row[2], row[3], row[4]
+        subject, room, start_time, end_time = row.subject, row.room, row.start_time, row.end_time
 
         # Split into readable date + time with spacing
         date_part = str(start_time)[:10] if start_time else ""
@@ -68,32 +51,13 @@ def render_feedback(conn, user):
             submitted = st.form_submit_button("Submit Feedback")
 
         if submitted:
-            existing = conn.execute(
-                "SELECT id FROM feedback WHERE session_id = ? AND enrollment = ?",
-                (session_id, user["enrollment"]),
-            ).fetchone()
-            if existing:
+            if feedback_service.has_submitted(conn, session_id, user["enrollment"]):
                 st.warning("You have already submitted feedback for this lecture.")
             else:
-                conn.execute(
-                    """
-                    INSERT INTO feedback (session_id, enrollment, rating, comments, created_at)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (session_id, user["enrollment"], rating, comments, now_iso()),
-                )
-                conn.commit()
+                feedback_service.submit(conn, session_id, user["enrollment"], rating, comments)
                 st.success("Feedback submitted.")
 
-    records = conn.execute(
-        """
-        SELECT f.session_id, f.rating, f.comments, f.created_at,
-               l.subject, l.room, l.start_time, l.end_time
-        FROM feedback f
-        LEFT JOIN lectures l ON f.session_id = l.session_id
-        ORDER BY f.created_at DESC
-        """
-    ).fetchall()
+    records = feedback_service.list_with_lectures(conn)
     if records:
         df = rows_to_dataframe(records)
 
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-from core.utils import now_iso, rows_to_dataframe, add_datetime_columns
-from core.db import DB_PATH
+from core.utils import rows_to_dataframe, add_datetime_columns
+from services import issues as issue_service
 
 
 def render_issues(conn, user):
@@ -19,18 +19,10 @@ def render_issues(conn, user):
             if not (title and description):
                 st.error("Title and description are required.")
             else:
-                cur = conn.execute(
-                    """
-                    INSERT INTO issues (title, category, description, status, reported_by, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (title, category, description, "Open", user["id"], now_iso()),
-                )
-                conn.commit()
-                last_id = cur.lastrowid if hasattr(cur, "lastrowid") else None
+                issue_service.create_issue(conn, title, category, description, user["id"])
                 st.success(f"Issue reported.")
 
-    issues = conn.execute("SELECT * FROM issues ORDER BY created_at DESC").fetchall()
+    issues = issue_service.list_all(conn)
     if not issues:
         st.info("No issues reported.")
         return
@@ -45,24 +37,6 @@ def render_issues(conn, user):
         issue_id = st.number_input("Issue ID", min_value=1, step=1)
         status = st.selectbox("Update Status", ["Open", "In Progress", "Resolved"])
         if st.button("Update Issue Status"):
-            if status == "Resolved":
-                conn.execute(
-                    """
-                    UPDATE issues
-                    SET status = ?, resolved_by = ?, resolved_at = ?
-                    WHERE id = ?
-                    """,
-                    (status, user["id"], now_iso(), int(issue_id)),
-                )
-            else:
-                conn.execute(
-                    """
-                    UPDATE issues
-                    SET status = ?, resolved_by = NULL, resolved_at = NULL
-                    WHERE id = ?
-                    """,
-                    (status, int(issue_id)),
-                )
-            conn.commit()
+            issue_service.update_status(conn, int(issue_id), status, user["id"])
             st.success("Issue status updated.")
             st.rerun()
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-from core.utils import now_iso, rows_to_dataframe, add_datetime_columns
-from core.db import DB_PATH
+from core.utils import rows_to_dataframe, add_datetime_columns
+from services import lost_found as lost_found_service
 
 
 def render_lost_found(conn, user):
@@ -19,18 +19,10 @@ def render_lost_found(conn, user):
         if not (title and description and contact):
             st.error("All fields are required.")
         else:
-            cur = conn.execute(
-                """
-                INSERT INTO lost_found (item_type, title, description, contact, posted_by, created_at, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (item_type, title, description, contact, user["id"], now_iso(), "Open"),
-            )
-            conn.commit()
-            last_id = cur.lastrowid if hasattr(cur, "lastrowid") else None
+            lost_found_service.create_post(conn, item_type, title, description, contact, user["id"])
             st.success(f"Post created.")
 
-    items = conn.execute("SELECT * FROM lost_found ORDER BY created_at DESC").fetchall()
+    items = lost_found_service.list_all(conn)
     if not items:
         st.info("No posts yet.")
         return
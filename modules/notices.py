@@ -1,5 +1,6 @@
 import streamlit as st
-from core.utils import now_iso, build_timeline
+from core.utils import build_timeline
+from services import notices as notice_service
 
 
 def render_notice_board(conn, user):
@@ -22,20 +23,14 @@ def render_notice_board(conn, user):
                 if not title or not body:
                     st.error("❌ Title and content are required.")
                 else:
-                    conn.execute(
-                        "INSERT INTO notices (title, body, posted_by, created_at) VALUES (?, ?, ?, ?)",
-                        (f"[{priority}] {title}", body, user["id"], now_iso()),
-                    )
-                    conn.commit()
+                    notice_service.create_notice(conn, f"[{priority}] {title}", body, user["id"])
                     st.success("✅ Notice posted successfully!")
                     st.rerun()
         
         st.markdown("---")
 
     # Display notices
-    notices = conn.execute(
-        "SELECT n.*, u.name as poster FROM notices n LEFT JOIN users u ON n.posted_by = u.id ORDER BY created_at DESC LIMIT 50"
-    ).fetchall()
+    notices = notice_service.list_recent(conn, limit=50)
 
     if not notices:
         st.info("📭 No notices yet.")
@@ -44,7 +39,7 @@ def render_notice_board(conn, user):
     # Search filter
     search = st.text_input("🔍 Search Notices", placeholder="Type to search...")
     
-    timeline = build_timeline([dict(row) for row in notices])
+    timeline = build_timeline(notices)
     
     for item in timeline:
         if search and search.lower() not in item['title'].lower() and search.lower() not in item['body'].lower():
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 
 from core.utils import rows_to_dataframe
+from services import schedules as schedule_service
+from services import users as user_service
 
 
 def render_schedule(conn, user):
@@ -9,14 +11,8 @@ def render_schedule(conn, user):
 
     if user.get("role_name") != "student":
         # Prepare year/batch choices from existing student data
-        student_rows = conn.execute(
-            "SELECT u.year, u.batch FROM users u LEFT JOIN roles r ON u.role_id = r.id WHERE r.name = 'student'"
-        ).fetchall()
-        available_years = sorted({row["year"] for row in student_rows if row["year"] is not None})
-        for y in [1, 2, 3, 4, 5]:
-            if y not in available_years:
-                available_years.append(y)
-        available_years = sorted(available_years)
+        cohorts = user_service.student_cohorts(conn)
+        available_years = user_service.year_choices(cohorts)
 
         with st.form("schedule_form"):
             day = st.selectbox("Day", ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"])
@@ -24,9 +20,7 @@ def render_schedule(conn, user):
             subject = st.text_input("Subject")
             room = st.text_input("Room")
             year = st.selectbox("Year", available_years, index=0)
-            available_batches = sorted({row["batch"] for row in student_rows if row["year"] == year and row["batch"] is not None})
-            if not available_batches:
-                available_batches = [1, 2, 3, 4]
+            available_batches = user_service.batch_choices(cohorts, year)
             batch = st.selectbox("Batch", available_batches, index=0)
             submitted = st.form_submit_button("Add Schedule")
 
@@ -34,34 +28,40 @@ def render_schedule(conn, user):
             if not (day and time and subject):
                 st.error("Day, time, and subject are required.")
             else:
-                conn.execute(
-                    "INSERT INTO schedules (day, time, subject, room, teacher_id, year, batch) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (day, time, subject, room, user["id"], int(year), int(batch)),
-                )
-                conn.commit()
-                st.success("Schedule added.")
+                try:
+                    schedule_service.create_schedule(conn, day, time, subject, room, user["id"], int(year), int(batch))
+                    st.success("Schedule added.")
+                except schedule_service.ScheduleConflict as e:
+                    st.error("This slot overlaps existing timetable entries:")
+                    for row, reasons in e.conflicts:
+                        st.write(f"- {row.day} {row.time} {row.subject} ({row.room or '-'}, Y{row.year} B{row.batch}): {', '.join(reasons)}")
+                except ValueError:
+                    st.error("Time must be a range such as 10:00-11:00.")
 
     student_year = user.get("year")
     student_batch = user.get("batch")
     if student_year and student_batch and user.get("role_name") == "student":
-        schedules = conn.execute(
-            """
-            SELECT * FROM schedules
-            WHERE year = ? AND batch = ?
-            ORDER BY day, time
-            """,
-            (student_year, student_batch),
-        ).fetchall()
+        schedules = schedule_service.list_for_cohort(conn, student_year, student_batch)
         if not schedules:
             st.info("No schedule entries for your year/batch yet.")
             return
 
+        _render_week_grid(schedule_service.weekly_grid(conn, student_year, student_batch))
         df = rows_to_dataframe(schedules)
         display = [c for c in ["day", "time", "subject", "room"] if c in df.columns]
         st.dataframe(df[display], use_container_width=True)
         return
 
-    schedules = conn.execute("SELECT * FROM schedules ORDER BY day, time").fetchall()
+    cohorts = user_service.student_cohorts(conn)
+    grid_years = user_service.year_choices(cohorts)
+    col1, col2 = st.columns(2)
+    with col1:
+        grid_year = st.selectbox("Weekly grid: Year", grid_years, key="grid_year")
+    with col2:
+        grid_batch = st.selectbox("Weekly grid: Batch", user_service.batch_choices(cohorts, grid_year), key="grid_batch")
+    _render_week_grid(schedule_service.weekly_grid(conn, int(grid_year), int(grid_batch)))
+
+    schedules = schedule_service.list_all(conn)
     if not schedules:
         st.info("No schedule entries yet.")
         return
@@ -69,3 +69,13 @@ def render_schedule(conn, user):
     df = rows_to_dataframe(schedules)
     display_cols = [c for c in ["day", "time", "subject", "room", "year", "batch"] if c in df.columns]
     st.dataframe(df[display_cols] if display_cols else df, use_container_width=True)
+
+
+def _render_week_grid(grid):
+    if not grid:
+        return
+    df = rows_to_dataframe(grid).set_index("slot")
+    # Hide weekdays with no classes (usually Sunday).
+    df = df.loc[:, df.notna().any()].fillna("")
+    st.markdown("#### Weekly Timetable")
+    st.dataframe(df, use_container_width=True)
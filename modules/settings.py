@@ -1,37 +1,86 @@
 import streamlit as st
-from core.utils import now_iso
 
-
-def _get_setting(conn, key: str, default: str):
-    row = conn.execute("SELECT value FROM system_settings WHERE key = ?", (key,)).fetchone()
-    return row["value"] if row else default
-
-
-def _set_setting(conn, key: str, value: str):
-    conn.execute(
-        """
-        INSERT INTO system_settings (key, value, updated_at)
-        VALUES (?, ?, ?)
-        ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
-        """,
-        (key, value, now_iso()),
-    )
-    conn.commit()
+from core.cache import query_cache
+from core.utils import QR_DIR
+from core.utils import rows_to_dataframe
+from services import rooms as room_service
+from services.lectures import collect_qr_garbage
+from services.settings import (
+    DEFAULT_LATE_AFTER_MIN,
+    DEFAULT_QR_ROTATION_SEC,
+    DEFAULT_RADIUS_M,
+    DEFAULT_TIME_WINDOW_MIN,
+    get_setting as _get_setting,
+    set_setting as _set_setting,
+)
 
 
 def render_settings(conn):
     st.subheader("System Settings")
 
-    default_radius = float(_get_setting(conn, "radius_m", "40"))
-    default_late = int(_get_setting(conn, "late_after_min", "10"))
-    time_window = int(_get_setting(conn, "time_window_min", "60"))
+    default_radius = float(_get_setting(conn, "radius_m", str(DEFAULT_RADIUS_M)))
+    default_late = int(_get_setting(conn, "late_after_min", str(DEFAULT_LATE_AFTER_MIN)))
+    time_window = int(_get_setting(conn, "time_window_min", str(DEFAULT_TIME_WINDOW_MIN)))
+    qr_rotation = int(_get_setting(conn, "qr_rotation_sec", str(DEFAULT_QR_ROTATION_SEC)))
 
     radius_m = st.number_input("Default Radius (meters)", min_value=10, max_value=100, value=int(default_radius))
     late_after_min = st.number_input("Default Late Window (minutes)", min_value=0, max_value=30, value=int(default_late))
     time_window_min = st.number_input("Default Lecture Duration (minutes)", min_value=30, max_value=240, value=int(time_window))
+    qr_rotation_sec = st.number_input(
+        "Default QR Rotation (seconds, 0 = static code)", min_value=0, max_value=60, value=qr_rotation
+    )
 
     if st.button("Save Settings"):
         _set_setting(conn, "radius_m", str(radius_m))
         _set_setting(conn, "late_after_min", str(late_after_min))
         _set_setting(conn, "time_window_min", str(time_window_min))
+        _set_setting(conn, "qr_rotation_sec", str(qr_rotation_sec))
         st.success("Settings saved.")
+
+    st.markdown("---")
+    st.subheader("Rooms")
+    st.caption("Surveyed classroom coordinates; lectures in these rooms skip live GPS capture.")
+    with st.form("room_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            room_name = st.text_input("Room Name (e.g., C303)")
+            building = st.text_input("Building")
+            room_radius = st.number_input("Radius (meters)", min_value=10, max_value=100, value=int(default_radius))
+        with col2:
+            room_lat = st.number_input("Latitude", value=0.0, format="%.6f")
+            room_lon = st.number_input("Longitude", value=0.0, format="%.6f")
+        room_submitted = st.form_submit_button("Save Room")
+    if room_submitted:
+        if not room_name.strip() or (room_lat == 0.0 and room_lon == 0.0):
+            st.error("Room name and coordinates are required.")
+        else:
+            room_service.upsert_room(conn, room_name, building, room_lat, room_lon, float(room_radius))
+            st.success(f"Room {room_name.strip()} saved.")
+
+    rooms = room_service.list_rooms(conn)
+    if rooms:
+        st.dataframe(rows_to_dataframe(rooms), use_container_width=True)
+        room_by_label = {f"{r.name} ({r.building or '-'})": r for r in rooms}
+        to_delete = st.selectbox("Remove Room", list(room_by_label))
+        if st.button("Delete Room"):
+            room_service.delete_room(conn, room_by_label[to_delete].id)
+            st.success(f"Room {room_by_label[to_delete].name} removed.")
+            st.rerun()
+
+    with st.expander("Query Cache"):
+        stats = query_cache.stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        c2.metric("Hits / Misses", f"{stats['hits']} / {stats['misses']}")
+        c3.metric("Entries", stats["entries"])
+        c4.metric("Memory", f"{stats['bytes'] / 2**20:.1f} / {stats['max_bytes'] / 2**20:.0f} MB")
+        st.caption(f"Evictions: {stats['evictions']}")
+        if st.button("Clear Query Cache"):
+            query_cache.clear()
+            st.success("Query cache cleared.")
+
+    with st.expander("QR Code Storage"):
+        st.caption(f"{sum(1 for _ in QR_DIR.glob('qr_*.png'))} QR images in {QR_DIR}")
+        if st.button("Remove QR Codes of Ended Lectures"):
+            removed = collect_qr_garbage(conn)
+            st.success(f"Removed {removed} QR image(s).")
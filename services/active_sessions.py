@@ -0,0 +1,146 @@
+"""In-memory state for lectures that are taking attendance.
+
+Every submission during a lecture needs the same lecture window, geofence and "has this
+student already marked?" answer.  :class:`ActiveSessionCache` loads them once per
+session id (the lecture row plus the enrollments already marked) and keeps the marked
+set current as :func:`services.attendance.mark` inserts, so the duplicate check and the
+status computation never touch SQLite; only the final INSERT does.
+
+Marks written by another process are not seen here, but the upsert in
+:func:`services.attendance.mark` still resolves them against the table's
+``UNIQUE(session_id, enrollment)``; when it keeps such a mark the entry is dropped so the
+next load picks up the real state.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Optional, Tuple
+
+from core.shards import route_session
+from core.utils import add_minutes, haversine_distance, parse_iso
+from services.lectures import lookup_lecture
+
+# Submissions are accepted from two minutes before the start, to absorb clock drift.
+EARLY_BUFFER = timedelta(minutes=2)
+# Entries for lectures that ended this long ago are dropped on the next access.
+EXPIRE_AFTER_END = timedelta(hours=1)
+MAX_ACTIVE_SESSIONS = 256
+
+
+@dataclass
+class ActiveSession:
+    session_id: str
+    start: datetime
+    end: datetime
+    late_after: datetime
+    latitude: float
+    longitude: float
+    radius_m: float
+    qr_rotation_sec: int
+    # enrollment -> (status, timestamp, overridden by staff)
+    marked: Dict[str, Tuple[str, str, bool]] = field(default_factory=dict)
+
+    def distance_m(self, lat: float, lon: float) -> float:
+        return haversine_distance(lat, lon, self.latitude, self.longitude)
+
+    def status_for(self, distance_m: float, now: datetime) -> str:
+        if now < self.start - EARLY_BUFFER:
+            return f"Rejected (Too Early - Starts {self.start.strftime('%H:%M')})"
+        if now > self.end:
+            return f"Rejected (Closed - Ended {self.end.strftime('%H:%M')})"
+        if distance_m <= self.radius_m:
+            return "Present" if now <= self.late_after else "Late"
+        return f"Rejected (Out of Radius: {distance_m:.1f}m > {self.radius_m}m)"
+
+    def mark_of(self, enrollment: str) -> Optional[Tuple[str, str, bool]]:
+        return self.marked.get(enrollment)
+
+    def can_retry(self, enrollment: str) -> bool:
+        """Whether a new attempt may replace the existing mark (see :func:`services.attendance.mark`)."""
+        mark = self.marked.get(enrollment)
+        return mark is not None and mark[0].startswith("Rejected") and not mark[2]
+
+
+def _load(conn, session_id: str) -> Optional[ActiveSession]:
+    lecture = lookup_lecture(conn, session_id)
+    if lecture is None:
+        return None
+    start = parse_iso(lecture.start_time)
+    marked = {
+        row[0]: (row[1], row[2], row[3] is not None)
+        for row in conn.execute(
+            "SELECT enrollment, status, timestamp, override_reason FROM attendance WHERE session_id = ?",
+            (session_id,),
+        )
+    }
+    return ActiveSession(
+        session_id=session_id,
+        start=start,
+        end=parse_iso(lecture.end_time),
+        late_after=add_minutes(start, int(lecture.late_after_min)),
+        latitude=float(lecture.latitude),
+        longitude=float(lecture.longitude),
+        radius_m=float(lecture.radius_m),
+        qr_rotation_sec=int(lecture.qr_rotation_sec or 0),
+        marked=marked,
+    )
+
+
+class ActiveSessionCache:
+    def __init__(self, max_sessions: int = MAX_ACTIVE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[Hashable, ActiveSession]" = OrderedDict()
+
+    @staticmethod
+    def _key(conn, session_id: str):
+        return getattr(conn, "db_path", None), session_id
+
+    def get(self, conn, session_id: str, now: datetime) -> Optional[ActiveSession]:
+        """The session's cached state, loading it on first use; ``None`` for unknown ids."""
+        # Keyed by the database holding the marks, as services.attendance.mark records them.
+        conn = route_session(conn, session_id)
+        key = self._key(conn, session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                if now - session.end <= EXPIRE_AFTER_END:
+                    self._sessions.move_to_end(key)
+                    return session
+                del self._sessions[key]
+
+        session = _load(conn, session_id)
+        if session is None or now - session.end > EXPIRE_AFTER_END:
+            # Long-finished lectures are served straight from the database, not kept.
+            return session
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the one already shared.
+            session = self._sessions.setdefault(key, session)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def record_mark(self, conn, session_id: str, enrollment: str, status: str, timestamp: str,
+                    overridden: bool = False):
+        with self._lock:
+            session = self._sessions.get(self._key(conn, session_id))
+            if session is not None:
+                session.marked[enrollment] = (status, timestamp, overridden)
+
+    def discard(self, conn, session_id: str):
+        with self._lock:
+            self._sessions.pop(self._key(conn, session_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+active_sessions = ActiveSessionCache()
@@ -0,0 +1,333 @@
+"""Batch anomaly detection over attendance GPS fixes.
+
+Each run looks at marks newer than the stored watermark and flags, for review:
+
+* ``SHARED_COORDINATES``: several enrollments in one session reporting the exact same
+  fix, which is what one phone marking for a group looks like;
+* ``IMPOSSIBLE_TRAVEL``: a mark too far from the student's previous mark to have been
+  reached in the time between them;
+* ``REMOTE_CLUSTER``: several enrollments marking from the same spot well outside the
+  room's geofence.
+
+Sessions and students touched by new marks are re-read in full and evaluated with
+vectorised pandas/numpy operations; flags are unique per (mark, kind), so re-evaluating
+older marks never duplicates them.  Run it from cron or the override page::
+
+    python -m services.anomalies
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from core.cache import cached_query, invalidate
+from core.models import Record
+from core.utils import haversine_distance, now_iso, now_local, parse_iso
+from services.settings import get_setting, set_setting
+
+FLAG_SHARED = "SHARED_COORDINATES"
+FLAG_TRAVEL = "IMPOSSIBLE_TRAVEL"
+FLAG_CLUSTER = "REMOTE_CLUSTER"
+FLAG_KINDS = (FLAG_SHARED, FLAG_TRAVEL, FLAG_CLUSTER)
+
+WATERMARK_KEY = "anomaly_watermark"
+# Marks younger than this are left for the next run, so a write still committing is not skipped.
+SCAN_LAG_SEC = 5
+
+# Six decimals is ~0.1 m: separate phones practically never agree to that precision.
+SHARED_COORD_DECIMALS = 6
+SHARED_MIN_ENROLLMENTS = 3
+# ~180 km/h, and only over distances GPS jitter cannot explain.
+MAX_TRAVEL_SPEED_MPS = 50.0
+MIN_TRAVEL_DISTANCE_M = 1000.0
+# Clusters are counted on a ~50 m grid, beyond three geofence radii from the room.
+CLUSTER_CELL_DEG = 0.0005
+CLUSTER_MIN_ENROLLMENTS = 3
+CLUSTER_RADIUS_FACTOR = 3.0
+
+
+MAX_TRACKED_STUDENTS = 50_000
+
+
+@dataclass(frozen=True)
+class Position:
+    session_id: str
+    timestamp: str
+    latitude: float
+    longitude: float
+
+
+def _has_fix(latitude, longitude) -> bool:
+    return latitude is not None and longitude is not None and (latitude != 0 or longitude != 0)
+
+
+class LastPositionCache:
+    """Each student's latest marked position, so a new mark's implied speed is one dict lookup.
+
+    Misses fall back to one probe of ``idx_attendance_enrollment_time``; :func:`record` is
+    called after every successful mark.
+    """
+
+    def __init__(self, max_students: int = MAX_TRACKED_STUDENTS):
+        self.max_students = max_students
+        self._lock = threading.Lock()
+        self._positions: "OrderedDict[Hashable, Optional[Position]]" = OrderedDict()
+
+    def get(self, conn, enrollment: str) -> Optional[Position]:
+        key = (getattr(conn, "db_path", None), enrollment)
+        with self._lock:
+            if key in self._positions:
+                self._positions.move_to_end(key)
+                return self._positions[key]
+        row = conn.execute(
+            """
+            SELECT session_id, timestamp, latitude, longitude FROM attendance
+            WHERE enrollment = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+              AND (latitude != 0 OR longitude != 0)
+            ORDER BY timestamp DESC LIMIT 1
+            """,
+            (enrollment,),
+        ).fetchone()
+        position = Position(*row) if row else None
+        self._store(key, position)
+        return position
+
+    def record(self, conn, enrollment: str, session_id: str, timestamp: str, latitude, longitude):
+        if _has_fix(latitude, longitude):
+            self._store((getattr(conn, "db_path", None), enrollment), Position(session_id, timestamp, latitude, longitude))
+
+    def _store(self, key, position: Optional[Position]):
+        with self._lock:
+            current = self._positions.get(key)
+            # Never move a student backwards in time (a late loader racing a new mark).
+            if position is None or current is None or position.timestamp >= current.timestamp:
+                self._positions[key] = position
+            self._positions.move_to_end(key)
+            while len(self._positions) > self.max_students:
+                self._positions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+
+
+last_positions = LastPositionCache()
+
+
+def implied_speed(previous: Optional[Position], session_id: str, timestamp: str, latitude, longitude) -> Optional[float]:
+    """Metres per second from ``previous`` to this mark, when it is an impossible journey."""
+    if previous is None or previous.session_id == session_id or not _has_fix(latitude, longitude):
+        return None
+    distance = haversine_distance(previous.latitude, previous.longitude, latitude, longitude)
+    if distance < MIN_TRAVEL_DISTANCE_M:
+        return None
+    seconds = (parse_iso(timestamp) - parse_iso(previous.timestamp)).total_seconds()
+    speed = distance / seconds if seconds > 0 else float("inf")
+    return speed if speed > MAX_TRAVEL_SPEED_MPS else None
+
+
+@dataclass
+class ScanResult:
+    marks: int = 0
+    sessions: int = 0
+    watermark: str = ""
+    # Marks matching each check in this run, and how many of those were not flagged before.
+    flags: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(FLAG_KINDS, 0))
+    new_flags: int = 0
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371000.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _frame(conn, sql: str, params: Sequence) -> pd.DataFrame:
+    cursor = conn.execute(sql, tuple(params))
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+
+
+def _with_fix(df: pd.DataFrame) -> pd.DataFrame:
+    # (0, 0) is what the form submits when no location was given.
+    has_fix = df["latitude"].notna() & df["longitude"].notna() & ((df["latitude"] != 0) | (df["longitude"] != 0))
+    return df[has_fix]
+
+
+def _shared_coordinates(marks: pd.DataFrame) -> pd.DataFrame:
+    lat = marks["latitude"].round(SHARED_COORD_DECIMALS)
+    lon = marks["longitude"].round(SHARED_COORD_DECIMALS)
+    counts = marks.groupby([marks["session_id"], lat, lon])["enrollment"].transform("nunique")
+    hits = marks[counts >= SHARED_MIN_ENROLLMENTS].assign(score=counts[counts >= SHARED_MIN_ENROLLMENTS])
+    hits["details"] = [
+        f"{int(n)} enrollments reported {la:.6f}, {lo:.6f}"
+        for n, la, lo in zip(hits["score"], hits["latitude"], hits["longitude"])
+    ]
+    return hits.assign(kind=FLAG_SHARED)
+
+
+def _remote_clusters(marks: pd.DataFrame) -> pd.DataFrame:
+    distance = marks["distance_m"].fillna(
+        pd.Series(_haversine_m(marks["latitude"], marks["longitude"], marks["room_lat"], marks["room_lon"]), index=marks.index)
+    )
+    far = marks[distance > marks["radius_m"] * CLUSTER_RADIUS_FACTOR].assign(distance=distance)
+    cell_lat = np.floor(far["latitude"] / CLUSTER_CELL_DEG)
+    cell_lon = np.floor(far["longitude"] / CLUSTER_CELL_DEG)
+    counts = far.groupby([far["session_id"], cell_lat, cell_lon])["enrollment"].transform("nunique")
+    hits = far[counts >= CLUSTER_MIN_ENROLLMENTS].assign(score=counts[counts >= CLUSTER_MIN_ENROLLMENTS])
+    hits["details"] = [
+        f"{int(n)} enrollments marked together {d:.0f} m from the room" for n, d in zip(hits["score"], hits["distance"])
+    ]
+    return hits.assign(kind=FLAG_CLUSTER)
+
+
+def _impossible_travel(marks: pd.DataFrame, watermark: str) -> pd.DataFrame:
+    marks = marks.assign(at=pd.to_datetime(marks["timestamp"], errors="coerce")).dropna(subset=["at"])
+    marks = marks.sort_values(["enrollment", "at"])
+    previous = marks.groupby("enrollment")[["latitude", "longitude", "at", "session_id"]].shift()
+    distance = _haversine_m(marks["latitude"], marks["longitude"], previous["latitude"], previous["longitude"])
+    seconds = (marks["at"] - previous["at"]).dt.total_seconds().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(seconds > 0, distance / seconds, np.inf)
+    hit = (
+        previous["at"].notna().to_numpy()
+        & (previous["session_id"] != marks["session_id"]).to_numpy()
+        & (distance >= MIN_TRAVEL_DISTANCE_M)
+        & (speed > MAX_TRAVEL_SPEED_MPS)
+        & (marks["timestamp"] > watermark).to_numpy()
+    )
+    hits = marks[hit].assign(score=np.minimum(speed[hit], 1e9))
+    hits["details"] = [
+        f"{d / 1000:.1f} km from the previous mark ({prev}) in {s / 60:.0f} min"
+        for d, s, prev in zip(distance[hit], seconds[hit], previous["session_id"][hit])
+    ]
+    return hits.assign(kind=FLAG_TRAVEL)
+
+
+def scan(conn, full: bool = False) -> ScanResult:
+    """Flag anomalies among marks newer than the watermark (all marks with ``full``)."""
+    watermark = "" if full else get_setting(conn, WATERMARK_KEY, "")
+    upper = (now_local() - timedelta(seconds=SCAN_LAG_SEC)).isoformat()
+    result = ScanResult(watermark=watermark)
+
+    new = _frame(
+        conn, "SELECT session_id, enrollment, timestamp FROM attendance WHERE timestamp > ? AND timestamp <= ?",
+        (watermark, upper),
+    )
+    if new.empty:
+        return result
+    result.marks = len(new)
+    result.sessions = new["session_id"].nunique()
+    result.watermark = new["timestamp"].max()
+
+    sessions = _with_fix(_frame(
+        conn,
+        """
+        SELECT a.id, a.session_id, a.enrollment, a.latitude, a.longitude, a.distance_m,
+               l.latitude AS room_lat, l.longitude AS room_lon, l.radius_m
+        FROM attendance a
+        JOIN lectures l ON l.session_id = a.session_id
+        WHERE a.session_id IN (SELECT session_id FROM attendance WHERE timestamp > ? AND timestamp <= ?)
+          AND a.timestamp <= ?
+        """,
+        (watermark, upper, upper),
+    ))
+    students = _with_fix(_frame(
+        conn,
+        """
+        SELECT id, session_id, enrollment, timestamp, latitude, longitude
+        FROM attendance
+        WHERE enrollment IN (SELECT enrollment FROM attendance WHERE timestamp > ? AND timestamp <= ?)
+          AND timestamp <= ?
+        """,
+        (watermark, upper, upper),
+    ))
+
+    flagged = pd.concat(
+        [_shared_coordinates(sessions), _remote_clusters(sessions), _impossible_travel(students, watermark)],
+        ignore_index=True,
+    )
+    created_at = now_iso()
+    rows = [
+        (int(row.id), row.session_id, row.enrollment, row.kind, float(row.score), row.details, created_at)
+        for row in flagged[["id", "session_id", "enrollment", "kind", "score", "details"]].itertuples(index=False)
+    ]
+    cursor = conn.executemany(
+        """
+        INSERT INTO attendance_flags (attendance_id, session_id, enrollment, kind, score, details, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+        """,
+        rows,
+    )
+    result.new_flags = max(cursor.rowcount, 0)
+    for kind, count in flagged["kind"].value_counts().items():
+        result.flags[kind] = int(count)
+    # set_setting commits, so the flags and the new watermark land together.
+    set_setting(conn, WATERMARK_KEY, result.watermark)
+    invalidate(conn, "attendance_flags")
+    return result
+
+
+@cached_query("attendance_flags", "users", "lectures")
+def list_flags(conn, status: str = "open", limit: int = 500) -> List[Record]:
+    return conn.execute(
+        """
+        SELECT f.id, f.kind, f.session_id, l.subject, f.enrollment, u.name, f.details, f.score,
+               f.attendance_id, f.created_at
+        FROM attendance_flags f
+        LEFT JOIN lectures l ON l.session_id = f.session_id
+        LEFT JOIN users u ON u.enrollment = f.enrollment
+        WHERE f.status = ?
+        ORDER BY f.created_at DESC, f.id DESC
+        LIMIT ?
+        """,
+        (status, limit),
+    ).fetchall()
+
+
+def count_open(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM attendance_flags WHERE status = 'open'").fetchone()[0]
+
+
+def resolve_flags(conn, flag_ids: Sequence[int], status: str, actor_id: Optional[int]) -> int:
+    """Close flags as ``confirmed`` or ``dismissed``; returns the number updated."""
+    if status not in ("confirmed", "dismissed"):
+        raise ValueError(f"Unknown flag resolution: {status}")
+    reviewed_at = now_iso()
+    cursor = conn.executemany(
+        "UPDATE attendance_flags SET status = ?, reviewed_by = ?, reviewed_at = ? WHERE id = ? AND status = 'open'",
+        [(status, actor_id, reviewed_at, int(flag_id)) for flag_id in flag_ids],
+    )
+    conn.commit()
+    invalidate(conn, "attendance_flags")
+    return cursor.rowcount
+
+
+def main(argv=None):
+    from core.db import init_db
+
+    parser = argparse.ArgumentParser(description="Flag anomalous attendance marks for review.")
+    parser.add_argument("--full", action="store_true", help="Re-scan every mark, ignoring the watermark")
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    args = parser.parse_args(argv)
+
+    conn = init_db(args.db)
+    started = time.perf_counter()
+    result = scan(conn, full=args.full)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    print(f"{result.marks} new mark(s) in {result.sessions} session(s), {result.new_flags} new flag(s) ({elapsed_ms:.1f} ms)")
+    for kind, count in result.flags.items():
+        print(f"  {kind:<20} {count}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
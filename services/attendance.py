@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.cache import invalidate
+from core.models import Attendance, Record, columns
+from core.shards import CAMPUS_SCHEMA, concat, fan_out, merge_counts, route_session, shard_connection, split_running
+from core.utils import now_iso
+from services.active_sessions import active_sessions
+from services.anomalies import last_positions
+from services.lectures import count_for_cohort
+from services.retention import archived_before
+
+ATTENDED_STATUSES = ("Present", "Late")
+
+
+@dataclass(frozen=True)
+class AttendanceSummary:
+    total_lectures: int
+    attended: int
+
+    @property
+    def missed(self) -> int:
+        return max(self.total_lectures - self.attended, 0)
+
+    @property
+    def percent(self) -> float:
+        return (self.attended / self.total_lectures * 100) if self.total_lectures else 0.0
+
+
+def get_mark(conn, session_id: str, enrollment: str) -> Optional[Record]:
+    conn = route_session(conn, session_id)
+    return conn.execute(
+        "SELECT status, timestamp FROM attendance WHERE session_id = ? AND enrollment = ?",
+        (session_id, enrollment),
+    ).fetchone()
+
+
+def mark(
+    conn,
+    session_id: str,
+    enrollment: str,
+    status: str,
+    latitude: float,
+    longitude: float,
+    accuracy: float,
+    distance_m: float,
+) -> Optional[Tuple[str, str]]:
+    """Record a mark in one statement; returns the stored ``(status, timestamp)``.
+
+    An existing mark is final, except that an automatic rejection (one no staff member
+    has overridden) is replaced by a later Present/Late attempt.  Returns ``None`` when
+    the existing mark was kept, including when a concurrent submission won.
+    """
+    conn = route_session(conn, session_id)
+    table = "attendance"
+    try:
+        if split_running(conn):
+            # split() may not have moved this lecture's marks out of the campus table yet, where
+            # the shard's UNIQUE(session_id, enrollment) cannot see them.  Lock both files (as
+            # split() does) and write to whichever holds the student's mark.
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(
+                f"SELECT 1 FROM {CAMPUS_SCHEMA}.attendance WHERE session_id = ? AND enrollment = ?",
+                (session_id, enrollment),
+            ).fetchone():
+                table = f"{CAMPUS_SCHEMA}.attendance"
+        rows = conn.execute(
+            f"""
+            INSERT INTO {table} (session_id, enrollment, timestamp, status, latitude, longitude, accuracy, distance_m)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id, enrollment) DO UPDATE SET
+                timestamp = excluded.timestamp, status = excluded.status, latitude = excluded.latitude,
+                longitude = excluded.longitude, accuracy = excluded.accuracy, distance_m = excluded.distance_m
+            WHERE attendance.status LIKE 'Rejected%' AND attendance.override_reason IS NULL
+              AND excluded.status IN ('Present', 'Late')
+            RETURNING status, timestamp
+            """,
+            (session_id, enrollment, now_iso(), status, latitude, longitude, accuracy, distance_m),
+        ).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if not rows:
+        # The existing mark was kept and may come from another writer; reload it on next use.
+        active_sessions.discard(conn, session_id)
+        return None
+    active_sessions.record_mark(conn, session_id, enrollment, rows[0][0], rows[0][1])
+    last_positions.record(conn, enrollment, session_id, rows[0][1], latitude, longitude)
+    invalidate(conn, "attendance")
+    return rows[0][0], rows[0][1]
+
+
+def list_for_session(conn, session_id: str) -> List[Record]:
+    conn = route_session(conn, session_id)
+    return conn.execute(
+        """
+        SELECT a.enrollment, u.name, a.status, a.timestamp, a.distance_m,
+               a.latitude, a.longitude, a.accuracy
+        FROM attendance a
+        LEFT JOIN users u ON a.enrollment = u.enrollment
+        WHERE a.session_id = ?
+        ORDER BY a.timestamp
+        """,
+        (session_id,),
+    ).fetchall()
+
+
+def list_recent(conn, limit: int = 50) -> List[Attendance]:
+    """Newest marks across the campus database and every shard."""
+    rows = concat(fan_out(conn, _list_recent, limit))
+    return sorted(rows, key=lambda row: row.timestamp or "", reverse=True)[:limit]
+
+
+def _list_recent(conn, limit: int) -> List[Attendance]:
+    return conn.execute(
+        f"SELECT {columns(Attendance)} FROM attendance ORDER BY timestamp DESC LIMIT ?", (limit,)
+    ).fetchall()
+
+
+def list_recent_with_subject(conn, limit: int = 10) -> List[Record]:
+    rows = concat(fan_out(conn, _list_recent_with_subject, limit))
+    return sorted(rows, key=lambda row: row.timestamp or "", reverse=True)[:limit]
+
+
+def _list_recent_with_subject(conn, limit: int) -> List[Record]:
+    return conn.execute(
+        """
+        SELECT a.enrollment, a.status, a.timestamp, l.subject
+        FROM attendance a
+        LEFT JOIN lectures l ON a.session_id = l.session_id
+        ORDER BY a.timestamp DESC
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+
+
+def list_for_override(
+    conn,
+    session_id: Optional[str] = None,
+    status: Optional[str] = None,
+    min_distance_m: Optional[float] = None,
+    max_distance_m: Optional[float] = None,
+    limit: int = 500,
+) -> List[Record]:
+    """Newest marks matching the override filters; ``status`` matches as a prefix ("Rejected").
+
+    Without ``session_id`` the campus database and every shard are searched.  Each row
+    carries the ``shard`` it was read from, for :func:`override_listed`.
+    """
+    clauses, params = [], []
+    if session_id:
+        clauses.append("a.session_id = ?")
+        params.append(session_id)
+    if status:
+        clauses.append("a.status LIKE ?")
+        params.append(f"{status}%")
+    if min_distance_m is not None:
+        clauses.append("a.distance_m >= ?")
+        params.append(min_distance_m)
+    if max_distance_m is not None:
+        clauses.append("a.distance_m <= ?")
+        params.append(max_distance_m)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    if session_id:
+        return _list_for_override(route_session(conn, session_id), where, params, limit)
+    rows = concat(fan_out(conn, _list_for_override, where, params, limit))
+    return sorted(rows, key=lambda row: row.timestamp or "", reverse=True)[:limit]
+
+
+def _list_for_override(conn, where: str, params: Sequence, limit: int) -> List[Record]:
+    return conn.execute(
+        f"""
+        SELECT ? AS shard, a.id, a.session_id, a.enrollment, u.name, a.status, a.timestamp, a.distance_m,
+               a.accuracy, a.override_reason
+        FROM attendance a
+        LEFT JOIN users u ON a.enrollment = u.enrollment
+        {where}
+        ORDER BY a.timestamp DESC
+        LIMIT ?
+        """,
+        (getattr(conn, "shard_key", ""), *params, limit),
+    ).fetchall()
+
+
+def bulk_override(conn, record_ids: Sequence[int], status: str, reason: str, actor_id: Optional[int]) -> int:
+    """Override many marks in one transaction, writing an ATTENDANCE_OVERRIDE audit row for each.
+
+    Returns the number of marks changed.
+    """
+    ids = [(int(record_id),) for record_id in dict.fromkeys(record_ids)]
+    if not ids:
+        return 0
+    created_at = now_iso()
+    try:
+        # The audit rows read each mark's status before the update, inside the same transaction.
+        conn.executemany(
+            """
+            INSERT INTO audit_logs (action, details, actor_id, created_at)
+            SELECT 'ATTENDANCE_OVERRIDE',
+                   '#' || id || ' ' || enrollment || ' ' || session_id || ': ' || status || ' -> ' || ? || '. Reason: ' || ?,
+                   ?, ?
+            FROM attendance WHERE id = ?
+            """,
+            [(status, reason, actor_id, created_at, record_id) for (record_id,) in ids],
+        )
+        conn.executemany(
+            "UPDATE attendance SET status = ?, override_reason = ?, override_by = ? WHERE id = ?",
+            [(status, reason, actor_id, record_id) for (record_id,) in ids],
+        )
+        placeholders = ",".join("?" for _ in ids)
+        changed = conn.execute(
+            f"SELECT session_id, enrollment, timestamp FROM attendance WHERE id IN ({placeholders})",
+            [record_id for (record_id,) in ids],
+        ).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for session_id, enrollment, timestamp in changed:
+        active_sessions.record_mark(conn, session_id, enrollment, status, timestamp, overridden=True)
+    invalidate(conn, "attendance", "audit_logs")
+    return len(changed)
+
+
+def override(conn, record_id: int, status: str, reason: str, actor_id: Optional[int]):
+    bulk_override(conn, [record_id], status, reason, actor_id)
+
+
+def override_listed(conn, marks: Iterable[Tuple[str, int]], status: str, reason: str, actor_id: Optional[int]) -> int:
+    """:func:`bulk_override` for ``(shard, id)`` pairs from :func:`list_for_override`, per database."""
+    by_shard: Dict[str, List[int]] = {}
+    for shard, record_id in marks:
+        by_shard.setdefault(shard or "", []).append(int(record_id))
+    return sum(
+        bulk_override(shard_connection(conn, shard), ids, status, reason, actor_id) for shard, ids in by_shard.items()
+    )
+
+
+def override_in_sessions(conn, marks: Iterable[Tuple[str, int]], status: str, reason: str, actor_id: Optional[int]) -> int:
+    """:func:`bulk_override` for ``(session_id, id)`` pairs, each on the database its lecture routes to."""
+    return override_listed(
+        conn,
+        [(getattr(route_session(conn, session_id), "shard_key", ""), record_id) for session_id, record_id in marks],
+        status,
+        reason,
+        actor_id,
+    )
+
+
+# Cross-lecture reads below run on the campus database and every shard (core.shards).
+
+def _count_all(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+
+def count_all(conn) -> int:
+    return sum(fan_out(conn, _count_all))
+
+
+def _count_attended(conn, enrollment: str) -> int:
+    return conn.execute(
+        """
+        SELECT COUNT(*) FROM attendance a
+        WHERE a.enrollment = ? AND a.status IN ('Present', 'Late')
+        """,
+        (enrollment,),
+    ).fetchone()[0]
+
+
+def count_attended(conn, enrollment: str) -> int:
+    return sum(fan_out(conn, _count_attended, enrollment))
+
+
+def student_summary(conn, enrollment: str, year: Optional[int], batch: Optional[int]) -> AttendanceSummary:
+    # Marks before the archive cutoff have left the table, so do their lectures.
+    since = archived_before(conn)
+    return AttendanceSummary(count_for_cohort(conn, year, batch, since), count_attended(conn, enrollment))
+
+
+def _attended_session_ids(conn, enrollment: str) -> List[str]:
+    rows = conn.execute(
+        "SELECT DISTINCT session_id FROM attendance WHERE enrollment = ? AND status IN ('Present', 'Late')",
+        (enrollment,),
+    ).fetchall()
+    return [r["session_id"] for r in rows]
+
+
+def attended_session_ids(conn, enrollment: str) -> List[str]:
+    return concat(fan_out(conn, _attended_session_ids, enrollment))
+
+
+def _status_counts(conn) -> Dict[str, int]:
+    rows = conn.execute("SELECT status, COUNT(*) AS n FROM attendance GROUP BY status").fetchall()
+    return {str(row["status"]): row["n"] for row in rows}
+
+
+def status_counts(conn) -> Dict[str, int]:
+    return merge_counts(fan_out(conn, _status_counts))
+
+
+def daily_status_counts(conn, teacher_id: Optional[int] = None) -> List[Record]:
+    """``(day, status, n)`` rows, ``day`` being whole days since 1970-01-01 in local time.
+
+    With sharding on, a ``(day, status)`` pair may appear once per shard; sum ``n``.
+    """
+    return concat(fan_out(conn, _daily_status_counts, teacher_id))
+
+
+def _daily_status_counts(conn, teacher_id: Optional[int] = None) -> List[Record]:
+    if teacher_id is not None:
+        return conn.execute(
+            """
+            SELECT a.timestamp_epoch / 86400 AS day, a.status, COUNT(*) AS n
+            FROM attendance a JOIN lectures l ON a.session_id = l.session_id
+            WHERE l.teacher_id = ? AND a.timestamp_epoch IS NOT NULL
+            GROUP BY day, a.status
+            """,
+            (teacher_id,),
+        ).fetchall()
+    return conn.execute(
+        """
+        SELECT timestamp_epoch / 86400 AS day, status, COUNT(*) AS n
+        FROM attendance WHERE timestamp_epoch IS NOT NULL
+        GROUP BY day, status
+        """
+    ).fetchall()
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from core.cache import invalidate
+from core.utils import now_iso
+
+
+def log_audit(conn, action: str, details: str, actor_id: Optional[int]):
+    conn.execute(
+        "INSERT INTO audit_logs (action, details, actor_id, created_at) VALUES (?, ?, ?, ?)",
+        (action, details, actor_id, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "audit_logs")
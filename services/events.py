@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import List
+
+from core.cache import cached_query, invalidate
+from core.models import Record
+from core.utils import now_iso
+
+
+def create_event(conn, title: str, description: str, event_date: str, location: str, created_by: int, contact_email: str):
+    conn.execute(
+        """
+        INSERT INTO events (title, description, event_date, location, created_by, created_at, contact_email)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (title, description, event_date, location, created_by, now_iso(), contact_email),
+    )
+    conn.commit()
+    invalidate(conn, "events")
+
+
+@cached_query("events", "users")
+def list_with_poster(conn) -> List[Record]:
+    return conn.execute(
+        "SELECT e.*, u.name as poster FROM events e LEFT JOIN users u ON e.created_by = u.id ORDER BY event_date DESC"
+    ).fetchall()
+
+
+def list_recent(conn, limit: int = 10) -> List[Record]:
+    return conn.execute(
+        "SELECT title, event_date, location FROM events ORDER BY created_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def search(conn, like: str) -> List[Record]:
+    return conn.execute(
+        "SELECT title, description, event_date FROM events WHERE title LIKE ? OR description LIKE ?",
+        (like, like),
+    ).fetchall()
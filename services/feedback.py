@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import List
+
+from core.cache import invalidate
+from core.models import Record
+from core.shards import concat, fan_out, route_session
+from core.utils import now_iso
+
+
+def has_submitted(conn, session_id: str, enrollment: str) -> bool:
+    conn = route_session(conn, session_id)
+    return conn.execute(
+        "SELECT 1 FROM feedback WHERE session_id = ? AND enrollment = ?",
+        (session_id, enrollment),
+    ).fetchone() is not None
+
+
+def submit(conn, session_id: str, enrollment: str, rating: int, comments: str):
+    conn = route_session(conn, session_id)
+    conn.execute(
+        """
+        INSERT INTO feedback (session_id, enrollment, rating, comments, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (session_id, enrollment, rating, comments, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "feedback")
+
+
+def list_with_lectures(conn) -> List[Record]:
+    results = fan_out(conn, _list_with_lectures)
+    if len(results) == 1:
+        return results[0]
+    return sorted(concat(results), key=lambda row: row.created_at or "", reverse=True)
+
+
+def _list_with_lectures(conn) -> List[Record]:
+    return conn.execute(
+        """
+        SELECT f.session_id, f.rating, f.comments, f.created_at,
+               l.subject, l.room, l.start_time, l.end_time
+        FROM feedback f
+        LEFT JOIN lectures l ON f.session_id = l.session_id
+        ORDER BY f.created_at DESC
+        """
+    ).fetchall()
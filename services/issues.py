@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import List
+
+from core.cache import invalidate
+from core.models import Record
+from core.utils import now_iso
+
+
+def create_issue(conn, title: str, category: str, description: str, reported_by: int) -> int:
+    new_id = conn.execute(
+        """
+        INSERT INTO issues (title, category, description, status, reported_by, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        RETURNING id
+        """,
+        (title, category, description, "Open", reported_by, now_iso()),
+    ).fetchone()[0]
+    conn.commit()
+    invalidate(conn, "issues")
+    return new_id
+
+
+def list_all(conn) -> List[Record]:
+    return conn.execute("SELECT * FROM issues ORDER BY created_at DESC").fetchall()
+
+
+def list_recent(conn, limit: int = 10) -> List[Record]:
+    return conn.execute(
+        "SELECT title, category, status, created_at FROM issues ORDER BY created_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def category_status(conn) -> List[Record]:
+    return conn.execute("SELECT category, status FROM issues").fetchall()
+
+
+def update_status(conn, issue_id: int, status: str, actor_id: int):
+    if status == "Resolved":
+        conn.execute(
+            """
+            UPDATE issues
+            SET status = ?, resolved_by = ?, resolved_at = ?
+            WHERE id = ?
+            """,
+            (status, actor_id, now_iso(), issue_id),
+        )
+    else:
+        conn.execute(
+            """
+            UPDATE issues
+            SET status = ?, resolved_by = NULL, resolved_at = NULL
+            WHERE id = ?
+            """,
+            (status, issue_id),
+        )
+    conn.commit()
+    invalidate(conn, "issues")
+
+
+def search(conn, like: str) -> List[Record]:
+    return conn.execute(
+        "SELECT title, description, status FROM issues WHERE title LIKE ? OR description LIKE ?",
+        (like, like),
+    ).fetchall()
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from core.cache import cached_query, invalidate
+from core.models import Lecture, Record, columns, record_type
+from core.qr import collect_garbage
+from core.shards import fan_out, merge_counts
+from core.utils import local_epoch, now_iso, now_local
+
+# Lecture pickers only list sessions that started on or before this date.
+CUT_OFF_DATE = "2026-02-20"
+
+# Session id lookups depend on "lectures": anything that deletes or moves lectures must call
+# invalidate(conn, "lectures") so a removed lecture stops resolving.  The TTL only bounds how
+# long lookups for finished lectures stay in memory.
+LECTURE_LOOKUP_TTL_SEC = 4 * 3600
+
+APP_BASE_URL = "https://smart-campus-system-4rvhza22xqtxanom66dczk.streamlit.app"
+
+
+def attendance_url(session_id: str, token: Optional[str] = None) -> str:
+    """Deep link encoded in a lecture's QR code; rotating codes also carry a signed token."""
+    url = f"{APP_BASE_URL}/?session_id={session_id}"
+    return f"{url}&t={token}" if token else url
+
+
+def new_session_id(subject: str) -> str:
+    return f"{subject[:4].upper()}-{uuid4().hex[:8]}"
+
+
+def create_lecture(
+    conn,
+    session_id: str,
+    teacher_id: int,
+    subject: str,
+    room: str,
+    start_time: datetime,
+    end_time: datetime,
+    latitude: float,
+    longitude: float,
+    radius_m: float,
+    late_after_min: int,
+    year: Optional[int],
+    batch: Optional[int],
+    qr_rotation_sec: Optional[int] = None,
+) -> str:
+    conn.execute(
+        """
+        INSERT INTO lectures (session_id, teacher_id, subject, room, start_time, end_time, latitude, longitude, radius_m, late_after_min, year, batch, created_at, qr_rotation_sec)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            session_id,
+            teacher_id,
+            subject,
+            room,
+            start_time.isoformat(),
+            end_time.isoformat(),
+            latitude,
+            longitude,
+            radius_m,
+            late_after_min,
+            year,
+            batch,
+            now_iso(),
+            qr_rotation_sec or None,
+        ),
+    )
+    conn.commit()
+    invalidate(conn, "lectures")
+    return session_id
+
+
+def bulk_create_lectures(
+    conn,
+    teacher_id: int,
+    occurrences: Sequence[Tuple[Record, datetime, datetime]],
+    latitude: float,
+    longitude: float,
+    radius_m: float,
+    late_after_min: int,
+    room_locations: Optional[Dict[str, Tuple[float, float, float]]] = None,
+    qr_rotation_sec: Optional[int] = None,
+) -> List[str]:
+    """Create one lecture per (schedule, start, end) occurrence in a single transaction.
+
+    ``room_locations`` maps room names to (latitude, longitude, radius_m) and overrides the
+    given coordinates for those rooms.  Returns the session ids in order; occurrences that
+    already have a lecture keep it.
+    """
+    room_locations = room_locations or {}
+    entries = [
+        (schedule, start, end, teacher_id, *room_locations.get(schedule.room, (latitude, longitude, radius_m)), late_after_min)
+        for schedule, start, end in occurrences
+    ]
+    return ensure_scheduled_lectures(conn, entries, qr_rotation_sec)
+
+
+def ensure_scheduled_lectures(
+    conn,
+    entries: Sequence[Tuple[Record, datetime, datetime, int, float, float, float, int]],
+    qr_rotation_sec: Optional[int] = None,
+) -> List[str]:
+    """Insert lectures for timetable slot occurrences unless they already exist.
+
+    Each entry is ``(schedule, start, end, teacher_id, latitude, longitude, radius_m,
+    late_after_min)``; every lecture gets ``qr_rotation_sec`` (0 or ``None``: a static
+    code).  The unique (schedule_id, start_time) index makes this idempotent, including
+    against a concurrent materialiser; all inserts share one transaction.
+    """
+    if not entries:
+        return []
+    created_at = now_iso()
+    rows = [
+        (
+            new_session_id(schedule.subject),
+            teacher_id,
+            schedule.subject,
+            schedule.room,
+            start.isoformat(),
+            end.isoformat(),
+            latitude,
+            longitude,
+            radius_m,
+            late_after_min,
+            schedule.year,
+            schedule.batch,
+            created_at,
+            schedule.id,
+            qr_rotation_sec or None,
+        )
+        for schedule, start, end, teacher_id, latitude, longitude, radius_m, late_after_min in entries
+    ]
+    try:
+        conn.executemany(
+            """
+            INSERT INTO lectures (session_id, teacher_id, subject, room, start_time, end_time, latitude, longitude, radius_m, late_after_min, year, batch, created_at, schedule_id, qr_rotation_sec)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+            """,
+            rows,
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate(conn, "lectures")
+
+    keys = [(row[13], row[4]) for row in rows]
+    schedule_ids = sorted({key[0] for key in keys})
+    placeholders = ",".join("?" for _ in schedule_ids)
+    existing = {
+        (row[0], row[1]): row[2]
+        for row in conn.execute(
+            f"SELECT schedule_id, start_time, session_id FROM lectures WHERE schedule_id IN ({placeholders}) AND start_time BETWEEN ? AND ?",
+            (*schedule_ids, min(key[1] for key in keys), max(key[1] for key in keys)),
+        )
+    }
+    return [existing[key] for key in keys]
+
+
+def get_lecture(conn, session_id: str) -> Optional[Lecture]:
+    return conn.execute(f"SELECT {columns(Lecture)} FROM lectures WHERE session_id = ?", (session_id,)).fetchone()
+
+
+@cached_query("lectures", ttl=LECTURE_LOOKUP_TTL_SEC)
+def lookup_lecture(conn, session_id: str) -> Optional[Lecture]:
+    """Cached :func:`get_lecture` for QR deep links: one UNIQUE-index probe per session id."""
+    return get_lecture(conn, session_id)
+
+
+def _day_after_epoch(cutoff_date: str) -> int:
+    # "on or before the cutoff date" == "before midnight after it", an indexed integer range.
+    return local_epoch(date.fromisoformat(cutoff_date)) + 86400
+
+
+def list_for_cohort(conn, year: Optional[int], batch: Optional[int], cutoff_date: str, limit: int = 20) -> List[Lecture]:
+    """Latest lectures open to a student's year/batch (all lectures when the cohort is unknown)."""
+    if year and batch:
+        return conn.execute(
+            f"""
+            SELECT {columns(Lecture)} FROM lectures
+            WHERE (year IS NULL OR year = ?) AND (batch IS NULL OR batch = ?) AND start_epoch < ?
+            ORDER BY start_epoch DESC LIMIT ?
+            """,
+            (year, batch, _day_after_epoch(cutoff_date), limit),
+        ).fetchall()
+    return list_recent(conn, cutoff_date, limit)
+
+
+def list_recent(conn, cutoff_date: str, limit: int = 50) -> List[Lecture]:
+    return conn.execute(
+        f"SELECT {columns(Lecture)} FROM lectures WHERE start_epoch < ? ORDER BY start_epoch DESC LIMIT ?",
+        (_day_after_epoch(cutoff_date), limit),
+    ).fetchall()
+
+
+def list_teacher_sessions(conn, teacher_id: int, limit: int = 20) -> List[Record]:
+    """A teacher's latest started lectures with their mark counts, summed over the campus database and shards.
+
+    Timetable lectures materialised ahead of time are left out until they begin.
+    """
+    lectures = conn.execute(
+        """
+        SELECT session_id, subject, room, start_time, end_time, year, batch
+        FROM lectures
+        WHERE teacher_id = ? AND start_epoch <= ?
+        ORDER BY start_time DESC
+        LIMIT ?
+        """,
+        (teacher_id, local_epoch(now_local()), limit),
+    ).fetchall()
+    if not lectures:
+        return []
+    session_ids = [row.session_id for row in lectures]
+    counts = merge_counts(fan_out(conn, _attendance_counts, session_ids))
+    row_type = record_type((*lectures[0].keys(), "attendance_count"))
+    return [tuple.__new__(row_type, (*row, counts.get(row.session_id, 0))) for row in lectures]
+
+
+def _attendance_counts(conn, session_ids: Sequence[str]) -> Dict[str, int]:
+    placeholders = ",".join("?" for _ in session_ids)
+    rows = conn.execute(
+        f"SELECT session_id, COUNT(*) FROM attendance WHERE session_id IN ({placeholders}) GROUP BY session_id",
+        tuple(session_ids),
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def list_brief(conn, session_ids: Optional[Sequence[str]] = None, limit: Optional[int] = None) -> List[Record]:
+    """Label fields for lecture pickers, optionally restricted to ``session_ids`` (newest first, at most ``limit``)."""
+    if session_ids is None:
+        sql = "SELECT session_id, subject, room, start_time, end_time FROM lectures ORDER BY start_time DESC"
+        if limit is None:
+            return conn.execute(sql).fetchall()
+        return conn.execute(f"{sql} LIMIT ?", (limit,)).fetchall()
+    if not session_ids:
+        return []
+    placeholders = ",".join(["?" for _ in session_ids])
+    return conn.execute(
+        f"SELECT session_id, subject, room, start_time, end_time FROM lectures WHERE session_id IN ({placeholders}) ORDER BY start_time DESC",
+        tuple(session_ids),
+    ).fetchall()
+
+
+def count_for_cohort(conn, year: Optional[int], batch: Optional[int], since: Optional[str] = None) -> int:
+    """Lectures for the cohort that have already started, only those starting on or after ``since`` when given.
+
+    Timetable lectures are materialised days ahead; they only count once they begin.
+    """
+    # Leave the lower bound out rather than bind NULL to "? IS NULL": server drivers cannot
+    # infer that parameter's type.
+    bounds = "start_epoch <= ?"
+    params: Tuple[int, ...] = (local_epoch(now_local()),)
+    if since:
+        bounds += " AND start_epoch >= ?"
+        params += (local_epoch(since),)
+    if year and batch:
+        return conn.execute(
+            f"""
+            SELECT COUNT(*) FROM lectures
+            WHERE (year IS NULL OR year = ?) AND (batch IS NULL OR batch = ?) AND {bounds}
+            """,
+            (year, batch, *params),
+        ).fetchone()[0]
+    return conn.execute(f"SELECT COUNT(*) FROM lectures WHERE {bounds}", params).fetchone()[0]
+
+
+def count_all(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM lectures").fetchone()[0]
+
+
+def search(conn, like: str) -> List[Record]:
+    return conn.execute(
+        "SELECT session_id, subject, room, start_time, end_time, year, batch FROM lectures WHERE subject LIKE ? OR room LIKE ? OR session_id LIKE ?",
+        (like, like, like),
+    ).fetchall()
+
+
+def list_unfinished_session_ids(conn) -> List[str]:
+    rows = conn.execute("SELECT session_id FROM lectures WHERE end_time >= ?", (now_iso(),)).fetchall()
+    return [row[0] for row in rows]
+
+
+def collect_qr_garbage(conn, min_age_sec: float = 3600) -> int:
+    """Remove stored QR images for lectures that have ended; returns the number of files removed."""
+    keep = [attendance_url(session_id) for session_id in list_unfinished_session_ids(conn)]
+    return collect_garbage(keep, min_age_sec)
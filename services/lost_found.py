@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import List
+
+from core.cache import invalidate
+from core.models import Record
+from core.utils import now_iso
+
+
+def create_post(conn, item_type: str, title: str, description: str, contact: str, posted_by: int) -> int:
+    new_id = conn.execute(
+        """
+        INSERT INTO lost_found (item_type, title, description, contact, posted_by, created_at, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        RETURNING id
+        """,
+        (item_type, title, description, contact, posted_by, now_iso(), "Open"),
+    ).fetchone()[0]
+    conn.commit()
+    invalidate(conn, "lost_found")
+    return new_id
+
+
+def list_all(conn) -> List[Record]:
+    return conn.execute("SELECT * FROM lost_found ORDER BY created_at DESC").fetchall()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from core.cache import cached_query, invalidate
+from core.models import Notice, Record
+from core.utils import now_iso
+
+
+def create_notice(conn, title: str, body: str, posted_by: int):
+    conn.execute(
+        "INSERT INTO notices (title, body, posted_by, created_at) VALUES (?, ?, ?, ?)",
+        (title, body, posted_by, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "notices")
+
+
+@cached_query("notices", "users")
+def list_recent(conn, limit: int = 50) -> List[Notice]:
+    return conn.execute(
+        "SELECT n.id, n.title, n.body, n.posted_by, n.created_at, u.name as poster FROM notices n LEFT JOIN users u ON n.posted_by = u.id ORDER BY n.created_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+@cached_query("notices", "users")
+def latest(conn) -> Optional[Record]:
+    return conn.execute(
+        "SELECT n.title, n.body, n.created_at, u.name as poster FROM notices n LEFT JOIN users u ON n.posted_by = u.id ORDER BY n.created_at DESC LIMIT 1"
+    ).fetchone()
+
+
+def search(conn, like: str) -> List[Record]:
+    return conn.execute(
+        "SELECT title, body, created_at FROM notices WHERE title LIKE ? OR body LIKE ?",
+        (like, like),
+    ).fetchall()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import List
+
+from core.cache import invalidate
+from core.models import Record
+from core.utils import now_iso
+
+
+def create_resource(conn, title: str, subject: str, file_path: str, uploaded_by: int, year: int, batch: int):
+    conn.execute(
+        """
+        INSERT INTO resources (title, subject, file_path, uploaded_by, created_at, year, batch)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (title, subject, file_path, uploaded_by, now_iso(), year, batch),
+    )
+    conn.commit()
+    invalidate(conn, "resources")
+
+
+def list_for_cohort(conn, year: int, batch: int) -> List[Record]:
+    return conn.execute(
+        "SELECT r.*, u.name as uploader FROM resources r LEFT JOIN users u ON r.uploaded_by = u.id WHERE r.year = ? AND r.batch = ? ORDER BY created_at DESC",
+        (year, batch),
+    ).fetchall()
+
+
+def list_all(conn) -> List[Record]:
+    return conn.execute(
+        "SELECT r.*, u.name as uploader FROM resources r LEFT JOIN users u ON r.uploaded_by = u.id ORDER BY created_at DESC"
+    ).fetchall()
+
+
+def search(conn, like: str) -> List[Record]:
+    return conn.execute(
+        "SELECT title, subject, file_path FROM resources WHERE title LIKE ? OR subject LIKE ?",
+        (like, like),
+    ).fetchall()
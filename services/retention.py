@@ -0,0 +1,234 @@
+"""Move attendance and audit rows from past terms into an archive database.
+
+The hot tables keep the terms still in use; older rows go to ``<name>_archive.db`` next to
+the app database, with the same columns and the same generated epoch column.  Current-term
+screens keep querying ``attendance`` and ``audit_logs`` directly and never touch the
+archive.  Historical reads call :func:`attach_archive`, which attaches the archive and
+creates the TEMP views ``attendance_all`` and ``audit_logs_all`` (the hot and archived rows
+together; just the hot rows when nothing has been archived yet).
+
+Rows move in id-ordered batches, each copied and deleted in one transaction.  The copy is
+``INSERT OR IGNORE``, so a batch interrupted between the two files is finished by the next
+run instead of duplicated.  Marks with an open anomaly flag stay until they are reviewed::
+
+    python -m services.retention                  # dry run up to the configured term
+    python -m services.retention --apply
+    python -m services.retention --apply --before 2026-01-01 --parquet data/archive
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from core.backends import SQLITE
+from core.cache import invalidate
+from core.db import DB_PATH, EPOCH_COLUMNS
+from core.utils import local_epoch, now_local
+from services.settings import get_setting, set_setting
+
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_BATCH_SIZE = 5000
+# Months in which an academic term starts; a setting so the calendar can change.
+DEFAULT_TERM_START_MONTHS = "1,7"
+# Terms kept in the hot tables, counting the current one.
+DEFAULT_TERMS_KEPT = 2
+
+# table -> (epoch column the cutoff applies to, extra condition for rows that must stay)
+RETAINED_TABLES: Dict[str, tuple] = {
+    "attendance": (
+        "timestamp_epoch",
+        "id NOT IN (SELECT attendance_id FROM main.attendance_flags WHERE status = 'open')",
+    ),
+    "audit_logs": ("created_epoch", ""),
+}
+ARCHIVE_INDEXES = {
+    "attendance": ["timestamp_epoch", "session_id", "enrollment"],
+    "audit_logs": ["created_epoch"],
+}
+
+
+@dataclass(frozen=True)
+class ArchiveResult:
+    table: str
+    rows: int
+    batches: int
+    elapsed_ms: float
+
+
+def archive_path(conn) -> Path:
+    db_file = Path(getattr(conn, "db_path", "") or DB_PATH)
+    return db_file.with_name(f"{db_file.stem}_archive{db_file.suffix}")
+
+
+def term_start(conn, day: date, terms_back: int = 0) -> date:
+    """Start of the term containing ``day``, or of the term ``terms_back`` before it."""
+    months = sorted(int(m) for m in get_setting(conn, "term_start_months", DEFAULT_TERM_START_MONTHS).split(","))
+    starts = [date(year, month, 1) for year in range(day.year - terms_back // len(months) - 1, day.year + 1)
+              for month in months]
+    starts = [start for start in starts if start <= day]
+    return starts[-1 - terms_back]
+
+
+def default_cutoff(conn, today: Optional[date] = None) -> date:
+    """Rows before this date are archived: the start of the oldest term still kept."""
+    terms_kept = int(get_setting(conn, "retention_terms_kept", str(DEFAULT_TERMS_KEPT)))
+    return term_start(conn, today or now_local().date(), max(terms_kept - 1, 0))
+
+
+def archived_before(conn) -> Optional[str]:
+    """Date up to which rows have been archived (``None`` if nothing has been)."""
+    return get_setting(conn, "archived_before", "") or None
+
+
+def _is_attached(conn) -> bool:
+    return any(row[1] == ARCHIVE_SCHEMA for row in conn.execute("PRAGMA database_list"))
+
+
+def _stored_columns(conn, table: str, schema: str = "main") -> List[tuple]:
+    """(name, declared type, pk) of the table's stored columns; generated ones are left out."""
+    return [(row[1], row[2], row[5]) for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _ensure_archive_tables(conn):
+    for table in RETAINED_TABLES:
+        defs = [
+            f"{name} {decl}{' PRIMARY KEY' if pk else ''}"
+            for name, decl, pk in _stored_columns(conn, table)
+        ]
+        for epoch_table, source, epoch_column in EPOCH_COLUMNS:
+            if epoch_table == table:
+                defs.append(f"{epoch_column} INTEGER GENERATED ALWAYS AS ({SQLITE.epoch(source)}) VIRTUAL")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table} ({', '.join(defs)})")
+        for column in ARCHIVE_INDEXES[table]:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_{table}_{column} ON {table}({column})")
+    conn.commit()
+
+
+def attach_archive(conn, create: bool = False) -> bool:
+    """Attach the archive (creating it if ``create``) and (re)build the ``*_all`` views.
+
+    Returns whether the archive is attached.  Safe to call repeatedly on one connection.
+    """
+    path = archive_path(conn)
+    attached = _is_attached(conn)
+    if not attached and (create or path.exists()):
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(path),))
+        attached = True
+    if attached and create:
+        _ensure_archive_tables(conn)
+    for table in RETAINED_TABLES:
+        names = ", ".join([name for name, _, _ in _stored_columns(conn, table)] + [RETAINED_TABLES[table][0]])
+        archived = attached and bool(_stored_columns(conn, table, ARCHIVE_SCHEMA))
+        union = f" UNION ALL SELECT {names} FROM {ARCHIVE_SCHEMA}.{table}" if archived else ""
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+        conn.execute(f"CREATE TEMP VIEW {table}_all AS SELECT {names} FROM main.{table}{union}")
+    return attached
+
+
+def _export_parquet(conn, table: str, columns: str, where: str, params: Sequence, directory: Path, batch: int):
+    frame = pd.read_sql_query(f"SELECT {columns} FROM main.{table} WHERE {where}", conn, params=list(params))
+    directory.mkdir(parents=True, exist_ok=True)
+    frame.to_parquet(directory / f"{table}-{now_local():%Y%m%d%H%M%S}-{batch:05d}.parquet", compression="zstd")
+
+
+def archive(
+    conn,
+    before: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    tables: Optional[Sequence[str]] = None,
+    apply: bool = True,
+    parquet_dir: Optional[Path] = None,
+) -> List[ArchiveResult]:
+    """Move rows older than ``before`` (default: :func:`default_cutoff`) to the archive.
+
+    With ``apply=False`` nothing changes; the results count the rows that would move.
+    ``parquet_dir`` additionally writes each batch to a zstd-compressed Parquet file
+    (requires ``pyarrow``).
+    """
+    before = before or default_cutoff(conn)
+    cutoff = local_epoch(before)
+    if apply:
+        attach_archive(conn, create=True)
+
+    results = []
+    for table in tables or RETAINED_TABLES:
+        epoch_column, keep = RETAINED_TABLES[table]
+        condition = f"{epoch_column} < ?" + (f" AND {keep}" if keep else "")
+        started = time.perf_counter()
+        if not apply:
+            count = conn.execute(f"SELECT COUNT(*) FROM main.{table} WHERE {condition}", (cutoff,)).fetchone()[0]
+            results.append(ArchiveResult(table, count, 0, (time.perf_counter() - started) * 1000.0))
+            continue
+
+        columns = ", ".join(name for name, _, _ in _stored_columns(conn, table))
+        moved = batches = 0
+        while True:
+            ids = conn.execute(
+                f"SELECT id FROM main.{table} WHERE {condition} ORDER BY id LIMIT ?", (cutoff, batch_size)
+            ).fetchall()
+            if not ids:
+                break
+            where = f"id BETWEEN ? AND ? AND {condition}"
+            params = (ids[0][0], ids[-1][0], cutoff)
+            try:
+                if parquet_dir is not None:
+                    _export_parquet(conn, table, columns, where, params, Path(parquet_dir), batches)
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.{table} ({columns}) "
+                    f"SELECT {columns} FROM main.{table} WHERE {where}",
+                    params,
+                )
+                moved += conn.execute(f"DELETE FROM main.{table} WHERE {where}", params).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            batches += 1
+        results.append(ArchiveResult(table, moved, batches, (time.perf_counter() - started) * 1000.0))
+        invalidate(conn, table)
+
+    if apply:
+        previous = archived_before(conn)
+        if previous is None or previous < before.isoformat():
+            set_setting(conn, "archived_before", before.isoformat())
+        attach_archive(conn)  # refresh the views now that the archive has rows
+    return results
+
+
+def main(argv=None):
+    from core.db import init_db
+
+    parser = argparse.ArgumentParser(description="Archive attendance and audit rows from past terms.")
+    parser.add_argument("--apply", action="store_true", help="Move the rows (default: count them)")
+    parser.add_argument("--before", type=date.fromisoformat, help="Cutoff date (default: start of the oldest kept term)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--tables", nargs="*", choices=list(RETAINED_TABLES))
+    parser.add_argument("--parquet", type=Path, help="Also write archived batches as Parquet files to this directory")
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    args = parser.parse_args(argv)
+
+    conn = init_db(args.db)
+    try:
+        before = args.before or default_cutoff(conn)
+        try:
+            results = archive(conn, before, args.batch_size, args.tables, args.apply, args.parquet)
+        except ImportError as exc:
+            raise SystemExit(f"Parquet export needs pyarrow ({exc})")
+        verb = "archived" if args.apply else "would archive"
+        for result in results:
+            batches = f" in {result.batches} batch(es)" if args.apply else ""
+            print(f"{result.table}: {verb} {result.rows:,} row(s) before {before}{batches} ({result.elapsed_ms:.1f} ms)")
+        if args.apply:
+            print(f"Archive: {archive_path(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
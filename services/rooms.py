@@ -0,0 +1,77 @@
+"""Registry of classrooms with surveyed coordinates.
+
+Rooms are bucketed into a fixed lat/lon grid (``cell_lat``/``cell_lon``, indexed), so
+"which room is this student standing in" scans the few cells around the position
+instead of every room.
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Tuple
+
+from core.cache import cached_query, invalidate
+from core.models import Room, columns
+from core.utils import haversine_distance, now_iso
+
+# ~111 m of latitude per cell; a lookup scans the surrounding rings of cells.
+GRID_CELL_DEG = 0.001
+NEAREST_MAX_DISTANCE_M = 150.0
+
+
+def grid_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / GRID_CELL_DEG), math.floor(longitude / GRID_CELL_DEG)
+
+
+def upsert_room(conn, name: str, building: str, latitude: float, longitude: float, radius_m: float):
+    cell_lat, cell_lon = grid_cell(latitude, longitude)
+    conn.execute(
+        """
+        INSERT INTO rooms (name, building, latitude, longitude, radius_m, cell_lat, cell_lon, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            building = excluded.building, latitude = excluded.latitude, longitude = excluded.longitude,
+            radius_m = excluded.radius_m, cell_lat = excluded.cell_lat, cell_lon = excluded.cell_lon,
+            updated_at = excluded.updated_at
+        """,
+        (name.strip(), building, latitude, longitude, radius_m, cell_lat, cell_lon, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "rooms")
+
+
+def delete_room(conn, room_id: int):
+    conn.execute("DELETE FROM rooms WHERE id = ?", (room_id,))
+    conn.commit()
+    invalidate(conn, "rooms")
+
+
+@cached_query("rooms")
+def list_rooms(conn) -> List[Room]:
+    return conn.execute(f"SELECT {columns(Room)} FROM rooms ORDER BY name").fetchall()
+
+
+def get_room(conn, name: str) -> Optional[Room]:
+    return conn.execute(f"SELECT {columns(Room)} FROM rooms WHERE name = ?", (name,)).fetchone()
+
+
+def nearest_room(
+    conn, latitude: float, longitude: float, max_distance_m: float = NEAREST_MAX_DISTANCE_M
+) -> Optional[Tuple[Room, float]]:
+    """Closest registered room within ``max_distance_m``, with its distance in metres."""
+    cell_lat, cell_lon = grid_cell(latitude, longitude)
+    # Longitude cells shrink with cos(latitude); widen that axis so the search stays a circle.
+    rings_lat = math.ceil(max_distance_m / (GRID_CELL_DEG * 111_320))
+    rings_lon = math.ceil(max_distance_m / (GRID_CELL_DEG * 111_320 * max(math.cos(math.radians(latitude)), 0.01)))
+    candidates = conn.execute(
+        f"""
+        SELECT {columns(Room)} FROM rooms
+        WHERE cell_lat BETWEEN ? AND ? AND cell_lon BETWEEN ? AND ?
+        """,
+        (cell_lat - rings_lat, cell_lat + rings_lat, cell_lon - rings_lon, cell_lon + rings_lon),
+    ).fetchall()
+    best = None
+    for room in candidates:
+        distance = haversine_distance(latitude, longitude, room.latitude, room.longitude)
+        if distance <= max_distance_m and (best is None or distance < best[1]):
+            best = (room, distance)
+    return best
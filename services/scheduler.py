@@ -0,0 +1,158 @@
+"""Materialise upcoming lecture sessions from the weekly timetable.
+
+Each timetable slot occurrence becomes a lecture ahead of time, placed at the room's
+surveyed coordinates (or, failing that, where it was last used), so starting a class is one
+indexed lookup rather than a form and a GPS fix.  Run it from cron, or let the teacher
+page trigger it::
+
+    python -m services.scheduler --days 7
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from core.models import Lecture, Schedule, columns
+from core.utils import now_local
+from services import lectures as lecture_service
+from services import rooms as room_service
+from services import schedules as schedule_service
+from services.settings import DEFAULT_LATE_AFTER_MIN, DEFAULT_QR_ROTATION_SEC, DEFAULT_RADIUS_M, get_float
+
+DEFAULT_LOOKAHEAD_DAYS = 7
+# A scheduled lecture is offered this many minutes before it starts.
+CLASS_START_LEAD_MIN = 15
+MATERIALIZE_INTERVAL_SEC = 3600
+
+_last_run: Dict[str, float] = {}
+_last_run_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class MaterializeResult:
+    lectures: int
+    unplaced: List[Schedule] = field(default_factory=list)
+
+
+def room_locations(conn) -> Dict[str, Tuple[float, float, float]]:
+    """(latitude, longitude, radius_m) per room name.
+
+    Surveyed rooms from the registry win; other rooms fall back to the coordinates of
+    their most recent lecture.
+    """
+    rows = conn.execute(
+        """
+        SELECT room, latitude, longitude, radius_m FROM (
+            SELECT room, latitude, longitude, radius_m,
+                   ROW_NUMBER() OVER (PARTITION BY room ORDER BY start_time DESC) AS rn
+            FROM lectures
+            WHERE room IS NOT NULL AND room != '' AND NOT (latitude = 0 AND longitude = 0)
+        )
+        WHERE rn = 1
+        """
+    ).fetchall()
+    locations = {row.room: (row.latitude, row.longitude, row.radius_m) for row in rows}
+    for room in room_service.list_rooms(conn):
+        locations[room.name] = (room.latitude, room.longitude, room.radius_m)
+    return locations
+
+
+def upcoming_occurrences(schedules, start: datetime, days: int) -> List[Tuple[Schedule, datetime, datetime]]:
+    """Occurrences of ``schedules`` beginning in ``[start, start + days)``."""
+    by_weekday: Dict[int, List[Schedule]] = {}
+    for row in schedules:
+        by_weekday.setdefault(row.weekday, []).append(row)
+    occurrences = []
+    midnight = datetime.combine(start.date(), datetime.min.time())
+    for offset in range(days + 1):
+        day = midnight + timedelta(days=offset)
+        for row in by_weekday.get(day.weekday(), []):
+            slot_start = day + timedelta(minutes=row.start_min)
+            if start <= slot_start < start + timedelta(days=days):
+                occurrences.append((row, slot_start, day + timedelta(minutes=row.end_min)))
+    occurrences.sort(key=lambda item: item[1])
+    return occurrences
+
+
+def materialize_upcoming(
+    conn,
+    days: int = DEFAULT_LOOKAHEAD_DAYS,
+    teacher_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> MaterializeResult:
+    """Create lectures for the next ``days`` of timetable slots; existing ones are kept.
+
+    Slots in a room with no recorded coordinates are skipped and reported as ``unplaced``.
+    """
+    now = now or now_local()
+    schedules = schedule_service.list_placeable(conn, teacher_id)
+    locations = room_locations(conn)
+    default_radius = get_float(conn, "radius_m", DEFAULT_RADIUS_M)
+    late_after_min = int(get_float(conn, "late_after_min", DEFAULT_LATE_AFTER_MIN))
+    qr_rotation_sec = int(get_float(conn, "qr_rotation_sec", DEFAULT_QR_ROTATION_SEC))
+
+    entries = []
+    unplaced = []
+    for row, start, end in upcoming_occurrences(schedules, now, days):
+        location = locations.get(row.room)
+        if location is None:
+            unplaced.append(row)
+            continue
+        lat, lon, radius = location
+        entries.append((row, start, end, row.teacher_id, lat, lon, radius or default_radius, late_after_min))
+    lecture_service.ensure_scheduled_lectures(conn, entries, qr_rotation_sec)
+    return MaterializeResult(len(entries), unplaced)
+
+
+def materialize_if_due(conn, interval_sec: float = MATERIALIZE_INTERVAL_SEC) -> Optional[MaterializeResult]:
+    """Run :func:`materialize_upcoming` at most once per ``interval_sec`` per database."""
+    key = getattr(conn, "db_path", "")
+    with _last_run_lock:
+        if time.monotonic() - _last_run.get(key, float("-inf")) < interval_sec:
+            return None
+        _last_run[key] = time.monotonic()
+    return materialize_upcoming(conn)
+
+
+def session_for_class_start(
+    conn,
+    teacher_id: int,
+    now: Optional[datetime] = None,
+    lead_min: int = CLASS_START_LEAD_MIN,
+) -> Optional[Lecture]:
+    """The teacher's lecture that is running now or starts within ``lead_min`` minutes."""
+    now = now or now_local()
+    return conn.execute(
+        f"""
+        SELECT {columns(Lecture)} FROM lectures
+        WHERE teacher_id = ? AND start_time <= ? AND end_time > ?
+        ORDER BY start_time DESC LIMIT 1
+        """,
+        (teacher_id, (now + timedelta(minutes=lead_min)).isoformat(), now.isoformat()),
+    ).fetchone()
+
+
+def main(argv=None):
+    from core.db import init_db
+
+    parser = argparse.ArgumentParser(description="Create upcoming lecture sessions from the timetable.")
+    parser.add_argument("--days", type=int, default=DEFAULT_LOOKAHEAD_DAYS)
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    args = parser.parse_args(argv)
+
+    conn = init_db(args.db)
+    started = time.perf_counter()
+    result = materialize_upcoming(conn, days=args.days)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    print(f"{result.lectures} scheduled lecture(s) in the next {args.days} day(s) ({elapsed_ms:.1f} ms)")
+    for row in result.unplaced:
+        print(f"  skipped {row.day} {row.time} {row.subject}: no known location for room {row.room!r}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
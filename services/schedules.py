@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from core.cache import cached_query, invalidate
+from core.models import Record, Schedule, columns, record_type
+from core.utils import WEEKDAYS, schedule_slot
+
+# Weekday order first; rows whose day/time could not be parsed sort last by their text.
+SLOT_ORDER = "weekday IS NULL, weekday, start_min, day, time"
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+
+class ScheduleConflict(ValueError):
+    """Raised when a new slot overlaps an existing one; ``conflicts`` lists (row, reasons)."""
+
+    def __init__(self, conflicts: List[Tuple[Schedule, List[str]]]):
+        self.conflicts = conflicts
+        super().__init__(f"{len(conflicts)} overlapping timetable slot(s)")
+
+
+def find_conflicts(
+    conn,
+    weekday: int,
+    start_min: int,
+    end_min: int,
+    room: Optional[str],
+    teacher_id: Optional[int],
+    year: Optional[int],
+    batch: Optional[int],
+) -> List[Tuple[Schedule, List[str]]]:
+    """Slots overlapping ``[start_min, end_min)`` on ``weekday`` that share the room, teacher or cohort.
+
+    The (weekday, start_min, end_min) index bounds the scan to that day's earlier-starting
+    slots; the overlap and sharing tests run on those few rows.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT {columns(Schedule)} FROM schedules
+        WHERE weekday = ? AND start_min < ? AND end_min > ?
+        """,
+        (weekday, end_min, start_min),
+    ).fetchall()
+    conflicts = []
+    for row in rows:
+        reasons = []
+        if room and row.room and row.room.strip().lower() == room.strip().lower():
+            reasons.append(f"room {row.room}")
+        if teacher_id is not None and row.teacher_id == teacher_id:
+            reasons.append("same teacher")
+        if year is not None and row.year == year and row.batch == batch:
+            reasons.append(f"Y{year} B{batch}")
+        if reasons:
+            conflicts.append((row, reasons))
+    return conflicts
+
+
+def create_schedule(conn, day: str, time: str, subject: str, room: str, teacher_id: int, year: int, batch: int):
+    """Add a timetable slot.
+
+    Raises ``ValueError`` if ``time`` is not a range like ``10:00-11:00`` and
+    :class:`ScheduleConflict` if it overlaps a slot with the same room, teacher or cohort.
+    """
+    weekday, start_min, end_min = schedule_slot(day, time)
+    conflicts = find_conflicts(conn, weekday, start_min, end_min, room, teacher_id, year, batch)
+    if conflicts:
+        raise ScheduleConflict(conflicts)
+    conn.execute(
+        """
+        INSERT INTO schedules (day, time, subject, room, teacher_id, year, batch, weekday, start_min, end_min)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (day, time, subject, room, teacher_id, year, batch, weekday, start_min, end_min),
+    )
+    conn.commit()
+    invalidate(conn, "schedules")
+
+
+@cached_query("schedules")
+def list_for_cohort(conn, year: int, batch: int) -> List[Schedule]:
+    return conn.execute(
+        f"""
+        SELECT {columns(Schedule)} FROM schedules
+        WHERE year = ? AND batch = ?
+        ORDER BY {SLOT_ORDER}
+        """,
+        (year, batch),
+    ).fetchall()
+
+
+@cached_query("schedules")
+def list_all(conn) -> List[Schedule]:
+    return conn.execute(f"SELECT {columns(Schedule)} FROM schedules ORDER BY {SLOT_ORDER}").fetchall()
+
+
+@dataclass(frozen=True)
+class CohortTimetable:
+    """A cohort's week, with slot starts as sorted minute-of-week offsets for bisection."""
+
+    rows: Tuple[Schedule, ...]
+    slots: Tuple[Schedule, ...]
+    slot_starts: Tuple[int, ...]
+
+    def next_lecture(self, now: datetime) -> Optional[Tuple[Schedule, datetime]]:
+        """The first slot starting after ``now`` (wrapping into next week) and its start time."""
+        if not self.slots:
+            return None
+        minute = now.weekday() * 1440 + now.hour * 60 + now.minute
+        i = bisect_right(self.slot_starts, minute)
+        wrap = i == len(self.slots)
+        row = self.slots[0 if wrap else i]
+        offset = self.slot_starts[0 if wrap else i] + (MINUTES_PER_WEEK if wrap else 0) - minute
+        start = now.replace(second=0, microsecond=0) + timedelta(minutes=offset)
+        return row, start
+
+    def current_lecture(self, now: datetime) -> Optional[Schedule]:
+        """The slot in progress at ``now``, if any."""
+        minute = now.weekday() * 1440 + now.hour * 60 + now.minute
+        i = bisect_right(self.slot_starts, minute) - 1
+        if i >= 0 and minute < self.slots[i].weekday * 1440 + self.slots[i].end_min:
+            return self.slots[i]
+        return None
+
+
+@cached_query("schedules")
+def cohort_timetable(conn, year: int, batch: int) -> CohortTimetable:
+    """Per-cohort timetable, built once and shared by every student in the cohort until schedules change."""
+    rows = tuple(list_for_cohort.uncached(conn, year, batch))
+    slots = tuple(row for row in rows if row.weekday is not None and row.start_min is not None and row.end_min is not None)
+    return CohortTimetable(rows, slots, tuple(row.weekday * 1440 + row.start_min for row in slots))
+
+
+def list_for_teacher(conn, teacher_id: int) -> List[Schedule]:
+    return conn.execute(
+        f"SELECT {columns(Schedule)} FROM schedules WHERE teacher_id = ? ORDER BY {SLOT_ORDER}",
+        (teacher_id,),
+    ).fetchall()
+
+
+@cached_query("schedules")
+def weekly_grid(conn, year: Optional[int] = None, batch: Optional[int] = None, teacher_id: Optional[int] = None) -> List[Record]:
+    """One row per (start, end) slot with a column per weekday holding "subject (room)" entries.
+
+    The slots come from one query over the slot index; the pivot happens here so the SQL
+    stays portable across backends.
+    """
+    filters = ["weekday IS NOT NULL"]
+    params = []
+    if year is not None and batch is not None:
+        filters.append("year = ? AND batch = ?")
+        params += [year, batch]
+    if teacher_id is not None:
+        filters.append("teacher_id = ?")
+        params.append(teacher_id)
+    rows = conn.execute(
+        f"""
+        SELECT weekday, start_min, end_min, subject, room FROM schedules
+        WHERE {" AND ".join(filters)}
+        ORDER BY {SLOT_ORDER}
+        """,
+        params,
+    ).fetchall()
+    cells: Dict[Tuple[int, int], List[List[str]]] = {}
+    for row in rows:
+        day_cells = cells.setdefault((row.start_min, row.end_min), [[] for _ in WEEKDAYS])
+        day_cells[row.weekday].append(f"{row.subject} ({row.room or '-'})")
+    grid_row = record_type(("slot", *WEEKDAYS), "WeekSlot")
+    return [
+        tuple.__new__(grid_row, (
+            f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}",
+            *(" / ".join(entries) or None for entries in day_cells),
+        ))
+        for (start, end), day_cells in sorted(cells.items())
+    ]
+
+
+def list_placeable(conn, teacher_id: Optional[int] = None) -> List[Schedule]:
+    """Slots whose day/time were parsed into the structured columns (what the scheduler can place)."""
+    if teacher_id is None:
+        return conn.execute(f"SELECT {columns(Schedule)} FROM schedules WHERE weekday IS NOT NULL").fetchall()
+    return conn.execute(
+        f"SELECT {columns(Schedule)} FROM schedules WHERE weekday IS NOT NULL AND teacher_id = ?",
+        (teacher_id,),
+    ).fetchall()
+
+
+def week_occurrences(schedules, week_start: date) -> Tuple[List[Tuple[Schedule, datetime, datetime]], List[Schedule]]:
+    """Concrete (schedule, start, end) slots for the week beginning on Monday ``week_start``.
+
+    Rows whose day or time cannot be parsed are returned separately instead of raising.
+    """
+    occurrences = []
+    skipped = []
+    for row in schedules:
+        try:
+            weekday, start_min, end_min = slot_of(row)
+        except ValueError:
+            skipped.append(row)
+            continue
+        day = datetime.combine(week_start + timedelta(days=weekday), datetime.min.time())
+        occurrences.append((row, day + timedelta(minutes=start_min), day + timedelta(minutes=end_min)))
+    occurrences.sort(key=lambda item: item[1])
+    return occurrences, skipped
+
+
+def slot_of(row: Schedule) -> Tuple[int, int, int]:
+    """``(weekday, start_min, end_min)`` from the structured columns, parsing the text if they are unset."""
+    if row.weekday is not None and row.start_min is not None and row.end_min is not None:
+        return row.weekday, row.start_min, row.end_min
+    return schedule_slot(row.day, row.time)
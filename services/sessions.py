@@ -0,0 +1,61 @@
+"""Login sessions: signed tokens for the browser, state kept in :func:`core.state.state_store`."""
+from __future__ import annotations
+
+import secrets
+import time
+from typing import Any, Optional
+
+from core.security import sign_value, unsign_value
+from core.state import SessionRecord, state_store
+from services.settings import get_setting, session_signing_secret
+
+DEFAULT_SESSION_TTL_HOURS = 12
+
+
+def _ttl_sec(conn) -> int:
+    return int(float(get_setting(conn, "session_ttl_hours", str(DEFAULT_SESSION_TTL_HOURS))) * 3600)
+
+
+def start(conn, user_id: int) -> str:
+    """Open a session for ``user_id`` and return its token; expired sessions are cleared first."""
+    store = state_store()
+    store.purge(conn)
+    sid = secrets.token_urlsafe(24)
+    store.create(conn, sid, int(user_id), int(time.time()) + _ttl_sec(conn))
+    return sign_value(session_signing_secret(conn), sid)
+
+
+def resolve(conn, token: Optional[str]) -> Optional[SessionRecord]:
+    """The live session behind ``token``, or ``None`` for a missing, altered or expired one.
+
+    Expiry slides: a session used after half its lifetime gets a full one again.
+    """
+    sid = unsign_value(session_signing_secret(conn), token) if token else None
+    if sid is None:
+        return None
+    store = state_store()
+    record = store.load(conn, sid)
+    if record is None:
+        return None
+    ttl = _ttl_sec(conn)
+    now = int(time.time())
+    if record.expires_at - now < ttl // 2:
+        store.extend(conn, sid, now + ttl)
+    return record
+
+
+def end(conn, record: Optional[SessionRecord]):
+    if record is not None:
+        state_store().delete(conn, record.sid)
+
+
+def get_value(conn, record: SessionRecord, key: str, default: Any = None) -> Any:
+    return state_store().get(conn, record.sid, key, default)
+
+
+def set_value(conn, record: SessionRecord, key: str, value: Any):
+    state_store().set(conn, record.sid, key, value)
+
+
+def pop_value(conn, record: SessionRecord, key: str):
+    state_store().pop(conn, record.sid, key)
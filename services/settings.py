@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import secrets
+
+from core.cache import invalidate
+from core.utils import now_iso
+
+# Lecture defaults until an admin saves System Settings.  The settings page, the lecture
+# forms and the timetable scheduler all read them from here, so manual and scheduled
+# lectures agree.
+DEFAULT_RADIUS_M = 100
+DEFAULT_LATE_AFTER_MIN = 10
+DEFAULT_TIME_WINDOW_MIN = 60
+DEFAULT_QR_ROTATION_SEC = 0
+
+
+def get_setting(conn, key: str, default: str) -> str:
+    row = conn.execute("SELECT value FROM system_settings WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+
+def get_float(conn, key: str, default: float) -> float:
+    return float(get_setting(conn, key, str(default)))
+
+
+def set_setting(conn, key: str, value: str):
+    conn.execute(
+        """
+        INSERT INTO system_settings (key, value, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """,
+        (key, value, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "system_settings")
+
+
+QR_SECRET_ENV = "SMART_CAMPUS_QR_SECRET"
+SESSION_SECRET_ENV = "SMART_CAMPUS_SESSION_SECRET"
+
+
+def _shared_secret(conn, env: str, key: str) -> str:
+    """The environment variable, else a key generated once and stored for every process."""
+    secret = os.environ.get(env)
+    if secret:
+        return secret
+    secret = get_setting(conn, key, "")
+    if not secret:
+        # Two processes starting together must end up with the same key: the first insert wins.
+        conn.execute(
+            "INSERT INTO system_settings (key, value, updated_at) VALUES (?, ?, ?) ON CONFLICT(key) DO NOTHING",
+            (key, secrets.token_hex(32), now_iso()),
+        )
+        conn.commit()
+        invalidate(conn, "system_settings")
+        secret = get_setting(conn, key, "")
+    return secret
+
+
+def qr_signing_secret(conn) -> str:
+    """HMAC key for rotating QR tokens."""
+    return _shared_secret(conn, QR_SECRET_ENV, "qr_token_secret")
+
+
+def session_signing_secret(conn) -> str:
+    """HMAC key for login session tokens (services.sessions)."""
+    return _shared_secret(conn, SESSION_SECRET_ENV, "session_token_secret")
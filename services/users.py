@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from core.cache import invalidate
+from core.models import Record, User, columns
+from core.utils import now_iso
+
+DEFAULT_YEARS = [1, 2, 3, 4, 5]
+DEFAULT_BATCHES = [1, 2, 3, 4]
+
+
+def get_by_id(conn, user_id: int) -> Optional[User]:
+    return conn.execute(f"SELECT {columns(User)} FROM users WHERE id = ?", (user_id,)).fetchone()
+
+
+def get_by_enrollment(conn, enrollment: str) -> Optional[User]:
+    return conn.execute(f"SELECT {columns(User)} FROM users WHERE enrollment = ?", (enrollment,)).fetchone()
+
+
+def get_by_username(conn, username: str) -> Optional[User]:
+    return conn.execute(f"SELECT {columns(User)} FROM users WHERE username = ?", (username,)).fetchone()
+
+
+def role_map(conn) -> Dict[int, str]:
+    return {row["id"]: row["name"] for row in conn.execute("SELECT id, name FROM roles")}
+
+
+def role_id(conn, name: str) -> int:
+    return conn.execute("SELECT id FROM roles WHERE name = ?", (name,)).fetchone()[0]
+
+
+def role_name(conn, role_id_: int) -> Optional[str]:
+    row = conn.execute("SELECT name FROM roles WHERE id = ?", (role_id_,)).fetchone()
+    return row["name"] if row else None
+
+
+def count_by_role(conn, role: str) -> int:
+    return conn.execute(
+        """
+        SELECT COUNT(*)
+        FROM users u
+        JOIN roles r ON u.role_id = r.id
+        WHERE r.name = ?
+        """,
+        (role,),
+    ).fetchone()[0]
+
+
+def enrollment_exists(conn, enrollment: str) -> bool:
+    return conn.execute("SELECT 1 FROM users WHERE enrollment = ?", (enrollment,)).fetchone() is not None
+
+
+def username_exists(conn, username: str) -> bool:
+    return conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+
+def create_student(conn, name: str, enrollment: str, department: str, year: int, batch: int, password_hash: str):
+    conn.execute(
+        """
+        INSERT INTO users (role_id, name, enrollment, department, year, batch, password_hash, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (role_id(conn, "student"), name, enrollment, department, year, batch, password_hash, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "users")
+
+
+def create_teacher(conn, name: str, username: str, department: str, password_hash: str):
+    conn.execute(
+        """
+        INSERT INTO users (role_id, name, username, department, password_hash, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (role_id(conn, "teacher"), name, username, department, password_hash, now_iso()),
+    )
+    conn.commit()
+    invalidate(conn, "users")
+
+
+def list_users(conn, role: Optional[str] = None) -> List[Record]:
+    query = """
+        SELECT u.id, u.name, u.enrollment, u.username, u.department, u.year, u.batch, r.name as role, u.created_at
+        FROM users u
+        LEFT JOIN roles r ON u.role_id = r.id
+    """
+    params = ()
+    if role:
+        query += " WHERE r.name = ?"
+        params = (role,)
+    query += " ORDER BY u.created_at DESC"
+    return conn.execute(query, params).fetchall()
+
+
+def delete_user(conn, user_id: int):
+    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    conn.commit()
+    invalidate(conn, "users")
+
+
+def list_students(conn) -> List[Record]:
+    return conn.execute(
+        """
+        SELECT u.enrollment, u.name, u.year, u.batch
+        FROM users u
+        JOIN roles r ON u.role_id = r.id
+        WHERE r.name = 'student'
+        ORDER BY u.name
+        """
+    ).fetchall()
+
+
+def update_student_cohort(conn, enrollment: str, year: int, batch: int):
+    conn.execute("UPDATE users SET year = ?, batch = ? WHERE enrollment = ?", (year, batch, enrollment))
+    conn.commit()
+    invalidate(conn, "users")
+
+
+def export_students(conn) -> List[Record]:
+    return conn.execute(
+        """
+        SELECT u.name, u.enrollment, u.department, u.year, u.batch, u.created_at
+        FROM users u
+        JOIN roles r ON u.role_id = r.id
+        WHERE r.name = 'student'
+        """
+    ).fetchall()
+
+
+def student_cohorts(conn) -> List[Record]:
+    """Distinct (year, batch) pairs that currently have students."""
+    return conn.execute(
+        """
+        SELECT DISTINCT u.year, u.batch
+        FROM users u
+        LEFT JOIN roles r ON u.role_id = r.id
+        WHERE r.name = 'student'
+        """
+    ).fetchall()
+
+
+def year_choices(cohorts) -> List[int]:
+    years = {row["year"] for row in cohorts if row["year"] is not None}
+    return sorted(years.union(DEFAULT_YEARS))
+
+
+def batch_choices(cohorts, year: int) -> List[int]:
+    batches = sorted({row["batch"] for row in cohorts if row["year"] == year and row["batch"] is not None})
+    return batches or list(DEFAULT_BATCHES)
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.backends import DB_URL_ENV  # noqa: E402
+from core.db import init_db, seed_defaults  # noqa: E402
+from core.security import hash_password  # noqa: E402
+
+BACKEND_SCHEMES = ["sqlite", "sqlite+server"]
+
+
+@pytest.fixture(params=BACKEND_SCHEMES)
+def conn(request, tmp_path, monkeypatch):
+    """A seeded database on each backend that runs here, configured through SMART_CAMPUS_DB_URL."""
+    monkeypatch.delenv("SMART_CAMPUS_SHARDING", raising=False)
+    monkeypatch.delenv("SMART_CAMPUS_STATE_STORE", raising=False)
+    # Four slashes: an absolute path, as in SQLAlchemy URLs.
+    monkeypatch.setenv(DB_URL_ENV, f"{request.param}:///{tmp_path / 'campus.db'}")
+    connection = init_db()
+    seed_defaults(connection, hash_password("secret"))
+    yield connection
+    connection.close()
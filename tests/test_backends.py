@@ -0,0 +1,106 @@
+"""Service calls whose SQL must run unchanged on SQLite and through the server adapter."""
+from datetime import timedelta
+
+from core.cache import invalidate
+from core.utils import now_local
+from services import attendance as attendance_service
+from services import lectures as lecture_service
+from services import schedules as schedule_service
+from services import sessions as session_service
+from services import users as user_service
+
+
+def _teacher_id(conn):
+    return user_service.get_by_username(conn, "teacher").id
+
+
+def _lecture(conn, session_id, start, year=2, batch=1):
+    return lecture_service.create_lecture(
+        conn, session_id, _teacher_id(conn), "Networks", "B-101", start, start + timedelta(hours=1),
+        23.0, 72.5, 100, 10, year, batch,
+    )
+
+
+def test_backend_matches_url(conn):
+    assert conn.dialect.name in ("sqlite", "sqlite+server")
+
+
+def test_mark_keeps_first_mark_and_replaces_rejection(conn):
+    session_id = _lecture(conn, "NETW-0001", now_local() - timedelta(minutes=5))
+    stored = attendance_service.mark(conn, session_id, "E1", "Rejected (Too Far)", 23.0, 72.5, 5, 400)
+    assert stored[0] == "Rejected (Too Far)"
+    assert attendance_service.mark(conn, session_id, "E1", "Present", 23.0, 72.5, 5, 10)[0] == "Present"
+    assert attendance_service.mark(conn, session_id, "E1", "Late", 23.0, 72.5, 5, 10) is None
+    assert attendance_service.get_mark(conn, session_id, "E1").status == "Present"
+
+
+def test_bulk_override_updates_marks_and_audits(conn):
+    session_id = _lecture(conn, "NETW-0002", now_local() - timedelta(minutes=5))
+    for enrollment in ("E1", "E2"):
+        attendance_service.mark(conn, session_id, enrollment, "Present", 23.0, 72.5, 5, 10)
+    ids = [row.id for row in attendance_service.list_for_override(conn, session_id=session_id)]
+    assert attendance_service.bulk_override(conn, ids, "Absent", "proxy", _teacher_id(conn)) == 2
+    assert {row.status for row in attendance_service.list_for_session(conn, session_id)} == {"Absent"}
+    details = [row[0] for row in conn.execute("SELECT details FROM audit_logs WHERE action = 'ATTENDANCE_OVERRIDE'")]
+    assert len(details) == 2 and all("Present -> Absent. Reason: proxy" in text for text in details)
+
+
+def test_weekly_grid_pivots_slots(conn):
+    teacher_id = _teacher_id(conn)
+    schedule_service.create_schedule(conn, "Mon", "10:00-11:00", "Networks", "B-101", teacher_id, 2, 1)
+    schedule_service.create_schedule(conn, "Wed", "10:00-11:00", "Compilers", None, teacher_id, 2, 1)
+    schedule_service.create_schedule(conn, "Tue", "09:00-10:00", "Maths", "A-1", teacher_id, 2, 1)
+    grid = schedule_service.weekly_grid(conn, 2, 1)
+    assert [row.slot for row in grid] == ["09:00-10:00", "10:00-11:00"]
+    assert grid[1].Mon == "Networks (B-101)" and grid[1].Wed == "Compilers (-)" and grid[1].Tue is None
+
+
+def test_list_brief_with_and_without_limit(conn):
+    start = now_local() - timedelta(days=1)
+    for i in range(3):
+        _lecture(conn, f"NETW-000{i}", start + timedelta(hours=i))
+    assert [row.session_id for row in lecture_service.list_brief(conn)] == ["NETW-0002", "NETW-0001", "NETW-0000"]
+    assert len(lecture_service.list_brief(conn, limit=2)) == 2
+    assert [row.session_id for row in lecture_service.list_brief(conn, ["NETW-0000"])] == ["NETW-0000"]
+
+
+def test_count_for_cohort_skips_future_lectures(conn):
+    now = now_local()
+    _lecture(conn, "NETW-0001", now - timedelta(days=3))
+    _lecture(conn, "NETW-0002", now - timedelta(hours=2))
+    _lecture(conn, "NETW-0003", now + timedelta(days=1))
+    _lecture(conn, "NETW-0004", now - timedelta(hours=2), year=3)
+    assert lecture_service.count_for_cohort(conn, 2, 1) == 2
+    assert lecture_service.count_for_cohort(conn, 2, 1, (now - timedelta(days=1)).isoformat()) == 1
+    assert lecture_service.count_for_cohort(conn, None, None) == 3
+
+
+def test_session_start_and_resolve(conn):
+    user_id = _teacher_id(conn)
+    token = session_service.start(conn, user_id)
+    record = session_service.resolve(conn, token)
+    assert record is not None and record.user_id == user_id
+    session_service.set_value(conn, record, "geo_location", {"lat": 23.0})
+    assert session_service.get_value(conn, record, "geo_location") == {"lat": 23.0}
+    assert session_service.resolve(conn, token[:-1] + ("A" if token[-1] != "A" else "B")) is None
+    session_service.end(conn, record)
+    assert session_service.resolve(conn, token) is None
+
+
+def test_teacher_sessions_skip_future_lectures(conn):
+    now = now_local()
+    _lecture(conn, "NETW-0001", now - timedelta(hours=2))
+    _lecture(conn, "NETW-0002", now + timedelta(days=1))
+    attendance_service.mark(conn, "NETW-0001", "E1", "Present", 23.0, 72.5, 5, 10)
+    sessions = lecture_service.list_teacher_sessions(conn, _teacher_id(conn))
+    assert [(row.session_id, row.attendance_count) for row in sessions] == [("NETW-0001", 1)]
+
+
+def test_lookup_lecture_dropped_when_lectures_change(conn):
+    _lecture(conn, "NETW-0001", now_local())
+    assert lecture_service.lookup_lecture(conn, "NETW-0001").room == "B-101"
+    conn.execute("DELETE FROM lectures WHERE session_id = ?", ("NETW-0001",))
+    conn.commit()
+    assert lecture_service.lookup_lecture(conn, "NETW-0001") is not None
+    invalidate(conn, "lectures")
+    assert lecture_service.lookup_lecture(conn, "NETW-0001") is None
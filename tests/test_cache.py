@@ -0,0 +1,48 @@
+"""Query cache sizing and invalidation keys."""
+from datetime import timedelta
+
+from core.backends import DB_URL_ENV
+from core.cache import _estimate_size, invalidate
+from core.db import init_db, seed_defaults
+from core.security import hash_password
+from core.shards import ShardRouter
+from core.utils import now_local
+from services import lectures as lecture_service
+from services import users as user_service
+
+
+def test_estimate_size_counts_nested_values():
+    flat = _estimate_size(["x" * 1000])
+    assert _estimate_size([{"notes": ["x" * 1000]}]) > flat
+    assert _estimate_size([("a", ("x" * 1000,))]) > 1000
+
+
+def test_estimate_size_stops_at_depth():
+    nested = ["x" * 1000]
+    for _ in range(10):
+        nested = [nested]
+    assert _estimate_size(nested) < 1000
+    assert _estimate_size(nested, depth=20) > 1000
+
+
+def test_shard_and_campus_connections_share_table_versions(tmp_path, monkeypatch):
+    monkeypatch.setenv(DB_URL_ENV, f"sqlite:///{tmp_path / 'campus.db'}")
+    conn = init_db()
+    seed_defaults(conn, hash_password("secret"))
+    teacher_id = user_service.get_by_username(conn, "teacher").id
+    start = now_local()
+    lecture_service.create_lecture(
+        conn, "NETW-0001", teacher_id, "Networks", "B-101", start, start + timedelta(hours=1),
+        23.0, 72.5, 100, 10, 2, 1,
+    )
+    router = ShardRouter(conn.db_path, "term")
+    shard = router.open("2026-1")
+    try:
+        assert lecture_service.lookup_lecture(shard, "NETW-0001") is not None
+        conn.execute("DELETE FROM lectures WHERE session_id = ?", ("NETW-0001",))
+        conn.commit()
+        invalidate(conn, "lectures")
+        assert lecture_service.lookup_lecture(shard, "NETW-0001") is None
+    finally:
+        shard.close()
+        conn.close()
@@ -1,60 +1,305 @@
+"""Inspect the campus database without loading whole tables.
+
+Usage::
+
+    python view_database.py                       # tables with row counts and sizes
+    python view_database.py stats --indexes       # plus per-index sizes and hot-query usage
+    python view_database.py rows attendance --where status=Present --since 2026-02-01 --limit 20
+    python view_database.py rows attendance --after 1200   # next page (keyset on the primary key)
+    python view_database.py explain               # query plans of the app's hot queries
+    python view_database.py explain lecture_lookup student_lectures
+
+Rows are streamed from the cursor a page at a time.  ``explain`` runs the real service
+functions against the database with a trace hook and prints the plan of every statement
+they issue, so it follows the code rather than a copy of its SQL.
+"""
+import argparse
+import csv
 import sqlite3
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.db import DB_PATH, EPOCH_COLUMNS
+from core.models import record_factory
+from core.utils import local_epoch
+from services import anomalies as anomaly_service
+from services import attendance as attendance_service
+from services import lectures as lecture_service
+from services import notices as notice_service
+from services import rooms as room_service
+from services import schedules as schedule_service
+from services.lectures import CUT_OFF_DATE
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    # A plain connection has no ``db_path``, so service calls bypass the query cache.
+    conn = sqlite3.connect(str(db_path or DB_PATH))
+    conn.row_factory = record_factory
+    return conn
+
+
+def _tables(conn) -> List[str]:
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _table_columns(conn, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+
+
+def _human(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+# ── stats ──
+
+def _dbstat(conn) -> Dict[str, Tuple[int, int, int]]:
+    """name -> (pages, bytes, unused bytes) for every table and index."""
+    try:
+        rows = conn.execute("SELECT name, pageno, pgsize, unused FROM dbstat WHERE aggregate = 1").fetchall()
+    except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return {}
+    return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+
+def cmd_stats(conn, args):
+    sizes = _dbstat(conn)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    print(f"{args.db or DB_PATH}: {page_count:,} pages of {page_size} B ({_human(page_count * page_size)}), {free:,} free")
+    if not sizes:
+        print("(dbstat is not available in this SQLite build; sizes omitted)")
+
+    used_by = _hot_query_indexes(conn) if args.indexes else {}
+    print(f"\n{'table':<24} {'rows':>12} {'pages':>8} {'size':>10} {'unused':>8}")
+    for table in _tables(conn):
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        pages, size, unused = sizes.get(table, (0, 0, 0))
+        print(f"{table:<24} {count:>12,} {pages:>8,} {_human(size):>10} {_human(unused):>8}")
+        if not args.indexes:
+            continue
+        for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            name = index[1]
+            pages, size, _ = sizes.get(name, (0, 0, 0))
+            queries = ", ".join(sorted(used_by.get(name, ()))) or "-"
+            print(f"  {name:<40} {pages:>8,} {_human(size):>10}  used by: {queries}")
+
+
+# ── rows ──
+
+def _parse_filters(columns: List[str], pairs: List[str], flag: str) -> List[Tuple[str, str]]:
+    filters = []
+    for pair in pairs or []:
+        column, sep, value = pair.partition("=")
+        if not sep or column not in columns:
+            raise SystemExit(f"{flag} expects COLUMN=VALUE with one of: {', '.join(columns)}")
+        filters.append((column, value))
+    return filters
+
+
+def _time_column(table: str, requested: Optional[str]) -> Tuple[str, bool]:
+    """The column --since/--until compare on, and whether it is an epoch column."""
+    for epoch_table, source, epoch_column in EPOCH_COLUMNS:
+        if epoch_table == table and (requested in (None, source, epoch_column)):
+            return epoch_column, True
+    if requested is None:
+        raise SystemExit(f"{table} has no known timestamp column; pass --time-column")
+    return requested, False
+
+
+def cmd_rows(conn, args):
+    table = args.table
+    if table not in _tables(conn):
+        raise SystemExit(f"Unknown table {table!r}; tables: {', '.join(_tables(conn))}")
+    all_columns = _table_columns(conn, table)
+    pk = "key" if table == "system_settings" else "rowid"
+    selected = args.columns.split(",") if args.columns else [c for c in all_columns if not c.endswith("_epoch")]
+    unknown = [c for c in selected if c not in all_columns]
+    if unknown:
+        raise SystemExit(f"Unknown column(s) {', '.join(unknown)}; columns: {', '.join(all_columns)}")
+
+    clauses, params = [], []
+    for column, value in _parse_filters(all_columns, args.where, "--where"):
+        clauses.append(f"{column} = ?")
+        params.append(value)
+    for column, value in _parse_filters(all_columns, args.like, "--like"):
+        clauses.append(f"{column} LIKE ?")
+        params.append(value)
+    if args.since or args.until:
+        column, is_epoch = _time_column(table, args.time_column)
+        if column not in all_columns:
+            raise SystemExit(f"{table} has no column {column!r}")
+        for bound, op in ((args.since, ">="), (args.until, "<")):
+            if bound:
+                clauses.append(f"{column} {op} ?")
+                params.append(local_epoch(bound) if is_epoch else bound)
+    if args.after is not None:
+        clauses.append(f"{pk} {'<' if args.desc else '>'} ?")
+        params.append(args.after)
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = "DESC" if args.desc else "ASC"
+    sql = f"SELECT {pk}, {', '.join(selected)} FROM {table}{where} ORDER BY {pk} {order} LIMIT ?"
+    cursor = conn.execute(sql, (*params, args.limit))
+
+    last_key = None
+    shown = 0
+    if args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(selected)
+        for row in cursor:
+            writer.writerow(row[1:])
+            last_key, shown = row[0], shown + 1
+    else:
+        print("\t".join(selected))
+        for row in cursor:
+            print("\t".join("" if value is None else str(value) for value in row[1:]))
+            last_key, shown = row[0], shown + 1
+    if shown == args.limit:
+        print(f"-- {shown} rows; next page: --after {last_key!r}", file=sys.stderr)
+    else:
+        print(f"-- {shown} rows", file=sys.stderr)
+
+
+# ── explain ──
+
+def _sample_context(conn) -> Dict:
+    student = conn.execute(
+        """
+        SELECT u.enrollment, u.year, u.batch FROM users u JOIN roles r ON u.role_id = r.id
+        WHERE r.name = 'student' AND u.year IS NOT NULL AND u.batch IS NOT NULL ORDER BY u.id LIMIT 1
+        """
+    ).fetchone()
+    lecture = conn.execute(
+        "SELECT session_id, teacher_id, latitude, longitude FROM lectures ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    return {
+        "enrollment": student[0] if student else "ENR-0001",
+        "year": student[1] if student else 1,
+        "batch": student[2] if student else 1,
+        "session_id": lecture[0] if lecture else "NONE-00000000",
+        "teacher_id": lecture[1] if lecture else 1,
+        "lat": lecture[2] if lecture else 23.0225,
+        "lon": lecture[3] if lecture else 72.5714,
+    }
+
+
+# Read paths that run on every page view or submission, as the app calls them.
+HOT_QUERIES: Dict[str, Callable] = {
+    "lecture_lookup": lambda conn, c: lecture_service.get_lecture(conn, c["session_id"]),
+    "student_lectures": lambda conn, c: lecture_service.list_for_cohort(conn, c["year"], c["batch"], CUT_OFF_DATE),
+    "recent_lectures": lambda conn, c: lecture_service.list_recent(conn, CUT_OFF_DATE),
+    "teacher_sessions": lambda conn, c: lecture_service.list_teacher_sessions(conn, c["teacher_id"]),
+    "mark_check": lambda conn, c: attendance_service.get_mark(conn, c["session_id"], c["enrollment"]),
+    "session_attendance": lambda conn, c: attendance_service.list_for_session(conn, c["session_id"]),
+    "recent_attendance": lambda conn, c: attendance_service.list_recent(conn),
+    "override_candidates": lambda conn, c: attendance_service.list_for_override(conn, c["session_id"], "Rejected"),
+    "daily_status_counts": lambda conn, c: attendance_service.daily_status_counts(conn, c["teacher_id"]),
+    "last_position": lambda conn, c: anomaly_service.LastPositionCache().get(conn, c["enrollment"]),
+    "cohort_timetable": lambda conn, c: schedule_service.list_for_cohort.uncached(conn, c["year"], c["batch"]),
+    "nearest_room": lambda conn, c: room_service.nearest_room(conn, c["lat"], c["lon"]),
+    "latest_notices": lambda conn, c: notice_service.list_recent.uncached(conn),
+}
+
+
+def _trace(conn, fn, ctx) -> List[str]:
+    statements: List[str] = []
+    # Nested statements SQLite runs on our behalf are reported prefixed with "--".
+    conn.set_trace_callback(lambda sql: statements.append(sql) if not sql.lstrip().startswith("--") else None)
+    try:
+        fn(conn, ctx)
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def _plans(conn, names) -> Dict[str, List[Tuple[str, List[str]]]]:
+    ctx = _sample_context(conn)
+    plans = {}
+    for name in names:
+        try:
+            plans[name] = [
+                (sql, [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")])
+                for sql in _trace(conn, HOT_QUERIES[name], ctx)
+            ]
+        except sqlite3.OperationalError as exc:
+            # Usually a database the app has not opened (and migrated) since an update.
+            plans[name] = [(f"-- failed: {exc}; start the app once to bring the schema up to date", [])]
+    return plans
+
+
+def _hot_query_indexes(conn) -> Dict[str, set]:
+    used: Dict[str, set] = {}
+    for name, statements in _plans(conn, HOT_QUERIES).items():
+        for _, steps in statements:
+            for step in steps:
+                if " INDEX " in step:
+                    index = step.split(" INDEX ", 1)[1].split()[0]
+                    used.setdefault(index, set()).add(name)
+    return used
+
+
+def cmd_explain(conn, args):
+    names = args.queries or list(HOT_QUERIES)
+    unknown = [name for name in names if name not in HOT_QUERIES]
+    if unknown:
+        raise SystemExit(f"Unknown query {', '.join(unknown)}; known: {', '.join(HOT_QUERIES)}")
+    for name, statements in _plans(conn, names).items():
+        print(f"== {name}")
+        for sql, steps in statements:
+            print("   " + " ".join(sql.split()))
+            for step in steps:
+                flag = "  <-- full scan" if step.startswith("SCAN ") and " USING " not in step else ""
+                print(f"     {step}{flag}")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the Smart Campus database.")
+    parser.add_argument("--db", help="Database path (defaults to the app database)")
+    sub = parser.add_subparsers(dest="command")
+
+    stats = sub.add_parser("stats", help="Row counts and on-disk sizes per table")
+    stats.add_argument("--indexes", action="store_true", help="Also list indexes and the hot queries using them")
+
+    rows = sub.add_parser("rows", help="Stream one page of a table's rows")
+    rows.add_argument("table")
+    rows.add_argument("--columns", help="Comma-separated columns (default: all but *_epoch)")
+    rows.add_argument("--where", action="append", metavar="COL=VALUE", help="Equality filter (repeatable)")
+    rows.add_argument("--like", action="append", metavar="COL=PATTERN", help="LIKE filter (repeatable)")
+    rows.add_argument("--since", help="Only rows at or after this date/time (ISO)")
+    rows.add_argument("--until", help="Only rows before this date/time (ISO)")
+    rows.add_argument("--time-column", help="Column for --since/--until (default: the table's main timestamp)")
+    rows.add_argument("--after", help="Start after this primary key (from the previous page)")
+    rows.add_argument("--desc", action="store_true", help="Newest rows first")
+    rows.add_argument("--limit", type=int, default=DEFAULT_PAGE_SIZE)
+    rows.add_argument("--format", choices=["tsv", "csv"], default="tsv")
+
+    explain = sub.add_parser("explain", help="Query plans of the app's hot queries")
+    explain.add_argument("queries", nargs="*", help=f"Any of: {', '.join(HOT_QUERIES)}")
+
+    args = parser.parse_args(argv)
+    conn = _connect(args.db)
+    try:
+        if args.command == "rows":
+            cmd_rows(conn, args)
+        elif args.command == "explain":
+            cmd_explain(conn, args)
+        else:
+            if args.command is None:
+                args.indexes = False
+            cmd_stats(conn, args)
+    finally:
+        conn.close()
+
 
-from core.db import DB_PATH
-
-conn = sqlite3.connect(str(DB_PATH))
-cursor = conn.cursor()
-
-print('\n' + '='*60)
-print('SMART CAMPUS SYSTEM - DATABASE CONTENTS')
-print('='*60)
-
-# Tables
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-tables = cursor.fetchall()
-print(f'\nTables: {[t[0] for t in tables]}')
-
-# Roles
-print('\n--- ROLES ---')
-cursor.execute('SELECT * FROM roles;')
-for row in cursor.fetchall():
-    print(row)
-
-# Users
-print('\n--- USERS ---')
-cursor.execute('SELECT id, name, role_id, enrollment, username FROM users;')
-for row in cursor.fetchall():
-    print(row)
-
-# Lectures
-print('\n--- LECTURES ---')
-cursor.execute('SELECT session_id, subject, room, start_time FROM lectures;')
-for row in cursor.fetchall():
-    print(row)
-
-# Attendance
-print('\n--- ATTENDANCE ---')
-cursor.execute('SELECT session_id, enrollment, status, distance_m, timestamp FROM attendance;')
-for row in cursor.fetchall():
-    print(row)
-
-# Notices
-print('\n--- NOTICES ---')
-cursor.execute('SELECT id, title, created_at FROM notices;')
-for row in cursor.fetchall():
-    print(row)
-
-# Issues
-print('\n--- ISSUES ---')
-cursor.execute('SELECT id, title, category, status FROM issues;')
-for row in cursor.fetchall():
-    print(row)
-
-# Events
-print('\n--- EVENTS ---')
-cursor.execute('SELECT id, title, event_date FROM events;')
-for row in cursor.fetchall():
-    print(row)
-
-print('\n' + '='*60)
-conn.close()
+if __name__ == "__main__":
+    main()